@@ -57,7 +57,7 @@ const VoiceRecorder = () => {
         console.log(initial_response.data)
         const result = initial_response.data;
         
-        const response = await axios.get('http://localhost:8000/download', {responseType: 'blob' });
+        const response = await axios.get(`http://localhost:8000/download/${result.audio_id}`, {responseType: 'blob' });
         setIsLoading(false);
         setProcessedText(result);
         const contentType = response.headers['content-type'] || 'audio/mpeg';
@@ -111,7 +111,7 @@ const VoiceRecorder = () => {
         console.log(initial_response.data)
         const result = initial_response.data;
         
-        response = await axios.get('http://localhost:8000/download', {responseType: 'blob' });
+        response = await axios.get(`http://localhost:8000/download/${result.audio_id}`, {responseType: 'blob' });
         setIsLoading(false);
         setProcessedText(result);
         const contentType = response.headers['content-type'] || 'audio/mpeg';
@@ -1,20 +1,55 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request
 from pydantic import BaseModel
+import hashlib
+import json
 import logging
+import math
+import re
+import time
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 
-from llm_setup.llm_setup import LLMService
 import configs.config as config
-import scraper
-import processing.documents as document_processing
-from stores.chroma import store_embeddings
+from processing.corpus import open_corpus
+from processing.context import build_context
+from processing.eligibility import extract_attributes
+from stores.audio import AudioStore
+from stores.semantic_cache import SemanticCache, CachedAnswer
+from stores.lexical import LexicalIndex
+from stores.hybrid import fuse_rankings, HybridRetriever
+from stores.eligibility import load_eligibility_index
+from stores.conversations import Conversation, ConversationStore, is_follow_up, refers_back
 import speech_to_text.gemini as gemini
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.prompts import PromptTemplate
+from speech_to_text.preprocess import preprocess_audio
+from translation.glossary import retrieval_query
+from translation.language import detect_language, normalize_query, script_language_code, script_name, TranslationCache
+from services.executor import run_blocking
+from services import metrics
+from services.metrics import stage, record_size
+from services.singleflight import AsyncSingleFlight, all_flights
+from services.ratelimit import OverloadedError, all_limiters, upstream_limiter
+from services.resources import AppResources, NotReadyError, ResourceManager
+from services.streaming import stream_answer
+from langchain_core.documents import Document
+from langchain_core.exceptions import OutputParserException
+
+# Heavy resources (scheme index, LLM clients) are built in the background, see build_resources
+resources = ResourceManager()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    task = resources.start(build_resources)
+    if not config.LAZY_STARTUP:
+        await task
+    yield
+
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -29,17 +64,98 @@ app.add_middleware(
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# Set environment variables
-config.set_envs()
+# Answers to semantically similar questions, reused until the scheme index changes
+answer_cache = SemanticCache(config.SEMANTIC_CACHE_THRESHOLD, config.SEMANTIC_CACHE_MAX_ENTRIES,
+                             config.SEMANTIC_CACHE_TTL_SECONDS)
+
+
+def rebuild_index():
+    """
+    Opens the scheme corpus, brings the vector and lexical indexes up to date and invalidates cached answers.
+
+    The chunks are only held while the indexes are built; afterwards their content is read from the corpus when
+    retrieved.
+    """
+    corpus = open_corpus(config.CORPUS_PATH, config.SCRAPED_JSON_PATH)
+    documents = list(corpus.iter_documents())
+    if config.VECTOR_STORE_BACKEND == "mmap":
+        from stores.mmap_index import store_mmap_embeddings
+        vectorstore = store_mmap_embeddings(documents, config.EMBEDDINGS)
+    else:
+        from stores.chroma import store_embeddings
+        vectorstore = store_embeddings(documents, config.EMBEDDINGS)
+    answer_cache.invalidate()
+    lexical_index = LexicalIndex(documents, keep_content=False)
+    eligibility_index = load_eligibility_index(corpus) if config.ELIGIBILITY_PREFILTER else None
+    return vectorstore, HybridRetriever(vectorstore, lexical_index, config.HYBRID_FETCH_K, corpus, eligibility_index)
 
-# Start web scraping if configured
-if config.START_WEB_SCRAPING_MYSCHEMES:
-    scraper.scrape_and_store_to_json_file()
+# Conversation memory of /chat sessions
+conversations = ConversationStore(config.SESSION_MAX_TURNS, config.SESSION_MAX_BYTES, config.SESSION_SUMMARY_MAX_CHARS,
+                                  config.SESSION_TTL_SECONDS, config.SESSION_STORE_MAX_BYTES)
+
+# Synthesized answers, fetched by the client through /download/{audio_id}
+audio_store = AudioStore(config.AUDIO_TTL_SECONDS, config.AUDIO_STORE_MAX_BYTES, config.AUDIO_SPILL_THRESHOLD_BYTES)
+
+# Concurrent requests with the same normalized input share one call at each expensive stage
+translate_flight = AsyncSingleFlight("translate")
+embed_flight = AsyncSingleFlight("embed")
+retrieval_flight = AsyncSingleFlight("retrieval")
+answer_flight = AsyncSingleFlight("answer")
+
+# Admission control of calls to Gemini; embeddings and TTS go through their own limiters
+gemini_limiter = upstream_limiter("gemini")
+
+for flight in all_flights():
+    metrics.register_callback(f"udhavibot_singleflight_{flight.name}_calls_total",
+                              f"Calls to the {flight.name} stage.", lambda f=flight: f.calls, "counter")
+    metrics.register_callback(f"udhavibot_singleflight_{flight.name}_saved_total",
+                              f"Upstream {flight.name} calls saved by joining an identical call in flight.",
+                              lambda f=flight: f.saved, "counter")
+
+for limiter in all_limiters():
+    for counter, help_text in (("admitted", "Calls to the {} upstream admitted."),
+                               ("shed", "Calls to the {} upstream shed with 429/503."),
+                               ("throttled", "Quota errors returned by the {} upstream.")):
+        metrics.register_callback(f"udhavibot_upstream_{limiter.name}_{counter}_total", help_text.format(limiter.name),
+                                  lambda l=limiter, c=counter: getattr(l, c), "counter")
+
+
+def eligibility_stats() -> dict:
+    """
+    Returns the counters of the eligibility index, empty while starting or with the prefilter disabled.
+    """
+    try:
+        eligibility_index = resources.get().hybrid_retriever.eligibility_index
+    except NotReadyError:
+        return {}
+    return eligibility_index.stats() if eligibility_index else {}
 
-# Load documents and store embeddings
-documents = document_processing.load_json_to_langchain_document_schema("myschemes_scraped.json")
-chroma = store_embeddings(documents, config.EMBEDDINGS)
-retriever = chroma.as_retriever()
+
+metrics.register_callback("udhavibot_eligibility_queries_total", "Queries checked for eligibility attributes.",
+                          lambda: eligibility_stats().get("queries", 0), "counter")
+metrics.register_callback("udhavibot_eligibility_narrowed_total",
+                          "Queries whose eligibility attributes narrowed the schemes searched.",
+                          lambda: eligibility_stats().get("narrowed", 0), "counter")
+metrics.register_callback("udhavibot_sessions", "Chat sessions in conversation memory.",
+                          lambda: conversations.stats()["sessions"])
+metrics.register_callback("udhavibot_session_bytes", "Bytes held by conversation memory.",
+                          lambda: conversations.stats()["bytes"])
+metrics.register_callback("udhavibot_session_compactions_total", "Turns compacted into session summaries.",
+                          lambda: conversations.compacted, "counter")
+metrics.register_callback("udhavibot_answer_cache_hits_total", "Semantic answer cache hits.",
+                          lambda: answer_cache.hits, "counter")
+metrics.register_callback("udhavibot_answer_cache_misses_total", "Semantic answer cache misses.",
+                          lambda: answer_cache.misses, "counter")
+metrics.register_callback("udhavibot_answer_cache_entries", "Answers in the semantic answer cache.",
+                          lambda: answer_cache.stats()["entries"])
+metrics.register_callback("udhavibot_audio_store_bytes", "Bytes held by the per-request audio store.",
+                          audio_store.total_bytes)
+metrics.register_callback("udhavibot_tts_cache_hits_total", "Synthesized audio cache hits.",
+                          lambda: gemini.tts_cache.hits, "counter")
+metrics.register_callback("udhavibot_tts_cache_misses_total", "Synthesized audio cache misses.",
+                          lambda: gemini.tts_cache.misses, "counter")
+metrics.register_callback("udhavibot_tts_cache_disk_bytes", "Bytes held by the disk tier of the audio cache.",
+                          lambda: gemini.tts_cache.stats()["disk_bytes"])
 
 
 # Define the Language data model
@@ -49,84 +165,586 @@ class Language(BaseModel):
     language_code: str
 
 
-# Initialize the LLMService
-llm_svc = LLMService(logger, "", retriever)
-if llm_svc.error:
-    logger.error(f"Error initializing LLM service: {llm_svc.error}")
+def build_resources() -> AppResources:
+    """
+    Builds the heavy resources: environment, optional scraping, scheme indexes, LLM service and JSON chain.
 
-llm = llm_svc.get_llm()
+    Backends are imported here rather than at module level so importing the app stays fast.
+    """
+    from langchain_core.output_parsers import JsonOutputParser
+    from langchain_core.prompts import PromptTemplate
+    from llm_setup.llm_setup import LLMService
 
-# Set up the JSON output parser and prompt template
-parser = JsonOutputParser(pydantic_object=Language)
-prompt_template = PromptTemplate(
-    template="Answer the user query.\n{format_instructions}\n{query}\n",
-    input_variables=["query"],
-    partial_variables={"format_instructions": parser.get_format_instructions()},
-)
+    # Set environment variables
+    config.set_envs()
 
-json_chain = prompt_template | llm | parser
+    # Start web scraping if configured
+    if config.START_WEB_SCRAPING_MYSCHEMES:
+        import scraper
+        scraper.scrape_to_corpus(config.CORPUS_PATH)
 
+    # Load documents and store embeddings
+    chroma, hybrid_retriever = rebuild_index()
+    retriever = chroma.as_retriever()
+
+    # Initialize the LLMService
+    llm_svc = LLMService(logger, "", retriever)
+    if llm_svc.error:
+        logger.error(f"Error initializing LLM service: {llm_svc.error}")
+
+    llm = llm_svc.get_llm()
+
+    # Set up the JSON output parser and prompt template
+    parser = JsonOutputParser(pydantic_object=Language)
+    prompt_template = PromptTemplate(
+        template="Answer the user query.\n{format_instructions}\n{query}\n",
+        input_variables=["query"],
+        partial_variables={"format_instructions": parser.get_format_instructions()},
+    )
+
+    json_chain = prompt_template | llm | parser
+
+    # Fixed replies are synthesized once, so "no answer" responses never wait on TTS
+    if config.TTS_PRESYNTHESIZE:
+        gemini.presynthesize(config.NO_ANSWER_MESSAGES.items())
+
+    return AppResources(vectorstore=chroma, hybrid_retriever=hybrid_retriever, llm_svc=llm_svc, llm=llm,
+                        json_chain=json_chain)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """
+    Gives every request a trace ID, records its duration and logs the stage breakdown of slow requests.
+    """
+    trace = metrics.start_trace(request.headers.get("X-Request-ID"))
+    response = await call_next(request)
+    elapsed = time.perf_counter() - trace.started_at
+
+    # Label by route template, so IDs in paths like /download/{audio_id} do not create new series
+    route = request.scope.get("route")
+    metrics.REQUEST_DURATION.observe(getattr(route, "path", "unmatched"), elapsed)
+    response.headers["X-Trace-Id"] = trace.trace_id
+    if config.SLOW_REQUEST_SECONDS and elapsed >= config.SLOW_REQUEST_SECONDS:
+        logger.warning(f"Slow request {trace.trace_id} {request.method} {request.url.path} "
+                       f"{elapsed * 1000:.0f}ms: {trace.breakdown()}")
+    return response
+
+
+@app.exception_handler(NotReadyError)
+async def not_ready_handler(_: Request, exc: NotReadyError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+
+@app.exception_handler(OverloadedError)
+async def overloaded_handler(_: Request, exc: OverloadedError):
+    logger.warning(f"Request shed (trace {_trace_id()}): {exc}")
+    return JSONResponse(status_code=exc.status_code, content={"detail": "The service is busy, please retry"},
+                        headers={"Retry-After": str(math.ceil(exc.retry_after))})
+
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    status = resources.status()
+    return JSONResponse(status_code=200 if status["status"] == "ready" else 503, content=status)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Translations of recent non-English text inputs
+translation_cache = TranslationCache(config.TRANSLATION_CACHE_MAX_ENTRIES)
+
+
+def local_query(text: str) -> Optional[dict]:
+    """
+    Resolves text input without an LLM call: English input is detected locally, other input may have a cached
+    translation.
+
+    Returns:
+        Optional[dict]: The `language`, English `text` and `language_code` of the input, or None.
+    """
+    detected = detect_language(text)
+    if detected and "text" in detected:
+        return detected
+    return translation_cache.get(text)
+
+
+async def translate_text(text: str) -> dict:
+    """
+    Detects the language of text input and translates it to English.
+
+    English input is detected locally and returned as is. Other input is served from the translation cache
+    when possible; only uncached input goes through the JSON translation chain.
+
+    Args:
+        text (str): The user input.
+
+    Returns:
+        dict: A dict with the `language`, English `text` and `language_code` of the input.
+    """
+    local = local_query(text)
+    if local:
+        return local
+    detected = detect_language(text)
+
+    async def translate() -> dict:
+        response_dict = await gemini_limiter.acall(lambda: resources.get().json_chain.ainvoke({
+            "query": f"""
+            User Input: {text}
+            Provide a JSON response with the following keys:
+            * language: The language of the input text.
+            * text: A proper English translation understandable by a native English speaker.
+            * language_code: The equivalent Google Cloud Platform language code for text-to-speech.
+            """
+        }))
+        if detected:
+            # Only scripts used by a single language are detected locally; for those the script beats the model's guess
+            response_dict.update(detected)
+        translation_cache.put(text, response_dict)
+        return response_dict
+
+    with stage("translate"):
+        return await translate_flight.do(normalize_query(text), translate)
+
+
+async def resolve_query(text: str, file: UploadFile, mode: str = "two_call") -> dict:
+    """
+    Turns the text or audio input of a request into its language, English text and language code.
+
+    The transcription already is the JSON the translation chain would produce; in single-call mode it is parsed
+    locally and only sent through the chain if it is not valid JSON.
+    """
+    if file:
+        audio_data = await file.read()
+        record_size("upload_bytes", len(audio_data))
+        with stage("audio_preprocess"):
+            audio = await run_blocking(preprocess_audio, audio_data, file.content_type or "audio/wav")
+        record_size("stt_bytes", len(audio.data))
+        record_size("stt_bytes_saved", audio.bytes_saved)
+        record_size("stt_trimmed_ms", int(audio.seconds_trimmed * 1000))
+        with stage("stt"):
+            gemini_resp = await gemini.aspeech_to_text(audio.data, audio.mime_type)
+        if mode == "single_call":
+            parsed = parse_transcription(gemini_resp)
+            if parsed:
+                return parsed
+        with stage("translate"):
+            return await translate_flight.do(("audio", gemini_resp),
+                                             lambda: gemini_limiter.acall(
+                                                 lambda: resources.get().json_chain.ainvoke({"query": gemini_resp})))
+    if text:
+        return await translate_text(text)
+    raise HTTPException(status_code=400, detail="Either text or audio file is required")
+
+
+def parse_transcription(transcription: str) -> Optional[dict]:
+    """
+    Parses the JSON returned by speech-to-text (possibly in a markdown code block), or returns None.
+    """
+    from langchain_core.output_parsers import JsonOutputParser
 
-@app.post("/chat")
-async def chat(text: str = Form(None), file: UploadFile = File(None)):
     try:
-        if file:
-            audio_data = await file.read()
-            file_location = "output.wav"
-            with open(file_location, "wb") as f:
-                f.write(audio_data)
-
-            gemini_resp = gemini.speech_to_text(file_location)
-            response_dict = json_chain.invoke({"query": gemini_resp})
-        elif text:
-            llm_response = json_chain.invoke({
-                "query": f"""
-                User Input: {text}
-                Provide a JSON response with the following keys:
-                * language: The language of the input text.
-                * text: A proper English translation understandable by a native English speaker.
-                * language_code: The equivalent Google Cloud Platform language code for text-to-speech.
-                """
-            })
-            response_dict = llm_response
-        else:
-            raise HTTPException(status_code=400, detail="Either text or audio file is required")
-
-        user_language = response_dict['language']
-        user_input = response_dict['text']
-        user_language_code = response_dict["language_code"]
-
-        docs = chroma.similarity_search(user_input)
-        context = " ".join(doc.page_content for doc in docs[:4])
-
-        if not context:
-            return {"message": "I don't have an answer to this question."}
-
-        prompt = f"""
+        parsed = JsonOutputParser().parse(transcription)
+    except Exception:
+        return None
+    if not isinstance(parsed, dict) or not all(parsed.get(key) for key in ("language", "text", "language_code")):
+        return None
+    return parsed
+
+
+def pipeline_mode(mode: Optional[str]) -> str:
+    mode = mode or config.CHAT_PIPELINE_MODE
+    if mode not in config.CHAT_PIPELINE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(config.CHAT_PIPELINE_MODES)}")
+    return mode
+
+
+def build_answer_prompt(user_input: str, context: str, user_language: str, user_language_code: str,
+                        history: str = "") -> str:
+    history = f"Conversation so far: {history}\n" if history else ""
+    return f"""
         You are a highly knowledgeable assistant specializing in Indian government schemes. 
         Your task is to provide clear, accurate, and actionable information to users about various government programs 
         related to areas like education, healthcare, agriculture, and insurance. 
         Your responses should be grounded in the provided context and include details about the scheme name, specific benefits, and eligibility criteria. 
         Ensure the information is delivered in a straightforward, conversational manner without using markdown formatting.
-        Example Query: {user_input}
+        {history}Example Query: {user_input}
         Context: {context}
         Answer in {user_language}. Language code: {user_language_code}.
         """
 
-        response = llm.invoke(prompt)
-        gemini.tts(response.content, user_language_code)
 
-        return {"response": response.content}
+def parse_tags(tags: Optional[str]) -> list[str]:
+    return [tag.strip() for tag in tags.split(",") if tag.strip()] if tags else []
+
+
+def session_conversation(session_id: Optional[str]) -> Optional[Conversation]:
+    """
+    Returns the memory of the session a request belongs to, or None for requests without a session.
+    """
+    if not session_id:
+        return None
+    if len(session_id) > config.SESSION_ID_MAX_LENGTH:
+        raise HTTPException(status_code=400,
+                            detail=f"session_id must be at most {config.SESSION_ID_MAX_LENGTH} characters")
+    return conversations.get(session_id)
+
+
+def scheme_ids_of(docs: list[Document]) -> list[str]:
+    return list(dict.fromkeys(doc.metadata["scheme_id"] for doc in docs if doc.metadata.get("scheme_id")))
 
+
+def remember(session_id: Optional[str], question: str, answer: str, scheme_ids: list[str]):
+    """
+    Records a turn of a session with the schemes its answer was based on.
+    """
+    if session_id:
+        conversations.append(session_id, question, answer, scheme_ids)
+
+
+async def retrieve(user_input: str, user_language_code: str, tags: list[str],
+                   conversation: Optional[Conversation] = None,
+                   ) -> tuple[Optional[list[float]], Optional[CachedAnswer], list[Document]]:
+    """
+    Finds the scheme documents for a query, or a cached answer to it.
+
+    A query that exactly names a scheme is answered from the lexical index without embedding it, and a follow-up
+    question in a session from the schemes retrieved for the previous turn. Otherwise the query is embedded,
+    looked up in the answer cache and, on a miss, searched with hybrid retrieval; for a question that refers back
+    to the previous turn but brings new content, the results are fused with the previous schemes.
+
+    Returns:
+        tuple: The query embedding (None for exact name matches and follow-ups), the cached answer if any, and the
+            documents.
+    """
+    hybrid_retriever = resources.get().hybrid_retriever
+    with stage("exact_match"):
+        docs = hybrid_retriever.exact_matches(user_input)
+    if docs:
+        return None, None, docs
+
+    previous_docs = []
+    if conversation is not None and conversation.scheme_ids and refers_back(user_input):
+        with stage("session_reuse"):
+            previous_docs = hybrid_retriever.scheme_documents(conversation.scheme_ids, tags)
+        # Without any of the previous schemes left under the tag filter, the follow-up is searched afresh
+        if previous_docs and is_follow_up(user_input):
+            return None, None, previous_docs
+
+    with stage("embed"):
+        query_embedding = await embed_flight.do(user_input, lambda: config.EMBEDDINGS.aembed_query(user_input))
+    with stage("answer_cache"):
+        cached = answer_cache.lookup(query_embedding, user_language_code, tags, extract_attributes(user_input))
+    if cached:
+        return query_embedding, cached, []
+
+    with stage("retrieval"):
+        docs = await retrieval_flight.do(
+            (user_input, tuple(sorted(tags))),
+            lambda: run_blocking(hybrid_retriever.search, user_input, query_embedding, config.RETRIEVAL_K, tags),
+        )
+    if previous_docs:
+        docs = fuse_rankings([docs, previous_docs], config.RETRIEVAL_K)
+    return query_embedding, None, docs
+
+
+async def no_answer(language_code: str) -> tuple[str, Optional[str]]:
+    """
+    Returns the localized "no answer" message and the audio_id of its (cached) synthesis.
+    """
+    message = config.NO_ANSWER_MESSAGES.get(language_code, config.NO_ANSWER_MESSAGES["en-IN"])
+    try:
+        with stage("tts"):
+            audio = await gemini.atts(message, language_code)
+    except Exception as e:
+        logger.warning(f"Could not synthesize the no-answer message: {e}")
+        return message, None
+    return message, await run_blocking(audio_store.put, audio, "audio/mpeg")
+
+
+def _trace_id() -> Optional[str]:
+    trace = metrics.current_trace()
+    return trace.trace_id if trace else None
+
+
+async def cached_response(cached: CachedAnswer) -> dict:
+    audio_id = None
+    if cached.audio is not None:
+        audio_id = await run_blocking(audio_store.put, cached.audio, cached.media_type)
+    return {"response": cached.answer, "audio_id": audio_id}
+
+
+async def answer_response(answer: str, language_code: str, query_embedding: Optional[list[float]],
+                          tags: list[str], scheme_ids: list[str], cache_scope: Optional[str] = None,
+                          query_attributes: Optional[dict[str, list[str]]] = None) -> dict:
+    """
+    Synthesizes an answer, stores its audio for download and caches it for similar queries, under `cache_scope`
+    if given instead of the language code and under the eligibility attributes of the query.
+    """
+    record_size("answer_chars", len(answer))
+    with stage("tts"):
+        audio = await gemini.atts(answer, language_code)
+    record_size("audio_bytes", len(audio))
+    audio_id = await run_blocking(audio_store.put, audio, "audio/mpeg")
+    if query_embedding is not None:
+        answer_cache.store(query_embedding, cache_scope or language_code,
+                           CachedAnswer(answer=answer, audio=audio, scheme_ids=scheme_ids), tags, query_attributes)
+    return {"response": answer, "audio_id": audio_id}
+
+
+# GCP text-to-speech language codes, e.g. "hi-IN"
+_LANGUAGE_CODE = re.compile(r"[a-z]{2,3}-[A-Z]{2}")
+
+
+async def structured_answer(text: str, context: str, history: str) -> Optional[dict]:
+    """
+    Runs the structured answer chain, calling it again (up to STRUCTURED_ANSWER_ATTEMPTS times) while the reply is
+    not valid JSON or has no answer.
+
+    Returns:
+        Optional[dict]: The reply, with a non-empty `answer`, or None if every reply was malformed. Its
+            `language_code` is not validated.
+    """
+    for attempt in range(1, config.STRUCTURED_ANSWER_ATTEMPTS + 1):
+        try:
+            result = await gemini_limiter.acall(lambda: resources.get().llm_svc.answer_chain().ainvoke(
+                {"question": text, "context": context, "history": history or "None"}))
+        except OutputParserException as e:
+            result = None
+            logger.warning(f"Unparsable structured answer (attempt {attempt}): {e}")
+        if isinstance(result, dict) and isinstance(result.get("answer"), str) and result["answer"].strip():
+            return result
+        if result is not None:
+            logger.warning(f"Structured answer without an answer (attempt {attempt}): {result!r}")
+    return None
+
+
+async def answer_in_one_call(text: str, tags: list[str], session_id: Optional[str] = None) -> dict:
+    """
+    Single-call pipeline for text that would need translating: retrieves with the query and the English terms the
+    glossary finds in it, then one structured generation returns the answer together with the language and language
+    code of the query.
+
+    A reply without a valid language code is answered in the language most likely for the script of the query;
+    if no reply has an answer, the query goes through the two-call pipeline instead.
+    """
+    detected = detect_language(text) or {}
+    language_code = detected.get("language_code")
+    fallback_code = script_language_code(text) or "en-IN"
+    # For scripts shared by several languages the answer language is only known from the model's reply, so those
+    # answers are cached under the script: the lookup and the store then use the same key
+    cache_scope = language_code or f"script:{script_name(text)}"
+    conversation = session_conversation(session_id)
+    history = conversation.history() if conversation else ""
+
+    query = retrieval_query(text)
+    query_embedding, cached, docs = await retrieve(query, cache_scope, tags, conversation)
+    if cached:
+        remember(session_id, text, cached.answer, cached.scheme_ids)
+        return await cached_response(cached)
+
+    context = build_context(docs, config.CONTEXT_TOKEN_BUDGET)
+    record_size("context_chars", len(context))
+    if not context:
+        message, audio_id = await no_answer(language_code or fallback_code)
+        return {"message": message, "audio_id": audio_id}
+
+    record_size("prompt_chars", len(text) + len(context) + len(history))
+    with stage("llm"):
+        result = await answer_flight.do(
+            hashlib.sha256(f"{text}\x00{context}\x00{history}".encode("utf-8")).hexdigest(),
+            lambda: structured_answer(text, context, history),
+        )
+    if result is None:
+        return await answer_chat(text, None, tags, "two_call", session_id)
+    reply_code = result.get("language_code")
+    if not (isinstance(reply_code, str) and _LANGUAGE_CODE.fullmatch(reply_code)):
+        reply_code = fallback_code
+    # Set only for scripts used by a single language, where the script is more reliable than the model's guess
+    language_code = language_code or reply_code
+    scheme_ids = scheme_ids_of(docs)
+    remember(session_id, text, result["answer"], scheme_ids)
+    # Answers that depend on the conversation are not reused for other users
+    return await answer_response(result["answer"], language_code, None if history else query_embedding, tags,
+                                 scheme_ids, cache_scope, extract_attributes(query))
+
+
+@app.post("/chat")
+async def chat(text: str = Form(None), file: UploadFile = File(None), tags: str = Form(None),
+               mode: str = Form(None), session_id: str = Form(None)):
+    """
+    Answers a text or voice query.
+
+    `mode` selects the pipeline (default CHAT_PIPELINE_MODE): `two_call` translates the query with one LLM call
+    and answers it with a second; `single_call` retrieves with the untranslated query and answers in one call.
+
+    Requests with the same `session_id` share a conversation: earlier turns are given to the model, and follow-up
+    questions are answered from the schemes found for the previous turn.
+    """
+    try:
+        response = await answer_chat(text, file, parse_tags(tags), pipeline_mode(mode), session_id)
+        return {**response, "session_id": session_id} if session_id else response
+    except (HTTPException, NotReadyError, OverloadedError):
+        raise
     except Exception as e:
-        logger.error(f"An error occurred: {e}")
+        logger.error(f"An error occurred (trace {_trace_id()}): {e}")
         raise HTTPException(status_code=500, detail="An internal error occurred")
 
 
-@app.get("/download")
-def download_file():
-    file_path = "output.mp3"
-    return FileResponse(file_path, media_type="audio/mpeg", filename="output.mp3")
+async def answer_chat(text: Optional[str], file: Optional[UploadFile], tags: list[str], mode: str,
+                      session_id: Optional[str]) -> dict:
+    if mode == "single_call" and text and not file and local_query(text) is None:
+        return await answer_in_one_call(text, tags, session_id)
+
+    conversation = session_conversation(session_id)
+    history = conversation.history() if conversation else ""
+    response_dict = await resolve_query(text, file, mode)
+
+    user_language = response_dict['language']
+    user_input = response_dict['text']
+    user_language_code = response_dict["language_code"]
+
+    query_embedding, cached, docs = await retrieve(user_input, user_language_code, tags, conversation)
+    if cached:
+        remember(session_id, user_input, cached.answer, cached.scheme_ids)
+        return await cached_response(cached)
+
+    context = build_context(docs, config.CONTEXT_TOKEN_BUDGET)
+    record_size("context_chars", len(context))
+
+    if not context:
+        message, audio_id = await no_answer(user_language_code)
+        return {"message": message, "audio_id": audio_id}
+
+    prompt = build_answer_prompt(user_input, context, user_language, user_language_code, history)
+    record_size("prompt_chars", len(prompt))
+
+    with stage("llm"):
+        response = await answer_flight.do(hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+                                          lambda: gemini_limiter.acall(lambda: resources.get().llm.ainvoke(prompt)))
+    scheme_ids = scheme_ids_of(docs)
+    remember(session_id, user_input, response.content, scheme_ids)
+    # Answers that depend on the conversation are not reused for other users
+    return await answer_response(response.content, user_language_code, None if history else query_embedding, tags,
+                                 scheme_ids, query_attributes=extract_attributes(user_input))
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(text: str = Form(None), file: UploadFile = File(None), tags: str = Form(None),
+                      session_id: str = Form(None)):
+    """
+    Server-sent events version of /chat (including its `session_id`).
+
+    Emits a `meta` event with the detected language, `token` events as the answer is generated, an `audio` event
+    with an audio_id for every sentence as soon as it has been synthesized, and a final `done` event.
+    """
+    try:
+        # Fail with 503 before the stream starts rather than with an error event inside it
+        resources.get()
+        conversation = session_conversation(session_id)
+        response_dict = await resolve_query(text, file)
+    except (HTTPException, NotReadyError, OverloadedError):
+        raise
+    except Exception as e:
+        logger.error(f"An error occurred (trace {_trace_id()}): {e}")
+        raise HTTPException(status_code=500, detail="An internal error occurred")
+
+    user_language = response_dict['language']
+    user_input = response_dict['text']
+    user_language_code = response_dict["language_code"]
+    tag_list = parse_tags(tags)
+
+    async def synthesize(sentence: str) -> bytes:
+        with stage("tts"):
+            audio = await gemini.atts(sentence, user_language_code)
+        record_size("audio_bytes", len(audio))
+        return audio
+
+    async def events():
+        meta = {"language": user_language, "language_code": user_language_code}
+        yield _sse_event("meta", {**meta, "session_id": session_id} if session_id else meta)
+        try:
+            query_embedding, cached, docs = await retrieve(user_input, user_language_code, tag_list, conversation)
+            if cached:
+                remember(session_id, user_input, cached.answer, cached.scheme_ids)
+                yield _sse_event("token", {"text": cached.answer})
+                if cached.audio is not None:
+                    audio_id = await run_blocking(audio_store.put, cached.audio, cached.media_type)
+                    yield _sse_event("audio", {"index": 0, "text": cached.answer, "audio_id": audio_id})
+                yield _sse_event("done", {"response": cached.answer})
+                return
+
+            context = build_context(docs, config.CONTEXT_TOKEN_BUDGET)
+            record_size("context_chars", len(context))
+            if not context:
+                message, audio_id = await no_answer(user_language_code)
+                if audio_id is not None:
+                    yield _sse_event("audio", {"index": 0, "text": message, "audio_id": audio_id})
+                yield _sse_event("done", {"message": message})
+                return
+
+            history = conversation.history() if conversation else ""
+            prompt = build_answer_prompt(user_input, context, user_language, user_language_code, history)
+            record_size("prompt_chars", len(prompt))
+            answer, audio = [], []
+            # A streamed answer cannot be retried halfway, so it only goes through admission control, whose slot
+            # is held while the LLM stream is read, not while the client reads the events
+            async for kind, payload in stream_answer(resources.get().llm, prompt, synthesize, gemini_limiter.aslot):
+                if kind == "token":
+                    answer.append(payload)
+                    yield _sse_event("token", {"text": payload})
+                else:
+                    index, sentence, sentence_audio = payload
+                    audio.append(sentence_audio)
+                    audio_id = await run_blocking(audio_store.put, sentence_audio, "audio/mpeg")
+                    yield _sse_event("audio", {"index": index, "text": sentence, "audio_id": audio_id})
+
+            response = "".join(answer)
+            scheme_ids = scheme_ids_of(docs)
+            remember(session_id, user_input, response, scheme_ids)
+            # MP3 frames can be concatenated, so the sentence audio doubles as the audio of the whole answer
+            if query_embedding is not None and not history:
+                answer_cache.store(query_embedding, user_language_code,
+                                   CachedAnswer(answer=response, audio=b"".join(audio), scheme_ids=scheme_ids),
+                                   tag_list, extract_attributes(user_input))
+            yield _sse_event("done", {"response": response})
+        except OverloadedError as e:
+            logger.warning(f"Request shed (trace {_trace_id()}): {e}")
+            yield _sse_event("error", {"detail": "The service is busy, please retry", "status": e.status_code,
+                                       "retry_after": e.retry_after})
+        except Exception as e:
+            logger.error(f"An error occurred (trace {_trace_id()}): {e}")
+            yield _sse_event("error", {"detail": "An internal error occurred"})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {**answer_cache.stats(), "tts": gemini.tts_cache.stats(), "eligibility": eligibility_stats(),
+            "sessions": conversations.stats()}
+
+
+@app.get("/download/{audio_id}")
+def download_file(audio_id: str):
+    audio = audio_store.get(audio_id)
+    if audio is None:
+        raise HTTPException(status_code=404, detail="Audio not found or expired")
+
+    data, media_type = audio
+    return Response(content=data, media_type=media_type,
+                    headers={"Content-Disposition": f'attachment; filename="{audio_id}.mp3"'})
 
 
 if __name__ == "__main__":
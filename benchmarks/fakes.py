@@ -0,0 +1,184 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Answer returned by the fake LLM; several sentences so streaming and sentence-level TTS have work to do
+FAKE_ANSWER = (
+    "The Pradhan Mantri Kisan Samman Nidhi scheme gives eligible farmer families six thousand rupees a year. "
+    "The amount is paid in three equal instalments directly into the bank account of the beneficiary. "
+    "All landholding farmer families are eligible, subject to a few exclusions such as income tax payers. "
+    "You can apply online on the PM Kisan portal or at your nearest Common Service Centre."
+)
+
+_USER_INPUT_PATTERN = re.compile(r"User Input:\s*(.*)")
+
+
+class FakeQuotaError(Exception):
+    """
+    Quota error of a fake upstream, shaped like the 429 / RESOURCE_EXHAUSTED errors of Google APIs.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"429 RESOURCE_EXHAUSTED: quota exceeded, retry in {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+class FakeQuota:
+    """
+    Simulated per-second quota of a fake upstream: calls beyond `requests_per_second` (after a burst of
+    `burst` calls) fail with FakeQuotaError, which carries the delay until the next call would succeed.
+    """
+
+    def __init__(self, requests_per_second: float, burst: int = 1):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.rejected = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def check(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.requests_per_second)
+            self._updated = now
+            if self._tokens < 1:
+                self.rejected += 1
+                raise FakeQuotaError((1 - self._tokens) / self.requests_per_second)
+            self._tokens -= 1
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic local stand-in for ChatGoogleGenerativeAI.
+
+    Prompts asking for the language JSON get a JSON translation of the user input, prompts asking for the answer
+    JSON get FAKE_ANSWER with a language, and all other prompts get FAKE_ANSWER. Every call sleeps `latency`
+    seconds, spread over the tokens when streaming. With a `quota`, calls beyond it fail like quota errors.
+    """
+
+    latency: float = 0.0
+    quota: Optional[Any] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @staticmethod
+    def _respond(messages: list[BaseMessage]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        if "* answer:" in prompt:
+            return json.dumps({"answer": FAKE_ANSWER, "language": "Hindi", "language_code": "hi-IN"})
+        if "language_code" in prompt and "JSON" in prompt:
+            match = _USER_INPUT_PATTERN.search(prompt)
+            text = match.group(1).strip() if match else "What schemes are available for farmers?"
+            return json.dumps({"language": "Hindi", "text": text, "language_code": "hi-IN"})
+        return FAKE_ANSWER
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        if self.quota:
+            self.quota.check()
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._respond(messages)))])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None,
+                         **kwargs: Any) -> ChatResult:
+        if self.quota:
+            self.quota.check()
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._respond(messages)))])
+
+    def _stream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        if self.quota:
+            self.quota.check()
+        tokens = re.findall(r"\S+\s*", self._respond(messages))
+        for token in tokens:
+            time.sleep(self.latency / len(tokens))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        if self.quota:
+            self.quota.check()
+        tokens = re.findall(r"\S+\s*", self._respond(messages))
+        for token in tokens:
+            await asyncio.sleep(self.latency / len(tokens))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class FakeSpeech:
+    """
+    Local stand-ins for `speech_to_text.gemini.speech_to_text` and `speech_to_text.gemini.tts`.
+
+    Args:
+        stt_latency: Seconds each transcription takes.
+        tts_latency: Seconds each synthesis takes.
+        bytes_per_char: Size of the fake audio per character of synthesized text.
+        tts_quota: Simulated quota of the TTS API, if any.
+    """
+
+    def __init__(self, stt_latency: float = 0.0, tts_latency: float = 0.0, bytes_per_char: int = 200,
+                 tts_quota: Optional[FakeQuota] = None):
+        self.stt_latency = stt_latency
+        self.tts_latency = tts_latency
+        self.bytes_per_char = bytes_per_char
+        self.tts_quota = tts_quota
+
+    def speech_to_text(self, audio_data: bytes, mime_type: str = "audio/wav") -> str:
+        time.sleep(self.stt_latency)
+        return json.dumps({"language": "English", "text": "What schemes are available for farmers?",
+                           "language_code": "en-IN"})
+
+    def tts(self, message: str, language: str) -> bytes:
+        if self.tts_quota:
+            self.tts_quota.check()
+        time.sleep(self.tts_latency)
+        return b"\xff\xf3" * (len(message) * self.bytes_per_char // 2)
+
+
+_STATES = ["Tamil Nadu", "Kerala", "Bihar", "Maharashtra", "Gujarat", "Odisha", "Punjab", "Assam", "All India"]
+_TAGS = ["Agriculture", "Education", "Health", "Insurance", "Pension", "Scholarship", "Women", "Housing", "Skill"]
+_BENEFICIARIES = ["farmers", "girl students", "senior citizens", "widows", "fishermen", "artisans", "pregnant women"]
+
+
+def make_schemes(count: int, seed: int = 0) -> list[dict]:
+    """
+    Generates a synthetic corpus shaped like myschemes_scraped.json.
+
+    Args:
+        count (int): The number of schemes.
+        seed (int): The random seed, so runs are comparable.
+
+    Returns:
+        list[dict]: The schemes.
+    """
+    rng = random.Random(seed)
+    schemes = []
+    for number in range(count):
+        beneficiary = rng.choice(_BENEFICIARIES)
+        state = rng.choice(_STATES)
+        name = f"{state} {rng.choice(_TAGS)} Assistance Scheme for {beneficiary.title()} {number}"
+        schemes.append({
+            "sr_no": str(number + 1),
+            "scheme_name": name,
+            "scheme_link": f"https://www.myscheme.gov.in/schemes/scheme-{number}",
+            "tags": rng.sample(_TAGS, 3),
+            "details": f"{name} supports {beneficiary} in {state}. " * rng.randint(2, 8),
+            "benefits": f"Financial assistance of Rs. {rng.randint(1, 100) * 1000} per year to {beneficiary}. " * 3,
+            "eligibility": f"The applicant must be one of the {beneficiary} resident in {state}, aged between "
+                           f"{rng.randint(14, 40)} and {rng.randint(41, 80)} years, with family income below "
+                           f"Rs. {rng.randint(1, 8)} lakh.",
+            "application_process": "Apply online through the scheme portal or at the nearest Common Service Centre.",
+            "documents_required": "Aadhaar card, income certificate, residence certificate, bank account details.",
+        })
+    return schemes
@@ -0,0 +1,455 @@
+"""
+Offline benchmarks of the /chat pipeline and the scheme index, using local stand-ins for every Google API.
+
+Run from the repository root, e.g.:
+
+    python -m benchmarks.run chat --concurrency 1 8 32 --llm-latency 0.5 --output chat.json
+    python -m benchmarks.run chat --concurrency 1 8 32 --llm-latency 0.5 --mode single_call --output single.json
+    python -m benchmarks.run index --sizes 100 1000 10000 50000 --output index.json
+    python -m benchmarks.run vectors --sizes 1000 10000 --output vectors.json
+    python -m benchmarks.run import
+
+Results are printed (or written to --output) as JSON so runs can be compared.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_QUERIES = [
+    "What schemes are available for farmers?",
+    "scholarship for girls",
+    "pension for senior citizens in Tamil Nadu",
+    "पीएम किसान योजना के लिए कौन पात्र है",
+    "மகளிர் உதவித்தொகை திட்டம்",
+    "housing assistance for widows",
+]
+
+
+def percentiles(values: list[float]) -> dict:
+    """
+    Returns p50/p95/p99 (nearest rank), mean and max of the values, in milliseconds.
+    """
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] * 1000
+
+    return {"p50_ms": rank(50), "p95_ms": rank(95), "p99_ms": rank(99),
+            "mean_ms": statistics.fmean(ordered) * 1000, "max_ms": ordered[-1] * 1000}
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def process_memory_mb() -> dict:
+    """
+    Returns the peak RSS of this process and its current split into private (anonymous) and shared (file-backed)
+    pages, in MB. Unlike ru_maxrss, these are not inherited from the parent process. Linux only.
+    """
+    fields = {"VmHWM": "peak_rss_mb", "RssAnon": "private_rss_mb", "RssFile": "file_rss_mb"}
+    memory = {}
+    with open("/proc/self/status", encoding="utf-8") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in fields:
+                memory[fields[name]] = int(value.split()[0]) / 1024
+    return memory
+
+
+def prepare_workdir(workdir: str, corpus_size: int):
+    """
+    Points the app at a synthetic corpus in `workdir` and at local stand-ins instead of Google APIs.
+
+    Must run before `configs.config` is imported, since the config reads the environment at import time.
+    """
+    from benchmarks.fakes import make_schemes
+
+    os.makedirs(workdir, exist_ok=True)
+    with open(os.path.join(workdir, "myschemes_scraped.json"), "w", encoding="utf-8") as f:
+        json.dump(make_schemes(corpus_size), f)
+
+    os.environ["EMBEDDINGS_BACKEND"] = "fake"
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embeddings.sqlite3")
+    os.environ["CHROMA_PERSIST_DIRECTORY"] = os.path.join(workdir, "chroma_db")
+    os.chdir(workdir)
+
+
+def install_fakes(args):
+    """
+    Replaces the LLM, embeddings, speech-to-text and TTS backends with local stand-ins.
+
+    Only the upstream calls are replaced, so admission control (and, with --tts-cache, the audio cache) still
+    apply. With --upstream-rps the fake Gemini and TTS APIs reject calls beyond that rate with quota errors.
+    """
+    import configs.config as config
+    import llm_setup.llm_setup as llm_setup
+    import speech_to_text.gemini as gemini
+    from benchmarks.fakes import FakeChatModel, FakeQuota, FakeSpeech
+    from services.ratelimit import upstream_limiter
+    from stores.audio_cache import AudioCache
+    from stores.embeddings import BatchedCachedEmbeddings, FakeEmbeddings
+
+    rps = getattr(args, "upstream_rps", 0.0)
+    llm_quota = FakeQuota(rps, burst=max(1, int(rps))) if rps else None
+    tts_quota = FakeQuota(rps, burst=max(1, int(rps))) if rps else None
+    llm_setup._initialize_llm = lambda model: (FakeChatModel(latency=args.llm_latency, quota=llm_quota), None)
+    config.EMBEDDINGS = BatchedCachedEmbeddings(FakeEmbeddings(size=args.dim, latency=args.embed_latency),
+                                                batch_size=config.EMBEDDING_BATCH_SIZE,
+                                                max_concurrency=config.EMBEDDING_MAX_CONCURRENCY,
+                                                cache_path=None, limiter=upstream_limiter("embeddings"))
+    speech = FakeSpeech(stt_latency=args.stt_latency, tts_latency=args.tts_latency, tts_quota=tts_quota)
+    gemini._speech_to_text = speech.speech_to_text
+    gemini._tts = speech.tts
+    if not getattr(args, "tts_cache", False):
+        gemini._tts_cache = AudioCache(0)
+
+
+async def _run_level(request, queries: list[str], concurrency: int, total: int) -> dict:
+    latencies, errors = [], {}
+    queue = asyncio.Queue()
+    for number in range(total):
+        queue.put_nowait(queries[number % len(queries)])
+
+    async def worker():
+        while not queue.empty():
+            query = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                latencies.append(await request(query) or (time.perf_counter() - started))
+            except Exception as e:
+                # Shed requests are counted by status code, so 429/503 can be told apart from failures
+                kind = str(getattr(e, "status_code", None) or type(e).__name__)
+                errors[kind] = errors.get(kind, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"concurrency": concurrency, "requests": total, "errors": sum(errors.values()), "errors_by_kind": errors,
+            "seconds": elapsed,
+            "throughput_rps": len(latencies) / elapsed if elapsed else 0.0, **percentiles(latencies)}
+
+
+# Follow-ups asked after each query by the `session` target
+FOLLOW_UP_QUERIES = ["And for my daughter?", "How do I apply for it?"]
+
+
+def bench_chat(args) -> dict:
+    """
+    Benchmarks /chat (latency) and /chat/stream (time to first audio) at several concurrency levels.
+    """
+    prepare_workdir(args.workdir, args.corpus_size)
+    install_fakes(args)
+    app = importlib.import_module("app")
+
+    started = time.perf_counter()
+    app.resources.set(app.build_resources())
+    time_to_ready = time.perf_counter() - started
+
+    if not args.semantic_cache:
+        # Every request then runs the full pipeline, including the translation of non-English queries
+        app.answer_cache.threshold = float("inf")
+        app.translation_cache.max_entries = 0
+
+    async def chat(query):
+        response = await app.chat(text=query, file=None, tags=None, mode=args.mode, session_id=None)
+        if "response" not in response and "message" not in response:
+            raise RuntimeError(response)
+
+    session_numbers = iter(range(1 << 62))
+
+    async def session(query):
+        # A question and its follow-ups in one session; the follow-ups reuse the schemes of the first turn
+        session_id = f"bench-{next(session_numbers)}"
+        for text in (query, *FOLLOW_UP_QUERIES):
+            response = await app.chat(text=text, file=None, tags=None, mode=args.mode, session_id=session_id)
+            if "response" not in response and "message" not in response:
+                raise RuntimeError(response)
+
+    async def stream(query):
+        # Time to the first synthesized sentence
+        started_at = time.perf_counter()
+        first_audio = None
+        response = await app.chat_stream(text=query, file=None, tags=None, session_id=None)
+        async for chunk in response.body_iterator:
+            if first_audio is None and chunk.startswith("event: audio"):
+                first_audio = time.perf_counter() - started_at
+        return first_audio
+
+    async def rag(query):
+        await app.resources.get().llm_svc.conversational_rag_chain().ainvoke(query)
+
+    targets = {"chat": chat, "stream": stream, "rag": rag, "session": session}
+
+    async def run():
+        results = {}
+        for target in args.targets:
+            results[target] = [
+                await _run_level(targets[target], DEFAULT_QUERIES, level, max(args.requests, level))
+                for level in args.concurrency
+            ]
+        return results
+
+    return {"time_to_ready_seconds": time_to_ready, "corpus_size": args.corpus_size,
+            "levels": asyncio.run(run()), "sessions": app.conversations.stats(), "max_rss_mb": max_rss_mb()}
+
+
+# Queries whose eligibility attributes narrow the schemes searched, see stores.eligibility
+ELIGIBILITY_QUERIES = [
+    "I am a 65 year old widow, what pension can I get?",
+    "Schemes for farmers in Tamil Nadu with income of 2 lakh",
+    "Scholarship for girl students aged 16 in Kerala",
+    "Loans for fishermen in Odisha",
+]
+
+
+def bench_index(args) -> dict:
+    """
+    Benchmarks loading the corpus, building the Chroma and lexical indexes and reopening the persisted index.
+
+    Loading is measured for both the scraped JSON file (all chunks parsed) and the JSONL corpus (only the index
+    loaded), as time, peak Python allocations and allocations still held afterwards. The eligibility index is
+    timed for extraction and reload, with the fraction of schemes left to search for sample queries.
+    """
+    prepare_workdir(args.workdir, 0)
+    install_fakes(args)
+    import configs.config as config
+    from benchmarks.fakes import make_schemes
+    from processing.corpus import SchemeCorpus, write_corpus
+    from processing.documents import load_json_to_langchain_document_schema
+    from stores.chroma import store_embeddings
+    from stores.eligibility import load_eligibility_index
+    from stores.lexical import LexicalIndex
+
+    results = []
+    for size in args.sizes:
+        directory = os.path.join(args.workdir, f"corpus-{size}")
+        os.makedirs(directory, exist_ok=True)
+        corpus_path = os.path.join(directory, "myschemes_scraped.json")
+        schemes = make_schemes(size)
+        with open(corpus_path, "w", encoding="utf-8") as f:
+            json.dump(schemes, f)
+        jsonl_path = os.path.join(directory, "myschemes_scraped.jsonl")
+        write_corpus(schemes, jsonl_path)
+        del schemes
+
+        tracemalloc.start()
+        corpus_started = time.perf_counter()
+        corpus = SchemeCorpus(jsonl_path)
+        corpus_opened = time.perf_counter()
+        corpus_retained, corpus_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Eligibility attributes: extracted from the corpus once, then loaded from the sidecar file
+        eligibility_started = time.perf_counter()
+        load_eligibility_index(corpus)
+        eligibility_extracted = time.perf_counter()
+        eligibility_index = load_eligibility_index(corpus)
+        eligibility_loaded = time.perf_counter()
+        narrowed = [eligibility_index.candidates(query) for query in ELIGIBILITY_QUERIES]
+        eligible_fraction = statistics.mean(len(eligibility_index) if ids is None else len(ids)
+                                            for ids in narrowed) / max(1, len(eligibility_index))
+        corpus.close()
+        del corpus
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        documents = load_json_to_langchain_document_schema(corpus_path)
+        loaded = time.perf_counter()
+        load_retained, load_peak = tracemalloc.get_traced_memory()
+
+        store_embeddings(documents, config.EMBEDDINGS, persist_directory=os.path.join(directory, "chroma_db"))
+        built = time.perf_counter()
+        LexicalIndex(documents)
+        lexical_built = time.perf_counter()
+        _, build_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Unchanged corpus: the persisted index is reopened without embedding anything
+        store_embeddings(documents, config.EMBEDDINGS, persist_directory=os.path.join(directory, "chroma_db"))
+        reopened = time.perf_counter()
+
+        results.append({
+            "schemes": size,
+            "chunks": len(documents),
+            "load_seconds": loaded - started,
+            "load_peak_python_mb": load_peak / (1024 * 1024),
+            "load_retained_python_mb": load_retained / (1024 * 1024),
+            "corpus_open_seconds": corpus_opened - corpus_started,
+            "corpus_open_peak_python_mb": corpus_peak / (1024 * 1024),
+            "corpus_open_retained_python_mb": corpus_retained / (1024 * 1024),
+            "eligibility_extract_seconds": eligibility_extracted - eligibility_started,
+            "eligibility_load_seconds": eligibility_loaded - eligibility_extracted,
+            "eligibility_candidate_fraction": eligible_fraction,
+            "index_build_seconds": built - loaded,
+            "lexical_build_seconds": lexical_built - built,
+            "build_peak_python_mb": build_peak / (1024 * 1024),
+            "index_reopen_seconds": reopened - lexical_built,
+            "max_rss_mb": max_rss_mb(),
+        })
+    return {"sizes": results}
+
+
+VECTOR_BACKENDS = ["chroma", "mmap-float32", "mmap-float16", "mmap-int8"]
+
+# Opens a vector store in a fresh interpreter and times queries against it, so memory is that of one worker
+_VECTOR_QUERY_CODE = """
+import json, random, sys, time
+sys.path.insert(0, {root!r})
+from benchmarks.run import percentiles, process_memory_mb
+from stores.embeddings import FakeEmbeddings
+embeddings = FakeEmbeddings(size={dim})
+started = time.perf_counter()
+if {backend!r} == "chroma":
+    from langchain_community.vectorstores import Chroma
+    import configs.config as config
+    store = Chroma(collection_name=config.CHROMA_COLLECTION_NAME, embedding_function=embeddings,
+                   persist_directory={directory!r})
+else:
+    from stores.mmap_index import MmapVectorStore
+    store = MmapVectorStore({directory!r}, embeddings)
+opened = time.perf_counter() - started
+rng = random.Random(0)
+queries = [embeddings.embed_query(f"query {{rng.random()}}") for _ in range({queries})]
+latencies = []
+for query in queries:
+    started = time.perf_counter()
+    store.similarity_search_by_vector(query, k={k})
+    latencies.append(time.perf_counter() - started)
+print(json.dumps({{"open_seconds": opened, "query": percentiles(latencies), **process_memory_mb()}}))
+"""
+
+
+def bench_vectors(args) -> dict:
+    """
+    Compares Chroma with the memory-mapped index (per storage type): build time, index size on disk, and the
+    query latency and RSS of a process serving queries.
+    """
+    prepare_workdir(args.workdir, 0)
+    install_fakes(args)
+    import configs.config as config
+    from benchmarks.fakes import make_schemes
+    from processing.documents import scheme_to_documents
+    from stores.chroma import store_embeddings
+    from stores.mmap_index import store_mmap_embeddings
+
+    def disk_mb(path):
+        return sum(os.path.getsize(os.path.join(directory, name))
+                   for directory, _, names in os.walk(path) for name in names) / (1024 * 1024)
+
+    results = []
+    for size in args.sizes:
+        documents = [document for position, scheme in enumerate(make_schemes(size))
+                     for document in scheme_to_documents(scheme, position)]
+        for backend in args.backends:
+            directory = os.path.join(args.workdir, f"vectors-{size}-{backend}")
+            started = time.perf_counter()
+            if backend == "chroma":
+                store_embeddings(documents, config.EMBEDDINGS, persist_directory=directory)
+                index_directory = directory
+            else:
+                store = store_mmap_embeddings(documents, config.EMBEDDINGS, directory, backend.split("-")[1])
+                index_directory = store.directory
+            built = time.perf_counter() - started
+
+            code = _VECTOR_QUERY_CODE.format(root=REPO_ROOT, dim=args.dim, backend=backend,
+                                             directory=index_directory, queries=args.queries, k=args.k)
+            output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True,
+                                    env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)})
+            results.append({"schemes": size, "chunks": len(documents), "backend": backend,
+                            "build_seconds": built, "disk_mb": disk_mb(directory),
+                            **json.loads(output.stdout.strip().splitlines()[-1])})
+    return {"results": results}
+
+
+def bench_import(args) -> dict:
+    """
+    Measures the time to import the app in a fresh interpreter.
+    """
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    timings = []
+    for _ in range(args.repeat):
+        output = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, check=True, capture_output=True,
+                                text=True, env={**os.environ, "EMBEDDINGS_BACKEND": "fake"})
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+    return {"import_seconds": percentiles(timings), "repeat": args.repeat}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--workdir", default=None, help="Directory for the synthetic corpus and indexes")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per fake LLM call")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds per fake embedding call")
+    parser.add_argument("--stt-latency", type=float, default=0.0, help="Seconds per fake transcription")
+    parser.add_argument("--tts-latency", type=float, default=0.0, help="Seconds per fake synthesis")
+    parser.add_argument("--dim", type=int, default=768, help="Dimension of the fake embeddings")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    chat_parser = subparsers.add_parser("chat", help="Latency and throughput of /chat and /chat/stream")
+    chat_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    chat_parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    chat_parser.add_argument("--corpus-size", type=int, default=1000)
+    chat_parser.add_argument("--targets", nargs="+", choices=["chat", "stream", "rag", "session"],
+                             default=["chat", "stream"])
+    chat_parser.add_argument("--mode", choices=["two_call", "single_call"], default="two_call",
+                             help="Pipeline of /chat")
+    chat_parser.add_argument("--tts-cache", action="store_true", help="Keep the synthesized audio cache enabled")
+    chat_parser.add_argument("--upstream-rps", type=float, default=0.0,
+                             help="Simulated quota (requests per second) of the fake Gemini and TTS APIs")
+    chat_parser.add_argument("--semantic-cache", action="store_true", help="Keep the semantic answer cache enabled")
+
+    index_parser = subparsers.add_parser("index", help="Corpus load and index build time and memory")
+    index_parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+
+    vectors_parser = subparsers.add_parser("vectors", help="Chroma vs memory-mapped index latency and RSS")
+    vectors_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    vectors_parser.add_argument("--backends", nargs="+", default=VECTOR_BACKENDS, choices=VECTOR_BACKENDS)
+    vectors_parser.add_argument("--queries", type=int, default=200, help="Queries per backend")
+    vectors_parser.add_argument("-k", type=int, default=30, help="Results per query")
+
+    import_parser = subparsers.add_parser("import", help="Import time of the app")
+    import_parser.add_argument("--repeat", type=int, default=5)
+
+    args = parser.parse_args()
+    args.workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="udhavibot-bench-"))
+    output = os.path.abspath(args.output) if args.output else None
+    sys.path.insert(0, REPO_ROOT)
+
+    benchmarks = {"chat": bench_chat, "index": bench_index, "vectors": bench_vectors, "import": bench_import}
+    report = {
+        "benchmark": args.benchmark,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": benchmarks[args.benchmark](args),
+    }
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 from dotenv import load_dotenv
 import os
+import sys
 import getpass as getpass
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+import threading
 load_dotenv()
 
 CHUNK_SIZE = 2400
@@ -31,10 +31,160 @@ MAX_SIZE = 100
 #     model_kwargs={"device": "cuda"},
 # )
 
-EMBEDDINGS = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+# Embedding pipeline: batching, bounded concurrency, retries on rate limits and a persistent cache.
+# Set EMBEDDINGS_BACKEND=fake to use a deterministic local embedder (offline runs and benchmarks).
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "google")
+EMBEDDING_BATCH_SIZE = 100
+EMBEDDING_MAX_CONCURRENCY = 4
+EMBEDDING_MAX_RETRIES = 5
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "cache/embeddings.sqlite3")
 START_WEB_SCRAPING_MYSCHEMES = False
 
+# Scheme corpus: one JSON line per scheme plus an index of IDs, names, tags and byte offsets (see processing.corpus).
+# The JSON file written by earlier versions of the scraper is converted on first start.
+CORPUS_PATH = os.getenv("CORPUS_PATH", "myschemes_scraped.jsonl")
+SCRAPED_JSON_PATH = "myschemes_scraped.json"
+
+# Persistent Chroma index; only new or changed schemes are re-embedded on startup
+CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "chroma_db")
+CHROMA_COLLECTION_NAME = "myschemes"
+
+# Vector store: "chroma", or "mmap" for an exact index in memory-mapped files whose pages all workers share.
+# MMAP_INDEX_DTYPE stores the embeddings as float32, float16 or int8.
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+MMAP_INDEX_DIRECTORY = os.getenv("MMAP_INDEX_DIRECTORY", "mmap_index")
+MMAP_INDEX_DTYPE = os.getenv("MMAP_INDEX_DTYPE", "float32")
+
+# Hybrid retrieval: chunks retrieved per query, and results taken from each of BM25 and vector search
+RETRIEVAL_K = 12
+HYBRID_FETCH_K = 30
+
+# Narrow retrieval to the schemes whose eligibility (age, gender, state, occupation, income, caste category) fits
+# the attributes detected in the query; see processing.eligibility
+ELIGIBILITY_PREFILTER = os.getenv("ELIGIBILITY_PREFILTER", "true").lower() == "true"
+
+# Maximum estimated tokens of scheme context packed into the answer prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+
+# Maximum number of threads used to run blocking client calls off the event loop
+BLOCKING_CALL_WORKERS = int(os.getenv("BLOCKING_CALL_WORKERS", "32"))
+
+# Per-request audio served from /download/{audio_id}
+AUDIO_TTL_SECONDS = 600
+AUDIO_STORE_MAX_BYTES = 256 * 1024 * 1024
+AUDIO_SPILL_THRESHOLD_BYTES = 1024 * 1024
+
+# Pipeline of /chat: "two_call" translates the query and answers it in separate LLM calls, "single_call" answers
+# the untranslated query in one structured call. Can be overridden per request with the `mode` form field.
+CHAT_PIPELINE_MODES = ("two_call", "single_call")
+CHAT_PIPELINE_MODE = os.getenv("CHAT_PIPELINE_MODE", "two_call")
+# Calls of the structured answer chain before a malformed reply (invalid JSON, no answer) falls back to "two_call"
+STRUCTURED_ANSWER_ATTEMPTS = 2
+
+# Conversation memory of /chat sessions (the `session_id` form field): turns kept verbatim per session, older turns
+# compacted into a summary, idle sessions forgotten and least recently used sessions evicted beyond the total budget
+SESSION_MAX_TURNS = 4
+SESSION_MAX_BYTES = 16 * 1024
+SESSION_SUMMARY_MAX_CHARS = 1000
+SESSION_TTL_SECONDS = 30 * 60
+SESSION_STORE_MAX_BYTES = int(os.getenv("SESSION_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+SESSION_ID_MAX_LENGTH = 128
+
+# Speech-to-text audio preprocessing: 16 kHz mono, silence trimmed by an energy-based VAD
+STT_SAMPLE_RATE = 16000
+STT_VAD_FRAME_MS = 20
+STT_VAD_THRESHOLD_DB = -40
+STT_VAD_PADDING_MS = 200
+# Clips up to this size are sent inline with the prompt instead of through the File API
+STT_INLINE_MAX_BYTES = 4 * 1024 * 1024
+
+# Synthesized audio cache: memory LRU tier plus a size-capped disk tier
+TTS_CACHE_MEMORY_BYTES = 64 * 1024 * 1024
+TTS_CACHE_DIRECTORY = os.getenv("TTS_CACHE_DIRECTORY", "cache/tts")
+TTS_CACHE_DISK_BYTES = 1024 * 1024 * 1024
+
+# Fixed reply when no scheme matches, per TTS language code; synthesized at startup if TTS_PRESYNTHESIZE is set
+NO_ANSWER_MESSAGES = {
+    "en-IN": "I don't have an answer to this question.",
+    "hi-IN": "मेरे पास इस प्रश्न का उत्तर नहीं है।",
+    "ta-IN": "இந்தக் கேள்விக்கு என்னிடம் பதில் இல்லை.",
+    "te-IN": "ఈ ప్రశ్నకు నా దగ్గర సమాధానం లేదు.",
+    "kn-IN": "ಈ ಪ್ರಶ್ನೆಗೆ ನನ್ನ ಬಳಿ ಉತ್ತರವಿಲ್ಲ.",
+    "ml-IN": "ഈ ചോദ്യത്തിന് എന്റെ പക്കൽ ഉത്തരമില്ല.",
+    "bn-IN": "এই প্রশ্নের উত্তর আমার কাছে নেই।",
+    "mr-IN": "माझ्याकडे या प्रश्नाचे उत्तर नाही.",
+    "gu-IN": "મારી પાસે આ પ્રશ્નનો જવાબ નથી.",
+    "pa-IN": "ਮੇਰੇ ਕੋਲ ਇਸ ਸਵਾਲ ਦਾ ਜਵਾਬ ਨਹੀਂ ਹੈ।",
+    "or-IN": "ଏହି ପ୍ରଶ୍ନର ଉତ୍ତର ମୋ ପାଖରେ ନାହିଁ।",
+    "ur-IN": "میرے پاس اس سوال کا جواب نہیں ہے۔",
+}
+TTS_PRESYNTHESIZE = os.getenv("TTS_PRESYNTHESIZE", "true").lower() == "true"
+
+# Semantic answer cache keyed by the embedded English query and target language code
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = 1024
+SEMANTIC_CACHE_TTL_SECONDS = 6 * 60 * 60
+
+# Recent translations of non-English text input, reused instead of calling the translation chain again
+TRANSLATION_CACHE_MAX_ENTRIES = 4096
+
+
+# Requests slower than this (seconds) are logged with their per-stage breakdown; 0 disables the log
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "5"))
+
+# Admission control per upstream API: sustained requests per second, burst size and concurrent calls. Callers
+# beyond that queue (at most ADMISSION_QUEUE_SIZE, for at most ADMISSION_MAX_WAIT_SECONDS) or are shed with 503.
+UPSTREAM_LIMITS = {
+    "gemini": {"requests_per_second": float(os.getenv("GEMINI_RPS", "5")), "burst": 10, "max_concurrency": 16},
+    "embeddings": {"requests_per_second": float(os.getenv("EMBEDDINGS_RPS", "25")), "burst": 50,
+                   "max_concurrency": 16},
+    "tts": {"requests_per_second": float(os.getenv("TTS_RPS", "10")), "burst": 20, "max_concurrency": 16},
+}
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "10"))
+# Retries of upstream quota errors (honoring the upstream's retry delay) before failing with 429
+UPSTREAM_MAX_RETRIES = 2
+UPSTREAM_BACKOFF_SECONDS = 1.0
+
+# Build the scheme index and LLM clients in the background after startup; /readyz reports when they are done
+LAZY_STARTUP = os.getenv("LAZY_STARTUP", "true").lower() == "true"
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def _create_embeddings():
+    from services.ratelimit import upstream_limiter
+    from stores.embeddings import BatchedCachedEmbeddings, FakeEmbeddings
+
+    if EMBEDDINGS_BACKEND == "fake":
+        backend = FakeEmbeddings()
+    else:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        backend = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    return BatchedCachedEmbeddings(
+        backend,
+        batch_size=EMBEDDING_BATCH_SIZE,
+        max_concurrency=EMBEDDING_MAX_CONCURRENCY,
+        max_retries=EMBEDDING_MAX_RETRIES,
+        cache_path=EMBEDDING_CACHE_PATH,
+        limiter=upstream_limiter("embeddings"),
+    )
+
+
+def __getattr__(name):
+    # EMBEDDINGS is created on first use, so importing the config does not import the embedding backends
+    global _embeddings
+    if name == "EMBEDDINGS":
+        with _embeddings_lock:
+            if _embeddings is None:
+                _embeddings = _create_embeddings()
+        return _embeddings
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def set_envs():
     if "GOOGLE_API_KEY" not in os.environ:
+        if not sys.stdin.isatty():
+            raise RuntimeError("GOOGLE_API_KEY is not set")
         os.environ["GOOGLE_API_KEY"] = getpass.getpass(os.getenv("GOOGLE_API_KEY"))
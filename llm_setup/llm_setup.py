@@ -1,6 +1,6 @@
 from typing import Optional
-from langchain_google_vertexai import ChatVertexAI
 
+from pydantic import BaseModel
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import (
     ChatPromptTemplate,
@@ -8,11 +8,36 @@ from langchain_core.prompts import (
     HumanMessagePromptTemplate
 )
 from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from processing.documents import format_documents
 from langchain_core.vectorstores import VectorStoreRetriever
 
 
+# Prompt of the single-call pipeline: answers in the user's language and reports the language it detected
+ANSWER_PROMPT = """
+        You are a highly knowledgeable assistant specializing in Indian government schemes. 
+        Your task is to provide clear, accurate, and actionable information to users about various government programs 
+        related to areas like education, healthcare, agriculture, and insurance. 
+        Your responses should be grounded in the provided context and include details about the scheme name, specific benefits, and eligibility criteria. 
+        Ensure the information is delivered in a straightforward, conversational manner without using markdown formatting.
+        The query may be in any Indian language, in its own script or romanized. Answer in the language of the query.
+        Conversation so far: {history}
+        Query: {question}
+        Context: {context}
+        Provide a JSON response with the following keys:
+        * answer: The answer, in the language of the query.
+        * language: The language of the query.
+        * language_code: The equivalent Google Cloud Platform language code for text-to-speech.
+        {format_instructions}
+        """
+
+
+class StructuredAnswer(BaseModel):
+    answer: str
+    language: str
+    language_code: str
+
+
 def _initialize_llm(model: str) -> tuple[Optional[ChatGoogleGenerativeAI], Optional[str]]:
     """
     Initializes the LLM instance.
@@ -41,6 +66,7 @@ class LLMService:
 
     def __init__(self, logger, qa_system_prompt: str, web_retriever: VectorStoreRetriever):
         self._conversational_rag_chain = None
+        self._answer_chain = None
         self.error = None
         self._logger = logger
         self.qa_system_prompt = qa_system_prompt
@@ -56,6 +82,11 @@ class LLMService:
             self.error = error
             return
 
+        error = self._initialize_answer_chain()
+        if error:
+            self.error = error
+            return
+
     def _initialize_conversational_rag_chain(self) -> str | None:
         """
         Initializes the conversational RAG chain.
@@ -80,6 +111,35 @@ class LLMService:
         except Exception as e:
             return str(e)
 
+    def _initialize_answer_chain(self) -> str | None:
+        """
+        Initializes the structured answer chain, which answers a query and detects its language in one LLM call.
+
+        Returns:
+            An error message as a string if initialization fails, otherwise None.
+        """
+        try:
+            parser = JsonOutputParser(pydantic_object=StructuredAnswer)
+            prompt = PromptTemplate(
+                template=ANSWER_PROMPT,
+                input_variables=["context", "question", "history"],
+                partial_variables={"format_instructions": parser.get_format_instructions()},
+            )
+            self._answer_chain = prompt | self.llm | parser
+            return None
+        except Exception as e:
+            return str(e)
+
+    def answer_chain(self):
+        """
+        Returns the structured answer chain. It takes `question`, `context` and `history` (the conversation so far,
+        "None" for a new conversation) and returns a dict with the `answer`, `language` and `language_code`.
+
+        Returns:
+            The structured answer chain instance.
+        """
+        return self._answer_chain
+
     def conversational_rag_chain(self):
         """
         Returns the initialized conversational RAG chain.
@@ -0,0 +1,63 @@
+import hashlib
+
+from langchain_core.documents import Document
+
+from processing.documents import SCHEME_SECTIONS
+
+# Rough number of characters per token, used to estimate prompt sizes without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _section_text(chunk: Document) -> str:
+    """
+    Returns a chunk as "<section title>: <text>", without the scheme name already given in the scheme header.
+    """
+    section = chunk.metadata.get("section")
+    if section not in SCHEME_SECTIONS or "\n" not in chunk.page_content:
+        return chunk.page_content
+    body = chunk.page_content.split("\n", 1)[1]
+    return f"{SCHEME_SECTIONS[section]}: {body}"
+
+
+def build_context(documents: list[Document], token_budget: int) -> str:
+    """
+    Assembles retrieved chunks into a prompt context of at most `token_budget` (estimated) tokens.
+
+    Duplicate chunks are dropped and chunks are taken in retrieval order until the budget is spent. The kept chunks
+    are then grouped by scheme, schemes in the order of their best chunk and sections in their natural order.
+
+    Args:
+        documents (list[Document]): The retrieved chunks, best first.
+        token_budget (int): The maximum number of tokens of the context.
+
+    Returns:
+        str: The context, or an empty string if there are no documents.
+    """
+    seen = set()
+    kept: dict[str, list[Document]] = {}
+    used = 0
+    for document in documents:
+        digest = hashlib.sha256(document.page_content.encode("utf-8")).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+
+        cost = estimate_tokens(document.page_content)
+        if used + cost > token_budget:
+            continue
+        used += cost
+        kept.setdefault(document.metadata.get("scheme_id", ""), []).append(document)
+
+    section_order = {section: order for order, section in enumerate(SCHEME_SECTIONS)}
+    blocks = []
+    for chunks in kept.values():
+        chunks.sort(key=lambda chunk: (section_order.get(chunk.metadata.get("section"), len(section_order)),
+                                       chunk.metadata.get("part", 0)))
+        link = chunks[0].metadata.get("scheme_link")
+        header = f"Scheme: {chunks[0].metadata.get('scheme_name', '')}" + (f" ({link})" if link else "")
+        blocks.append("\n".join([header] + [_section_text(chunk) for chunk in chunks]))
+    return "\n\n".join(blocks)
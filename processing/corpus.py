@@ -0,0 +1,228 @@
+import json
+import mmap
+import os
+import threading
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional
+
+from langchain_core.documents import Document
+
+from processing.documents import scheme_id, scheme_to_documents
+
+
+@dataclass
+class SchemeEntry:
+    """
+    What is kept in memory per scheme: its ID, name and tags, and where its line is in the corpus file.
+    """
+    scheme_id: str
+    scheme_name: str
+    tags: list[str]
+    offset: int
+    length: int
+
+
+def index_path(corpus_path: str) -> str:
+    return f"{corpus_path}.index"
+
+
+def _entry(scheme: dict, position: int, offset: int, length: int) -> SchemeEntry:
+    return SchemeEntry(scheme_id(scheme, position), scheme.get("scheme_name") or "", list(scheme.get("tags") or []),
+                       offset, length)
+
+
+def _entry_line(entry: SchemeEntry) -> str:
+    return json.dumps([entry.scheme_id, entry.scheme_name, entry.tags, entry.offset, entry.length],
+                      ensure_ascii=False) + "\n"
+
+
+class CorpusWriter:
+    """
+    Appends schemes to a corpus: one JSON line per scheme in the corpus file, plus a line with its ID, name, tags
+    and byte range in the index file.
+
+    An incomplete last line left by an interrupted run is cut off before appending.
+
+    Args:
+        path: Path of the corpus (JSONL) file; the index is written next to it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.exists(path):
+            _truncate_partial_line(path)
+        if not _index_is_current(path):
+            build_index(path)
+        self._corpus = open(path, "ab")
+        self._index = open(index_path(path), "a", encoding="utf-8")
+        with open(index_path(path), encoding="utf-8") as f:
+            self._count = sum(1 for _ in f)
+        self._lock = threading.Lock()
+
+    def append(self, scheme: dict):
+        line = json.dumps(scheme, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            offset = self._corpus.tell()
+            self._corpus.write(line)
+            self._corpus.flush()
+            self._index.write(_entry_line(_entry(scheme, self._count, offset, len(line))))
+            self._index.flush()
+            self._count += 1
+
+    def close(self):
+        self._corpus.close()
+        self._index.close()
+
+    def __enter__(self) -> "CorpusWriter":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def _truncate_partial_line(path: str):
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Walk back to the end of the last complete line
+        position = size
+        while position > 0:
+            step = min(65536, position)
+            f.seek(position - step)
+            newline = f.read(step).rfind(b"\n")
+            if newline >= 0:
+                f.truncate(position - step + newline + 1)
+                return
+            position -= step
+        f.truncate(0)
+
+
+def _index_is_current(path: str) -> bool:
+    """
+    Checks that the index covers the corpus file exactly, i.e. its last entry ends where the file ends.
+    """
+    if not os.path.exists(path):
+        return not os.path.exists(index_path(path)) or os.path.getsize(index_path(path)) == 0
+    if not os.path.exists(index_path(path)):
+        return os.path.getsize(path) == 0
+    last = None
+    with open(index_path(path), encoding="utf-8") as f:
+        for last in f:
+            pass
+    if last is None:
+        return os.path.getsize(path) == 0
+    try:
+        *_, offset, length = json.loads(last)
+    except ValueError:
+        return False
+    return offset + length == os.path.getsize(path)
+
+
+def build_index(path: str):
+    """
+    (Re)builds the index of a corpus file by streaming through it, one scheme at a time.
+    """
+    temp_path = f"{index_path(path)}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as index:
+        if os.path.exists(path):
+            with open(path, "rb") as corpus:
+                offset = 0
+                for position, line in enumerate(corpus):
+                    index.write(_entry_line(_entry(json.loads(line), position, offset, len(line))))
+                    offset += len(line)
+    os.replace(temp_path, index_path(path))
+
+
+def write_corpus(schemes: Iterable[dict], path: str):
+    """
+    Writes schemes to a new corpus (and its index), replacing any existing one.
+    """
+    for existing in (path, index_path(path)):
+        if os.path.exists(existing):
+            os.remove(existing)
+    with CorpusWriter(path) as writer:
+        for scheme in schemes:
+            writer.append(scheme)
+
+
+class SchemeCorpus:
+    """
+    Read access to a corpus written by `CorpusWriter`.
+
+    Only the index (ID, name and tags of every scheme) is loaded. The corpus file is memory-mapped and a scheme
+    is parsed from it only when it is asked for, e.g. when it goes into a prompt.
+
+    Args:
+        path: Path of the corpus (JSONL) file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if not _index_is_current(path):
+            build_index(path)
+
+        self.entries: list[SchemeEntry] = []
+        with open(index_path(path), encoding="utf-8") as f:
+            for line in f:
+                self.entries.append(SchemeEntry(*json.loads(line)))
+        self._positions = {entry.scheme_id: position for position, entry in enumerate(self.entries)}
+
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.entries else None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, scheme_id: str) -> bool:
+        return scheme_id in self._positions
+
+    def _read(self, position: int) -> dict:
+        entry = self.entries[position]
+        return json.loads(self._mmap[entry.offset:entry.offset + entry.length])
+
+    def scheme(self, scheme_id: str) -> Optional[dict]:
+        """
+        Reads a scheme from the corpus file.
+
+        Args:
+            scheme_id (str): The ID of the scheme.
+
+        Returns:
+            Optional[dict]: The scraped scheme, or None if there is no such scheme.
+        """
+        position = self._positions.get(scheme_id)
+        return None if position is None else self._read(position)
+
+    def documents(self, scheme_id: str) -> List[Document]:
+        """
+        Returns the chunks of a scheme, see `scheme_to_documents`.
+        """
+        position = self._positions.get(scheme_id)
+        return [] if position is None else scheme_to_documents(self._read(position), position)
+
+    def iter_documents(self) -> Iterator[Document]:
+        """
+        Yields the chunks of every scheme, reading one scheme at a time.
+        """
+        for position in range(len(self.entries)):
+            yield from scheme_to_documents(self._read(position), position)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+
+def open_corpus(path: str, legacy_json_path: Optional[str] = None) -> SchemeCorpus:
+    """
+    Opens the corpus at `path`, converting the scraped schemes JSON file at `legacy_json_path` first if there is no
+    corpus yet.
+    """
+    if not os.path.exists(path) and legacy_json_path and os.path.exists(legacy_json_path):
+        with open(legacy_json_path, encoding="utf-8") as f:
+            write_corpus(json.load(f), path)
+    return SchemeCorpus(path)
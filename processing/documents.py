@@ -1,9 +1,23 @@
-from langchain_community.document_loaders import WebBaseLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 from typing import Iterable, List
 import json
-from langchain.schema import Document
-from langchain_community.document_loaders import JSONLoader
+from langchain_core.documents import Document
+
+import configs.config as config
+
+# Scraped scheme fields that become separate chunks, in the order they are presented in prompts
+SCHEME_SECTIONS = {
+    "details": "Details",
+    "benefits": "Benefits",
+    "eligibility": "Eligibility",
+    "application_process": "Application Process",
+    "documents_required": "Documents Required",
+}
+
+# Separator of the scheme tags stored in chunk metadata (vector store metadata values must be scalars)
+TAG_SEPARATOR = "|"
+
+_MISSING_VALUE = "Not Available"
 
 
 def load_documents(website: str) -> list[Document]:
@@ -16,6 +30,8 @@ def load_documents(website: str) -> list[Document]:
     Returns:
         list[Document]: A list of loaded documents.
     """
+    from langchain_community.document_loaders import WebBaseLoader
+
     loader = WebBaseLoader(website)
     return loader.load()
 
@@ -43,24 +59,69 @@ def split_documents(documents: Iterable[Document]) -> list[Document]:
     Returns:
         list[Document]: A list of split documents.
     """
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=config.CHUNK_SIZE, chunk_overlap=config.CHUNK_OVERLAP)
     return text_splitter.split_documents(documents)
 
 
+def scheme_id(scheme: dict, position: int) -> str:
+    """
+    Returns a stable ID for a scraped scheme: the slug of its link, or its position if it has no link.
+    """
+    link = (scheme.get("scheme_link") or "").rstrip("/")
+    return link.rsplit("/", 1)[-1] if link else f"scheme-{position}"
+
+
+def scheme_to_documents(scheme: dict, position: int) -> List[Document]:
+    """
+    Splits a scraped scheme into one chunk per section (details, benefits, eligibility, ...).
+
+    Sections longer than CHUNK_SIZE are split further. Every chunk starts with the scheme name and section title
+    and carries the scheme's ID, name, link, tags and section in its metadata.
+
+    Args:
+        scheme (dict): The scraped scheme.
+        position (int): The position of the scheme in the scraped file, used if the scheme has no link.
+
+    Returns:
+        List[Document]: The chunks of the scheme.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=config.CHUNK_SIZE, chunk_overlap=config.CHUNK_OVERLAP)
+    scheme_name = scheme.get("scheme_name") or ""
+    metadata = {
+        "scheme_id": scheme_id(scheme, position),
+        "scheme_name": scheme_name,
+        "scheme_link": scheme.get("scheme_link") or "",
+        "tags": TAG_SEPARATOR.join(scheme.get("tags") or []),
+    }
+
+    documents = []
+    for section, title in SCHEME_SECTIONS.items():
+        value = (scheme.get(section) or "").strip()
+        if not value or value == _MISSING_VALUE:
+            continue
+        for part, text in enumerate(text_splitter.split_text(value)):
+            documents.append(Document(
+                page_content=f"{scheme_name} - {title}\n{text}",
+                metadata={**metadata, "section": section, "part": part,
+                          "chunk_id": f"{metadata['scheme_id']}:{section}:{part}"},
+            ))
+    return documents
+
+
 def load_json_to_langchain_document_schema(file_path: str) -> List[Document]:
     """
-    Reads a JSON file and returns a list of Document objects.
+    Reads the scraped schemes JSON file and returns its schemes as section-level Document chunks.
 
     Args:
         file_path (str): The path to the JSON file.
 
     Returns:
-        List[Document]: A list of Document objects from the JSON file.
+        List[Document]: A list of Document chunks, see `scheme_to_documents`.
     """
-    loader = JSONLoader(
-        file_path=file_path,
-        jq_schema='.[]',
-        text_content=False)
+    with open(file_path, encoding="utf-8") as f:
+        schemes = json.load(f)
 
-    documents = loader.load()
+    documents = []
+    for position, scheme in enumerate(schemes):
+        documents.extend(scheme_to_documents(scheme, position))
     return documents
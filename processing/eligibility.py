@@ -0,0 +1,235 @@
+"""
+Extraction of structured eligibility attributes (gender, age, state, occupation, income, caste category) from
+scheme texts and user queries.
+
+Run as a module to extract the attributes of every scheme of a corpus ahead of time:
+
+    python -m processing.eligibility myschemes_scraped.jsonl
+"""
+import json
+import math
+import os
+import re
+import sys
+from typing import Iterable, Optional
+
+from processing.corpus import SchemeCorpus
+
+ATTRIBUTES = ("gender", "age", "state", "occupation", "income", "caste")
+# Version of the extraction rules, part of the name of the attribute files so files of older rules are not reused
+EXTRACTION_VERSION = 2
+
+# Age and annual family income are bucketed, so a scheme's range and a query's value meet in the same buckets
+AGE_BANDS = [(0, 5, "0-5"), (6, 13, "6-13"), (14, 17, "14-17"), (18, 25, "18-25"), (26, 35, "26-35"),
+             (36, 45, "36-45"), (46, 59, "46-59"), (60, 150, "60+")]
+INCOME_BANDS = [(0, 100000, "upto-1l"), (100001, 250000, "1l-2.5l"), (250001, 500000, "2.5l-5l"),
+                (500001, 800000, "5l-8l"), (800001, math.inf, "above-8l")]
+
+_GENDER_TERMS = {
+    "female": r"wom[ae]n|girls?|females?|widows?|mothers?|pregnant|daughters?|lad(?:y|ies)|wives|wife",
+    "male": r"m[ae]n|boys?|males?",
+    "transgender": r"transgenders?|third gender",
+}
+_OCCUPATION_TERMS = {
+    "farmer": r"farmers?|farming|agricultur\w*|cultivators?|kisans?",
+    "student": r"students?|scholars?|pupils?|studying",
+    "fisherman": r"fisher(?:man|men|folk|ies|woman|women)?",
+    "artisan": r"artisans?|craftsm[ae]n|weavers?|handloom|handicrafts?",
+    "worker": r"labou?rers?|workers?|labou?r",
+    "entrepreneur": r"entrepreneurs?|msmes?|start-?ups?|self[- ]employed|business(?:es)?",
+}
+_CASTE_TERMS = {
+    "sc": r"scheduled castes?",
+    "st": r"scheduled tribes?",
+    "obc": r"other backward class(?:es)?|obcs?",
+    "minority": r"minorit(?:y|ies)",
+    "ews": r"economically weaker sections?",
+}
+# Abbreviations that are only taken in capitals, "ST" but not "st"
+_CASTE_ABBREVIATIONS = {"sc": r"SCs?", "st": r"STs?", "ews": r"EWS"}
+_STATES = [
+    "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh", "Goa", "Gujarat", "Haryana",
+    "Himachal Pradesh", "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra", "Manipur",
+    "Meghalaya", "Mizoram", "Nagaland", "Odisha", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana",
+    "Tripura", "Uttar Pradesh", "Uttarakhand", "West Bengal", "Andaman and Nicobar Islands", "Chandigarh",
+    "Dadra and Nagar Haveli and Daman and Diu", "Delhi", "Jammu and Kashmir", "Ladakh", "Lakshadweep", "Puducherry",
+]
+_STATE_ALIASES = {"orissa": "Odisha", "pondicherry": "Puducherry", "uttaranchal": "Uttarakhand",
+                  "nct of delhi": "Delhi", "j&k": "Jammu and Kashmir"}
+
+
+def _terms_pattern(terms: dict[str, str]) -> list[tuple[str, re.Pattern]]:
+    return [(value, re.compile(rf"\b(?:{pattern})\b", re.IGNORECASE)) for value, pattern in terms.items()]
+
+
+_GENDER_PATTERNS = _terms_pattern(_GENDER_TERMS)
+_OCCUPATION_PATTERNS = _terms_pattern(_OCCUPATION_TERMS)
+_CASTE_PATTERNS = _terms_pattern(_CASTE_TERMS) + [(value, re.compile(rf"\b(?:{pattern})\b"))
+                                                   for value, pattern in _CASTE_ABBREVIATIONS.items()]
+_STATE_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(name) for name in sorted([*_STATES, *_STATE_ALIASES], key=len, reverse=True)) + r")\b",
+    re.IGNORECASE)
+_STATE_NAMES = {name.lower(): name for name in _STATES} | _STATE_ALIASES
+
+_YEARS = r"\s*(?:years?|yrs?)"
+_AGE_RANGE = re.compile(rf"\b(\d{{1,3}})(?:{_YEARS})?\s*(?:-|to|and)\s*(\d{{1,3}}){_YEARS}", re.IGNORECASE)
+_AGE_MIN = re.compile(rf"\b(?<!not )(?:above|over|more than|at least|not less than|minimum(?: age)?(?: of)?)\s*"
+                      rf"(\d{{1,3}}){_YEARS}", re.IGNORECASE)
+_AGE_MAX = re.compile(rf"\b(?<!not )(?:below|under|less than|up to|upto|not more than|maximum(?: age)?(?: of)?)\s*"
+                      rf"(\d{{1,3}}){_YEARS}", re.IGNORECASE)
+_AGE_EXACT = re.compile(rf"\b(\d{{1,3}}){_YEARS}[\s-]*old\b|\bage(?:d)?\s*(?:is\s*)?(\d{{1,3}})\b|\bi am (\d{{1,3}})\b",
+                        re.IGNORECASE)
+_SENIOR = re.compile(r"\b(?:senior citizens?|elderly|old age)\b", re.IGNORECASE)
+
+# Clauses: sentences (a period followed by a capital, so "Rs. 2 lakh" stays whole), list items and clauses joined
+# by "but" or by "and" before a new requirement ("... and should not be ...")
+_CLAUSE_BREAK = re.compile(r"[;\n•]|\.\s+(?=[A-Z(])|\bbut\b"
+                           r"|\band\s+(?=(?:should|must|shall|is|are|has|have|does|do)\b)", re.IGNORECASE)
+# Clauses that exclude or merely favour a group ("should not be covered under a pension scheme for workers",
+# "women get preference") do not restrict who is eligible, so nothing is extracted from them. Limits worded with
+# "not" ("should not exceed Rs. 2 lakh", "not less than 18 years") are restrictions and are kept.
+_NOT_RESTRICTING = re.compile(r"\b(?:not(?!\s+(?:exceed\w*|more than|less than|above|below|over|under)\b)"
+                              r"|no|never|neither|nor|except|excluding|exclud(?:e|es|ed)|other than|ineligible"
+                              r"|irrespective|regardless|preference|preferred|preferential|priority|prioriti[sz]ed)\b"
+                              r"|n't\b", re.IGNORECASE)
+
+_AMOUNT = r"(?:rs\.?|inr|₹)?\s*([\d][\d,]*(?:\.\d+)?)\s*(lakhs?|lacs?|crores?|thousand|k)?\b"
+_INCOME_CAP = re.compile(rf"\bincome\b[^.;]{{0,60}}?\b(?:below|under|less than|up to|upto|not exceeding|not exceed"
+                         rf"|not more than|does not exceed|within|maximum of)\s*{_AMOUNT}", re.IGNORECASE)
+_INCOME_VALUE = re.compile(rf"\b(?:income|earn|earns|earning)\b[^.;\d]{{0,30}}{_AMOUNT}", re.IGNORECASE)
+_UNITS = {"lakh": 100000, "lac": 100000, "crore": 10000000, "thousand": 1000, "k": 1000}
+
+
+def _age_bands(low: int, high: int) -> set[str]:
+    return {band for start, end, band in AGE_BANDS if start <= high and low <= end}
+
+
+def _amount(number: str, unit: Optional[str]) -> Optional[float]:
+    try:
+        value = float(number.replace(",", ""))
+    except ValueError:
+        return None
+    if unit:
+        value *= _UNITS[unit.lower().rstrip("s")]
+    return value
+
+
+def _income_bands(low: float, high: float) -> set[str]:
+    return {band for start, end, band in INCOME_BANDS if start <= high and low <= end}
+
+
+def _ages(text: str) -> set[str]:
+    bands = set()
+    for low, high in _AGE_RANGE.findall(text):
+        if int(low) <= int(high):
+            bands |= _age_bands(int(low), int(high))
+    for low in _AGE_MIN.findall(text):
+        bands |= _age_bands(int(low), 150)
+    for high in _AGE_MAX.findall(text):
+        bands |= _age_bands(0, int(high))
+    for groups in _AGE_EXACT.findall(text):
+        age = next(int(group) for group in groups if group)
+        bands |= _age_bands(age, age)
+    if _SENIOR.search(text):
+        bands |= _age_bands(60, 150)
+    return bands
+
+
+def _incomes(text: str) -> set[str]:
+    bands = set()
+    caps = _INCOME_CAP.findall(text)
+    for number, unit in caps:
+        amount = _amount(number, unit)
+        if amount:
+            bands |= _income_bands(0, amount)
+    if not caps:
+        for number, unit in _INCOME_VALUE.findall(text):
+            amount = _amount(number, unit)
+            if amount:
+                bands |= _income_bands(amount, amount)
+    return bands
+
+
+def restricting_text(text: str) -> str:
+    """
+    Returns the clauses of a text that can restrict eligibility, without those with negation or preference wording.
+    """
+    return "\n".join(clause for clause in _CLAUSE_BREAK.split(text) if not _NOT_RESTRICTING.search(clause))
+
+
+def extract_attributes(text: str) -> dict[str, list[str]]:
+    """
+    Extracts the eligibility attributes mentioned in a text, e.g. "widows above 60 years in Tamil Nadu" gives
+    {"gender": ["female"], "age": ["60+"], "state": ["Tamil Nadu"]}.
+
+    Ages and incomes are returned as the bands (AGE_BANDS, INCOME_BANDS) they cover: a range for scheme texts
+    ("aged 18 to 40 years", "income below Rs. 2 lakh"), a single band for a query ("I am 65"). Clauses with
+    negation or preference wording are skipped, see `restricting_text`.
+
+    Args:
+        text (str): A scheme's eligibility text or a user query.
+
+    Returns:
+        dict[str, list[str]]: The values found per attribute; attributes not mentioned are absent.
+    """
+    text = restricting_text(text)
+    attributes = {
+        "gender": {value for value, pattern in _GENDER_PATTERNS if pattern.search(text)},
+        "age": _ages(text),
+        "state": {_STATE_NAMES[match.lower()] for match in _STATE_PATTERN.findall(text)},
+        "occupation": {value for value, pattern in _OCCUPATION_PATTERNS if pattern.search(text)},
+        "income": _incomes(text),
+        "caste": {value for value, pattern in _CASTE_PATTERNS if pattern.search(text)},
+    }
+    return {attribute: sorted(values) for attribute, values in attributes.items() if values}
+
+
+def scheme_attributes(scheme: dict) -> dict[str, list[str]]:
+    """
+    Extracts the eligibility attributes of a scraped scheme from its eligibility text. The state is also taken
+    from the scheme name and tags, since state schemes often only name the state there.
+    """
+    attributes = extract_attributes(scheme.get("eligibility") or "")
+    states = extract_attributes(" ".join([scheme.get("scheme_name") or "", *(scheme.get("tags") or [])]))
+    if "state" in states:
+        attributes["state"] = sorted(set(attributes.get("state", [])) | set(states["state"]))
+    return attributes
+
+
+def attributes_path(corpus_path: str) -> str:
+    return f"{corpus_path}.eligibility-v{EXTRACTION_VERSION}"
+
+
+def write_attributes(records: Iterable[tuple[str, dict]], path: str):
+    """
+    Writes (scheme ID, attributes) pairs as JSON lines.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        for scheme_id, attributes in records:
+            f.write(json.dumps([scheme_id, attributes], ensure_ascii=False) + "\n")
+    os.replace(temp_path, path)
+
+
+def read_attributes(path: str) -> list[tuple[str, dict]]:
+    with open(path, encoding="utf-8") as f:
+        return [tuple(json.loads(line)) for line in f]
+
+
+def extract_corpus(corpus: SchemeCorpus) -> list[tuple[str, dict]]:
+    """
+    Extracts the attributes of every scheme of a corpus, reading one scheme at a time, and stores them next to it.
+    """
+    records = [(entry.scheme_id, scheme_attributes(corpus.scheme(entry.scheme_id))) for entry in corpus.entries]
+    write_attributes(records, attributes_path(corpus.path))
+    return records
+
+
+if __name__ == "__main__":
+    scheme_corpus = SchemeCorpus(sys.argv[1] if len(sys.argv) > 1 else "myschemes_scraped.jsonl")
+    try:
+        extracted = extract_corpus(scheme_corpus)
+    finally:
+        scheme_corpus.close()
+    counts = {attribute: sum(1 for _, attributes in extracted if attribute in attributes) for attribute in ATTRIBUTES}
+    print(json.dumps({"schemes": len(extracted), "schemes_with_attribute": counts}, indent=2))
@@ -4,3 +4,45 @@ def clean_text(text: str) -> str:
     """
     cleaned_text = text.replace("\n", " ").strip()
     return cleaned_text
+
+
+class SentenceSplitter:
+    """
+    Incrementally splits streamed text into sentences.
+
+    Text is fed chunk by chunk; a sentence is emitted once it ends with a sentence terminator
+    (., ?, !, or the Devanagari danda) followed by whitespace and is at least `min_length` characters long.
+
+    Args:
+        min_length: Minimum sentence length, so short fragments like "Rs." are merged with what follows.
+    """
+
+    _TERMINATORS = ".?!।॥"
+
+    def __init__(self, min_length: int = 20):
+        self.min_length = min_length
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> list[str]:
+        """
+        Adds a chunk of text and returns the sentences completed by it.
+        """
+        self._buffer += chunk
+        sentences = []
+        start = 0
+        for index in range(1, len(self._buffer)):
+            if self._buffer[index - 1] in self._TERMINATORS and self._buffer[index].isspace():
+                sentence = self._buffer[start:index].strip()
+                if len(sentence) >= self.min_length:
+                    sentences.append(sentence)
+                    start = index
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> list[str]:
+        """
+        Returns the remaining buffered text as a final sentence, if any.
+        """
+        sentence = clean_text(self._buffer)
+        self._buffer = ""
+        return [sentence] if sentence else []
@@ -2,27 +2,57 @@ import copy
 import json
 import os
 import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import requests
+from bs4 import BeautifulSoup
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium import webdriver
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
+from processing.corpus import CorpusWriter
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+MYSCHEME_URL = 'https://rules.myscheme.in/'
 
-class MySchemeScraper:
-    def __init__(self):
-        self.myscheme_url = 'https://rules.myscheme.in/'
+# Scheme page sections, by the id of the element holding them
+SCHEME_SECTIONS = {
+    'details': 'details',
+    'benefits': 'benefits',
+    'eligibility': 'eligibility',
+    'application_process': 'application-process',
+    'documents_required': 'documents-required',
+}
+
+
+def scheme_slug(scheme: dict) -> str:
+    return scheme['scheme_link'].rstrip('/').rsplit('/', 1)[-1]
+
+
+class SeleniumSchemeFetcher:
+    """
+    Fetches scheme pages with a Firefox driver, for pages rendered client side.
+
+    Args:
+        timeout: Seconds to wait for a page to render.
+    """
+
+    def __init__(self, timeout: float = 20):
+        self.timeout = timeout
         self.driver = webdriver.Firefox()
 
-    def get_scheme_links(self):
-        self.driver.get(self.myscheme_url)
+    def get_scheme_links(self, url: str) -> list[dict]:
+        self.driver.get(url)
         scheme_links = []
 
         try:
-            WebDriverWait(self.driver, 20).until(EC.visibility_of_element_located((By.ID, "__next")))
+            WebDriverWait(self.driver, self.timeout).until(EC.visibility_of_element_located((By.ID, "__next")))
             result_elements = self.driver.find_element(By.ID, '__next').find_element(By.TAG_NAME,
                                                                                      'tbody').find_elements(By.TAG_NAME,
                                                                                                             'tr')
@@ -43,65 +73,199 @@ class MySchemeScraper:
 
         return scheme_links
 
-    def get_scheme_details(self, scheme_links):
-        for scheme in scheme_links:
-            self.driver.get(scheme['scheme_link'])
+    def get_scheme_details(self, scheme: dict) -> dict:
+        """
+        Returns a copy of the scheme with its page sections and tags; raises TimeoutException if the page never loads.
+        """
+        scheme = copy.copy(scheme)
+        self.driver.get(scheme['scheme_link'])
+        WebDriverWait(self.driver, self.timeout).until(EC.visibility_of_element_located((By.ID, "__next")))
+
+        # Extract tags with exception handling
+        try:
+            tags_elements = self.driver.find_elements(By.XPATH, '//div[@id="tags"]/div')
+            scheme['tags'] = [i.text for i in tags_elements]
+        except NoSuchElementException:
+            scheme['tags'] = []
+
+        # Extract each section with exception handling
+        for key, element_id in SCHEME_SECTIONS.items():
             try:
-                WebDriverWait(self.driver, 20).until(EC.visibility_of_element_located((By.ID, "__next")))
+                scheme[key] = self.driver.find_element(By.ID, element_id).text
+            except NoSuchElementException:
+                scheme[key] = 'Not Available'
 
-                # Extract tags with exception handling
-                try:
-                    tags_elements = self.driver.find_elements(By.XPATH, '//div[@id="tags"]/div')
-                    scheme['tags'] = [i.text for i in tags_elements]
-                except NoSuchElementException:
-                    scheme['tags'] = []
+        return scheme
 
-                # Extract details with exception handling
-                try:
-                    scheme['details'] = self.driver.find_element(By.ID, 'details').text
-                except NoSuchElementException:
-                    scheme['details'] = 'Not Available'
+    def close(self):
+        self.driver.quit()
 
-                # Extract benefits with exception handling
-                try:
-                    scheme['benefits'] = self.driver.find_element(By.ID, 'benefits').text
-                except NoSuchElementException:
-                    scheme['benefits'] = 'Not Available'
 
-                # Extract eligibility with exception handling
-                try:
-                    scheme['eligibility'] = self.driver.find_element(By.ID, 'eligibility').text
-                except NoSuchElementException:
-                    scheme['eligibility'] = 'Not Available'
+class HttpSchemeFetcher:
+    """
+    Fetches scheme pages over plain HTTP with a keep-alive session, for server-rendered pages and local fixtures.
 
-                # Extract application process with exception handling
-                try:
-                    scheme['application_process'] = self.driver.find_element(By.ID, 'application-process').text
-                except NoSuchElementException:
-                    scheme['application_process'] = 'Not Available'
+    Args:
+        timeout: Request timeout in seconds.
+    """
 
-                # Extract documents required with exception handling
-                try:
-                    scheme['documents_required'] = self.driver.find_element(By.ID, 'documents-required').text
-                except NoSuchElementException:
-                    scheme['documents_required'] = 'Not Available'
+    def __init__(self, timeout: float = 20):
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _get(self, url: str) -> BeautifulSoup:
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return BeautifulSoup(response.text, 'html.parser')
+
+    def get_scheme_links(self, url: str) -> list[dict]:
+        scheme_links = []
+        for row in self._get(url).select('tbody tr'):
+            cells = row.find_all('td')
+            link = cells[2].find('a') if len(cells) > 2 else None
+            if link is None:
+                continue
+            scheme_links.append({
+                'sr_no': cells[0].get_text(strip=True),
+                'scheme_name': cells[1].get_text('\n', strip=True).replace('\nCheck Eligibility', ''),
+                'scheme_link': requests.compat.urljoin(url, link['href']),
+            })
+        return scheme_links
+
+    def get_scheme_details(self, scheme: dict) -> dict:
+        scheme = copy.copy(scheme)
+        page = self._get(scheme['scheme_link'])
+        scheme['tags'] = [tag.get_text(strip=True) for tag in page.select('#tags > div')]
+        for key, element_id in SCHEME_SECTIONS.items():
+            element = page.find(id=element_id)
+            scheme[key] = element.get_text('\n', strip=True) if element else 'Not Available'
+        return scheme
+
+    def close(self):
+        self.session.close()
 
-            except TimeoutException:
-                logging.error(f"Timeout while waiting for scheme page to load: {scheme['scheme_link']}")
+
+def read_checkpoint(checkpoint_path: str) -> dict[str, dict]:
+    """
+    Reads the schemes already scraped into a JSONL checkpoint, keyed by slug. A truncated last line is ignored.
+    """
+    scraped = {}
+    if not os.path.exists(checkpoint_path):
+        return scraped
+    with open(checkpoint_path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                scheme = json.loads(line)
+            except ValueError:
+                continue
+            scraped[scheme_slug(scheme)] = scheme
+    return scraped
+
+
+class MySchemeScraper:
+    """
+    Scrapes scheme details with a pool of workers, each owning its own fetcher (driver or HTTP session).
+
+    Every scraped scheme is appended to the corpus (a JSONL file plus an offsets index, see processing.corpus) as
+    soon as it is done, so the corpus doubles as a checkpoint and an interrupted run resumes where it stopped.
+    Failed pages are retried with exponential backoff.
+
+    Args:
+        myscheme_url: URL of the page listing all schemes.
+        checkpoint_path: Path of the JSONL corpus / checkpoint.
+        fetcher_factory: Callable creating a fetcher, e.g. SeleniumSchemeFetcher or HttpSchemeFetcher.
+        workers: Number of parallel workers.
+        max_retries: Number of retries of a failed scheme page.
+        backoff_seconds: Base delay before the first retry, doubled for every further one.
+    """
+
+    def __init__(self, myscheme_url: str = MYSCHEME_URL, checkpoint_path: str = 'myschemes_scraped.jsonl',
+                 fetcher_factory=SeleniumSchemeFetcher, workers: int = 4, max_retries: int = 3,
+                 backoff_seconds: float = 1.0):
+        self.myscheme_url = myscheme_url
+        self.checkpoint_path = checkpoint_path
+        self.fetcher_factory = fetcher_factory
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._local = threading.local()
+        self._fetchers = []
+        self._fetchers_lock = threading.Lock()
+
+    def _fetcher(self):
+        if not hasattr(self._local, 'fetcher'):
+            self._local.fetcher = self.fetcher_factory()
+            with self._fetchers_lock:
+                self._fetchers.append(self._local.fetcher)
+        return self._local.fetcher
+
+    def get_scheme_links(self):
+        return self._fetcher().get_scheme_links(self.myscheme_url)
+
+    def _scrape_scheme(self, scheme: dict, corpus: CorpusWriter) -> dict:
+        for attempt in range(self.max_retries + 1):
+            try:
+                details = self._fetcher().get_scheme_details(scheme)
+                break
             except Exception as e:
-                logging.error(f"An error occurred for scheme page {scheme['scheme_link']}: {e}")
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_seconds * 2 ** attempt * (1 + random.random())
+                logging.warning(f"Retrying scheme page {scheme['scheme_link']} in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+        corpus.append(details)
+        return details
+
+    def get_scheme_details(self, scheme_links):
+        """
+        Scrapes the details of every scheme not yet in the checkpoint.
+
+        Returns:
+            list[dict]: The scraped schemes, including those from earlier runs, in the order of `scheme_links`.
+        """
+        scraped = read_checkpoint(self.checkpoint_path)
+        pending = [scheme for scheme in scheme_links if scheme_slug(scheme) not in scraped]
+        logging.info(f"{len(scraped)} schemes already scraped, {len(pending)} to go")
+
+        with CorpusWriter(self.checkpoint_path) as corpus, ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._scrape_scheme, scheme, corpus): scheme for scheme in pending}
+            for future in as_completed(futures):
+                scheme = futures[future]
+                try:
+                    scraped[scheme_slug(scheme)] = future.result()
+                except Exception as e:
+                    logging.error(f"An error occurred for scheme page {scheme['scheme_link']}: {e}")
+
+        return [scraped[scheme_slug(scheme)] for scheme in scheme_links if scheme_slug(scheme) in scraped]
+
+    def close(self):
+        with self._fetchers_lock:
+            for fetcher in self._fetchers:
+                fetcher.close()
+            self._fetchers.clear()
 
     def download(self):
-        scheme_links = self.get_scheme_links()
-        self.get_scheme_details(scheme_links)
-        self.driver.quit()
-        return scheme_links
+        try:
+            scheme_links = self.get_scheme_links()
+            return self.get_scheme_details(scheme_links)
+        finally:
+            self.close()
+
+
+def scrape_to_corpus(corpus_path: str = 'myschemes_scraped.jsonl'):
+    """
+    Scrapes all schemes into the corpus at `corpus_path`, resuming a previous run if there is one.
+    """
+    scraper = MySchemeScraper(checkpoint_path=corpus_path)
+    scraper.download()
 
 
 def scrape_and_store_to_json_file():
     try:
-        download_path = os.path.join(os.path.dirname(__file__), 'myschemes_scraped.json')
-        scraper = MySchemeScraper()
+        directory = os.path.dirname(__file__)
+        download_path = os.path.join(directory, 'myschemes_scraped.json')
+        scraper = MySchemeScraper(checkpoint_path=os.path.join(directory, 'myschemes_scraped.jsonl'))
         scraped_scheme_details = scraper.download()
         with open(download_path, 'w') as file:
             json.dump(scraped_scheme_details, file)
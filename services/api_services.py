@@ -1,12 +1,116 @@
 # services/api_service.py
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RetryableStatusError(requests.HTTPError):
+    """
+    Raised when a page keeps failing with a retryable status code after all retries.
+    """
+
+
+def create_session(headers: dict, pool_size: int) -> requests.Session:
+    """
+    Creates a keep-alive session whose connection pool can serve `pool_size` concurrent requests.
+    """
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _retry_delay(response: Optional[requests.Response], attempt: int, backoff_seconds: float) -> float:
+    """
+    Returns how long to wait before the next attempt: the server's Retry-After if given, else jittered backoff.
+    """
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    return backoff_seconds * 2 ** attempt * (0.5 + random.random())
+
+
+def _fetch_page(session: requests.Session, url: str, timeout: float, max_retries: int,
+                backoff_seconds: float) -> dict:
+    for attempt in range(max_retries + 1):
+        response = None
+        try:
+            response = session.get(url, timeout=timeout)
+            if response.status_code not in RETRY_STATUS_CODES:
+                response.raise_for_status()
+                return response.json()
+            if attempt == max_retries:
+                raise RetryableStatusError(f"{response.status_code} after {max_retries} retries", response=response)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == max_retries:
+                raise
+        time.sleep(_retry_delay(response, attempt, backoff_seconds))
+
+
+def iter_scheme_slugs(base_url: str, total_results: int, max_size: int, headers: dict, max_workers: int = 8,
+                      max_retries: int = 5, backoff_seconds: float = 0.5, timeout: float = 30,
+                      errors: Optional[list[str]] = None) -> Iterator[str]:
+    """
+    Yields scheme slugs from the paginated API as soon as each page arrives.
+
+    Pages are fetched concurrently over a shared keep-alive session, and rate limited (429) or failed (5xx)
+    requests are retried with jittered exponential backoff, so detail fetching can start before all pages are in.
+
+    Args:
+        base_url (str): The base URL of the API endpoint.
+        total_results (int): The total number of results expected.
+        max_size (int): The maximum number of results to fetch per request.
+        headers (dict): A dictionary of headers to include in the request.
+        max_workers (int): The maximum number of pages fetched at once.
+        max_retries (int): The number of retries of a failing page.
+        backoff_seconds (float): The base delay between retries.
+        timeout (float): The timeout of a single request in seconds.
+        errors (Optional[list[str]]): If given, error messages of pages that could not be fetched are appended to it.
+
+    Yields:
+        str: The scheme slugs, in the order their pages complete.
+    """
+    with create_session(headers, max_workers) as session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_fetch_page, session, f"{base_url}{max_size}&from={start}", timeout, max_retries,
+                            backoff_seconds): start
+            for start in range(0, total_results, max_size)
+        }
+        try:
+            for future in as_completed(futures):
+                start = futures[future]
+                try:
+                    data = future.result()
+                except (requests.RequestException, ValueError) as e:
+                    if errors is not None:
+                        errors.append(f"Request failed for start={start}: {e}")
+                    continue
+
+                if data['status'] == 'Success':
+                    for item in data['data']['hits']['items']:
+                        yield item['fields']['slug']
+                elif errors is not None:
+                    errors.append(f"Error fetching data for start={start}: {data['errorDescription']}")
+        finally:
+            for future in futures:
+                future.cancel()
 
 
 def fetch_schemes(base_url: str, total_results: int, max_size: int, headers: dict) -> tuple[list[str], str]:
     """
     Fetches a paginated list of scheme slugs from an API.
 
-    This function iteratively retrieves data in chunks from the specified API endpoint.
+    Pages are fetched concurrently, see `iter_scheme_slugs`; use that directly to consume slugs as they arrive.
 
     Args:
         base_url (str): The base URL of the API endpoint.
@@ -20,27 +124,6 @@ def fetch_schemes(base_url: str, total_results: int, max_size: int, headers: dic
             - str (optional): A semicolon-separated string of error messages encountered during fetching,
                 or None if no errors occurred.
     """
-    slugs = []
     error_messages = []
-
-    for start in range(0, total_results, max_size):
-        url = f"{base_url}{max_size}&from={start}"
-
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-
-            if data['status'] == 'Success':
-                items = data['data']['hits']['items']
-                for item in items:
-                    slugs.append(item['fields']['slug'])
-            else:
-                error_message = f"Error fetching data for start={start}: {data['errorDescription']}"
-                error_messages.append(error_message)
-
-        except requests.RequestException as e:
-            error_message = f"Request failed for start={start}: {e}"
-            error_messages.append(error_message)
-
+    slugs = list(iter_scheme_slugs(base_url, total_results, max_size, headers, errors=error_messages))
     return slugs, "; ".join(error_messages) if error_messages else None
@@ -0,0 +1,24 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import configs.config as config
+
+# Shared, bounded pool for blocking client calls (vector search, speech APIs, file IO) made from async handlers
+_executor = ThreadPoolExecutor(max_workers=config.BLOCKING_CALL_WORKERS, thread_name_prefix="blocking")
+
+
+async def run_blocking(function, *args, **kwargs):
+    """
+    Runs a blocking function on the shared bounded executor without blocking the event loop.
+
+    Args:
+        function: The blocking callable.
+        *args: Positional arguments for the callable.
+        **kwargs: Keyword arguments for the callable.
+
+    Returns:
+        The callable's return value.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(function, *args, **kwargs))
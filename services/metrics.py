@@ -0,0 +1,131 @@
+import bisect
+import contextvars
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+# Histogram buckets for durations (seconds) and sizes (characters / bytes)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+
+class Histogram:
+    """
+    Prometheus-style cumulative histogram with a fixed set of buckets, one series per label value.
+    """
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float):
+        with self._lock:
+            counts, total = self._series.setdefault(label_value, [[0] * (len(self.buckets) + 1), 0.0])
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._series[label_value][1] = total + value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{{{self.label}="{label_value}",le="{bound}"}} {cumulative}')
+                cumulative += counts[-1]
+                lines.append(f'{self.name}_bucket{{{self.label}="{label_value}",le="+Inf"}} {cumulative}')
+                lines.append(f'{self.name}_sum{{{self.label}="{label_value}"}} {total}')
+                lines.append(f'{self.name}_count{{{self.label}="{label_value}"}} {cumulative}')
+        return lines
+
+
+STAGE_DURATION = Histogram("udhavibot_stage_duration_seconds", "Duration of each /chat pipeline stage.", "stage",
+                           DURATION_BUCKETS)
+REQUEST_DURATION = Histogram("udhavibot_request_duration_seconds", "Duration of HTTP requests.", "path",
+                             DURATION_BUCKETS)
+PAYLOAD_SIZE = Histogram("udhavibot_payload_size", "Sizes of prompts, contexts (characters) and audio (bytes).",
+                         "kind", SIZE_BUCKETS)
+
+
+@dataclass
+class RequestTrace:
+    trace_id: str
+    started_at: float = field(default_factory=time.perf_counter)
+    spans: list[tuple[str, float]] = field(default_factory=list)
+    sizes: dict[str, int] = field(default_factory=dict)
+
+    def breakdown(self) -> str:
+        stages = " ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in self.spans)
+        sizes = " ".join(f"{kind}={size}" for kind, size in self.sizes.items())
+        return f"{stages} {sizes}".strip()
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("trace", default=None)
+
+# Values read at scrape time, e.g. cache hit counters owned by other modules
+_callbacks: dict[str, tuple[str, str, Callable[[], float]]] = {}
+
+
+def start_trace(trace_id: Optional[str] = None) -> RequestTrace:
+    """
+    Starts a trace for the current request (context); stages and sizes recorded afterwards are attached to it.
+    """
+    trace = RequestTrace(trace_id=trace_id or uuid.uuid4().hex)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Times a pipeline stage, recording it in the stage histogram and on the current trace.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.observe(name, elapsed)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append((name, elapsed))
+
+
+def record_size(kind: str, size: int):
+    """
+    Records the size of a prompt, context or audio payload.
+    """
+    PAYLOAD_SIZE.observe(kind, size)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.sizes[kind] = trace.sizes.get(kind, 0) + size
+
+
+def register_callback(name: str, help_text: str, read: Callable[[], float], metric_type: str = "gauge"):
+    """
+    Registers a value (gauge or counter) read at scrape time and exposed on /metrics.
+    """
+    _callbacks[name] = (help_text, metric_type, read)
+
+
+def render() -> str:
+    """
+    Renders every metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for histogram in (REQUEST_DURATION, STAGE_DURATION, PAYLOAD_SIZE):
+        lines.extend(histogram.render())
+    for name, (help_text, metric_type, read) in sorted(_callbacks.items()):
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}", f"{name} {read()}"])
+    return "\n".join(lines) + "\n"
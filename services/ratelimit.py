@@ -0,0 +1,272 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Optional
+
+import configs.config as config
+
+# How often a queued caller checks whether it may proceed, in seconds
+_POLL_SECONDS = 0.01
+
+_RETRY_IN_PATTERN = re.compile(r"retry (?:in|after) (\d+(?:\.\d+)?)\s*s", re.IGNORECASE)
+_RETRY_DELAY_PATTERN = re.compile(r"retry_delay\s*{\s*seconds:\s*(\d+)")
+
+
+class OverloadedError(Exception):
+    """
+    Raised when a call to an upstream is not made: its wait queue is full, it would wait past its deadline
+    (503), or the upstream keeps answering with quota errors (429).
+
+    Args:
+        message: What happened.
+        retry_after: Seconds after which the client may retry.
+        status_code: The HTTP status the request should fail with.
+    """
+
+    def __init__(self, message: str, retry_after: float, status_code: int = 503):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Returns True if the error looks like a quota / rate limit error from a Google API.
+    """
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable"):
+        return True
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message or "rate limit" in message.lower()
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Returns the delay the upstream asked for, from a `retry_after` attribute, a Retry-After header or the retry
+    delay of a gRPC quota error, or None.
+    """
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        retry_after = headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return max(0.0, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+    message = str(error)
+    match = _RETRY_IN_PATTERN.search(message) or _RETRY_DELAY_PATTERN.search(message)
+    return float(match.group(1)) if match else None
+
+
+class UpstreamLimiter:
+    """
+    Admission control for one upstream API: a token bucket for its request rate, a cap on concurrent calls and a
+    bounded FIFO queue of callers waiting for both.
+
+    Callers are shed with OverloadedError when the queue is full or when they would wait longer than
+    `max_wait_seconds`. Quota errors from the upstream pause the bucket for every caller, for as long as the
+    upstream asked (Retry-After) or with jittered exponential backoff.
+
+    Works from threads (`slot`, `call`) and from the event loop (`aslot`, `acall`).
+
+    Args:
+        name: Name of the upstream, used in errors and metrics.
+        requests_per_second: Sustained request rate.
+        burst: Size of the token bucket, i.e. requests allowed at once after a quiet period.
+        max_concurrency: Maximum number of calls in flight.
+        max_queue: Maximum number of callers waiting.
+        max_wait_seconds: Deadline of a waiting caller.
+    """
+
+    def __init__(self, name: str, requests_per_second: float, burst: int, max_concurrency: int, max_queue: int,
+                 max_wait_seconds: float):
+        self.name = name
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.admitted = 0
+        self.shed = 0
+        self.throttled = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._waiting: deque = deque()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.requests_per_second)
+        self._updated = now
+
+    def _enqueue(self, shed: bool) -> object:
+        ticket = object()
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if shed:
+                expected = max(self._paused_until - now, 0.0) + \
+                    max(0.0, len(self._waiting) + 1 - self._tokens) / self.requests_per_second
+                if len(self._waiting) >= self.max_queue or expected > self.max_wait_seconds:
+                    self.shed += 1
+                    raise OverloadedError(f"{self.name} is overloaded", retry_after=max(1.0, expected))
+            self._waiting.append(ticket)
+        return ticket
+
+    def _try_acquire(self, ticket: object) -> float:
+        """
+        Takes a token and a concurrency slot if the ticket is first in line.
+
+        Returns:
+            float: 0 if acquired, otherwise roughly how long to wait before trying again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._waiting[0] is not ticket or self._in_flight >= self.max_concurrency:
+                return _POLL_SECONDS
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.requests_per_second
+            self._tokens -= 1
+            self._in_flight += 1
+            self._waiting.popleft()
+            self.admitted += 1
+            return 0.0
+
+    def _give_up(self, ticket: object, waited: float):
+        with self._lock:
+            self._waiting.remove(ticket)
+            self.shed += 1
+        raise OverloadedError(f"{self.name} is overloaded, gave up after waiting {waited:.1f}s",
+                              retry_after=self.max_wait_seconds)
+
+    def _next_wait(self, ticket: object, started: float, shed: bool) -> float:
+        wait = self._try_acquire(ticket)
+        if wait and shed:
+            waited = time.monotonic() - started
+            if waited + wait > self.max_wait_seconds:
+                self._give_up(ticket, waited)
+        return wait
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def pause(self, seconds: float):
+        """
+        Holds off all callers for `seconds`, e.g. after the upstream reported its quota as exhausted.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    @contextmanager
+    def slot(self, shed: bool = True):
+        """
+        Waits for a token and a concurrency slot (from a thread). With `shed=False` the caller queues without
+        bound or deadline, for background work such as index builds.
+        """
+        ticket, started = self._enqueue(shed), time.monotonic()
+        while wait := self._next_wait(ticket, started, shed):
+            time.sleep(wait)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, shed: bool = True):
+        """
+        Event loop counterpart of `slot`.
+        """
+        ticket, started = self._enqueue(shed), time.monotonic()
+        try:
+            while wait := self._next_wait(ticket, started, shed):
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            # Cancelled while queued; leave the queue so callers behind are not blocked
+            with self._lock:
+                self._waiting.remove(ticket)
+            raise
+        try:
+            yield
+        finally:
+            self.release()
+
+    def backoff(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Handles a failed call: on a quota error, pauses the upstream and returns the delay; otherwise None.
+        """
+        if not is_rate_limit_error(error):
+            return None
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = config.UPSTREAM_BACKOFF_SECONDS * 2 ** attempt * (0.5 + random.random())
+        self.throttled += 1
+        self.pause(delay)
+        return delay
+
+    def _quota_error(self, error: Exception, delay: float) -> OverloadedError:
+        return OverloadedError(f"{self.name} quota exhausted: {error}", retry_after=max(1.0, delay), status_code=429)
+
+    def call(self, function: Callable[..., Any], *args, max_retries: int = config.UPSTREAM_MAX_RETRIES,
+             **kwargs) -> Any:
+        """
+        Calls the upstream from a thread through the limiter, retrying quota errors.
+        """
+        for attempt in range(max_retries + 1):
+            with self.slot():
+                try:
+                    return function(*args, **kwargs)
+                except Exception as e:
+                    delay = self.backoff(e, attempt)
+                    if delay is None:
+                        raise
+                    if attempt == max_retries:
+                        raise self._quota_error(e, delay) from e
+
+    async def acall(self, function: Callable[[], Awaitable[Any]],
+                    max_retries: int = config.UPSTREAM_MAX_RETRIES) -> Any:
+        """
+        Calls the upstream from the event loop through the limiter, retrying quota errors.
+        """
+        for attempt in range(max_retries + 1):
+            async with self.aslot():
+                try:
+                    return await function()
+                except Exception as e:
+                    delay = self.backoff(e, attempt)
+                    if delay is None:
+                        raise
+                    if attempt == max_retries:
+                        raise self._quota_error(e, delay) from e
+
+    def stats(self) -> dict:
+        return {"admitted": self.admitted, "shed": self.shed, "throttled": self.throttled,
+                "in_flight": self._in_flight, "waiting": len(self._waiting)}
+
+
+_limiters: dict[str, UpstreamLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def upstream_limiter(name: str) -> UpstreamLimiter:
+    """
+    Returns the process-wide limiter of an upstream configured in UPSTREAM_LIMITS.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = UpstreamLimiter(name, max_queue=config.ADMISSION_QUEUE_SIZE,
+                                              max_wait_seconds=config.ADMISSION_MAX_WAIT_SECONDS,
+                                              **config.UPSTREAM_LIMITS[name])
+        return _limiters[name]
+
+
+def all_limiters() -> list[UpstreamLimiter]:
+    return [upstream_limiter(name) for name in config.UPSTREAM_LIMITS]
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from services.executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+class NotReadyError(Exception):
+    """
+    Raised when a request needs resources that are still being initialized (or failed to initialize).
+    """
+
+
+@dataclass
+class AppResources:
+    """
+    The heavy, lazily built resources of the app.
+    """
+    vectorstore: Any
+    hybrid_retriever: Any
+    llm_svc: Any
+    llm: Any
+    json_chain: Any
+
+
+class ResourceManager:
+    """
+    Builds the app resources in the background so the server can start accepting (health) requests immediately.
+    """
+
+    def __init__(self):
+        self._resources: Optional[AppResources] = None
+        self._task: Optional[asyncio.Task] = None
+        self.error: Optional[str] = None
+        self.startup_seconds: Optional[float] = None
+
+    def start(self, build: Callable[[], AppResources]) -> asyncio.Task:
+        """
+        Starts building the resources on the blocking executor; returns the task doing so.
+        """
+        self._task = asyncio.create_task(self._build(build))
+        return self._task
+
+    async def _build(self, build: Callable[[], AppResources]):
+        started = time.monotonic()
+        try:
+            self._resources = await run_blocking(build)
+            self.startup_seconds = time.monotonic() - started
+            logger.info(f"Resources ready in {self.startup_seconds:.2f}s")
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Error initializing resources: {e}")
+
+    def set(self, resources: AppResources):
+        """
+        Installs already built resources, e.g. local stand-ins for benchmarks.
+        """
+        self._resources = resources
+        self.error = None
+
+    def get(self) -> AppResources:
+        if self._resources is None:
+            raise NotReadyError(self.error or "Service is starting")
+        return self._resources
+
+    def status(self) -> dict:
+        if self._resources is not None:
+            return {"status": "ready", "startup_seconds": self.startup_seconds}
+        if self.error:
+            return {"status": "failed", "error": self.error}
+        return {"status": "starting"}
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+# Every flight created, so their counters can be exported together
+_flights: list = []
+
+
+class _FlightStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.saved = 0
+        _flights.append(self)
+
+
+class AsyncSingleFlight(_FlightStats):
+    """
+    Coalesces concurrent identical async calls: while a call for a key is in flight, callers with the same key
+    await its result instead of starting their own.
+
+    Args:
+        name: Name of the stage, used for the exported counters.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs `function` unless a call with the same key is already in flight, and returns the (shared) result.
+        """
+        self.calls += 1
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.saved += 1
+        else:
+            future = asyncio.ensure_future(function())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded, so a cancelled caller does not cancel the call others are waiting for
+        return await asyncio.shield(future)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(_FlightStats):
+    """
+    Thread-based counterpart of AsyncSingleFlight, for blocking calls made from executor threads.
+
+    Args:
+        name: Name of the stage, used for the exported counters.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._in_flight: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """
+        Runs `function` unless a call with the same key is already in flight, and returns the (shared) result.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+            else:
+                self.saved += 1
+
+        if leader:
+            try:
+                call.result = function()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+def all_flights() -> list:
+    return list(_flights)
@@ -0,0 +1,68 @@
+import asyncio
+import contextlib
+from typing import AsyncContextManager, AsyncIterator, Awaitable, Callable, Optional
+
+from processing.texts import SentenceSplitter
+
+
+async def stream_answer(llm, prompt: str, synthesize: Callable[[str], Awaitable[bytes]],
+                        admission: Optional[Callable[[], AsyncContextManager]] = None,
+                        ) -> AsyncIterator[tuple[str, object]]:
+    """
+    Streams an LLM answer and synthesizes its audio sentence by sentence.
+
+    Synthesis of each sentence starts as soon as the sentence is complete, concurrently with the rest of the
+    generation, so the first audio is available after the first sentence instead of the whole answer.
+
+    The LLM stream is read by its own task into an unbounded queue, and `admission` (e.g. the upstream limiter's
+    `aslot`) is held only while it is read: a slow client delays its own events, not the release of the slot.
+
+    Args:
+        llm: A chat model supporting `astream`.
+        prompt (str): The prompt to answer.
+        synthesize: Coroutine function turning a sentence into audio bytes.
+        admission: Optional async context manager factory held while the LLM stream is read.
+
+    Yields:
+        tuple[str, object]: ("token", str) for every streamed chunk of text and ("audio", (index, sentence, bytes))
+            for every synthesized sentence, in sentence order.
+    """
+    splitter = SentenceSplitter()
+    pending: list[tuple[int, str, asyncio.Task]] = []
+    emitted = 0
+    tokens: asyncio.Queue[Optional[str]] = asyncio.Queue()
+
+    async def read_tokens():
+        async with admission() if admission else contextlib.nullcontext():
+            async for chunk in llm.astream(prompt):
+                text = chunk.content if hasattr(chunk, "content") else str(chunk)
+                if text:
+                    tokens.put_nowait(text)
+
+    def schedule(sentences: list[str]):
+        for sentence in sentences:
+            pending.append((len(pending), sentence, asyncio.ensure_future(synthesize(sentence))))
+
+    reader = asyncio.ensure_future(read_tokens())
+    # The end of the stream, also after an error, which `reader.result()` then raises
+    reader.add_done_callback(lambda _: tokens.put_nowait(None))
+    try:
+        while (text := await tokens.get()) is not None:
+            yield "token", text
+            schedule(splitter.feed(text))
+
+            while emitted < len(pending) and pending[emitted][2].done():
+                index, sentence, task = pending[emitted]
+                yield "audio", (index, sentence, task.result())
+                emitted += 1
+        reader.result()
+
+        schedule(splitter.flush())
+        while emitted < len(pending):
+            index, sentence, task = pending[emitted]
+            yield "audio", (index, sentence, await task)
+            emitted += 1
+    finally:
+        reader.cancel()
+        for _, _, task in pending[emitted:]:
+            task.cancel()
@@ -1,24 +1,156 @@
-import google.generativeai as genai
-from google.cloud import texttospeech
+import hashlib
+import io
+import logging
+import threading
+from typing import Iterable
 
+import configs.config as config
+from services.executor import run_blocking
+from services.ratelimit import upstream_limiter
+from services.singleflight import AsyncSingleFlight, SingleFlight
+from stores.audio_cache import AudioCache, audio_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Voice parameters of every synthesis; part of the audio cache key
+TTS_VOICE = "ssml_gender=FEMALE;encoding=MP3"
+
+# Identical concurrent transcriptions / syntheses share one upstream call
+_speech_to_text_flight = AsyncSingleFlight("stt")
+_tts_flight = AsyncSingleFlight("tts")
+_blocking_speech_to_text_flight = SingleFlight("stt_blocking")
+_blocking_tts_flight = SingleFlight("tts_blocking")
+
+# Synthesized audio by (text, language code, voice), created on first use since it opens its disk directory
+_tts_cache = None
+_tts_cache_lock = threading.Lock()
+
+# The TTS client holds a gRPC channel, so it is created once and shared by all threads
+_tts_client = None
+_tts_client_lock = threading.Lock()
+
+
+def _get_tts_cache() -> AudioCache:
+    global _tts_cache
+    with _tts_cache_lock:
+        if _tts_cache is None:
+            _tts_cache = AudioCache(config.TTS_CACHE_MEMORY_BYTES, config.TTS_CACHE_DIRECTORY,
+                                    config.TTS_CACHE_DISK_BYTES)
+    return _tts_cache
+
+
+def __getattr__(name):
+    # tts_cache is created on first use, so importing the module does not touch the disk
+    if name == "tts_cache":
+        return _get_tts_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def aspeech_to_text(audio_data: bytes, mime_type: str = "audio/wav") -> str:
+    """
+    Transcribes audio from the event loop. Callers queue for admission on the event loop, and only admitted calls
+    take a thread of the shared executor, so a backlog of transcriptions does not starve other blocking work.
+    """
+    key = (hashlib.sha256(audio_data).hexdigest(), mime_type)
+    return await _speech_to_text_flight.do(
+        key, lambda: upstream_limiter("gemini").acall(lambda: run_blocking(_speech_to_text, audio_data, mime_type)))
+
+
+async def atts(message, language) -> bytes:
+    """
+    Synthesizes speech from the event loop, through the audio cache; admitted like `aspeech_to_text`.
+    """
+    key = audio_cache_key(message, language, TTS_VOICE)
+    tts_cache = _get_tts_cache()
+    audio = await run_blocking(tts_cache.get, key)
+    if audio is not None:
+        return audio
+
+    async def synthesize() -> bytes:
+        audio_content = await upstream_limiter("tts").acall(lambda: run_blocking(_tts, message, language))
+        await run_blocking(tts_cache.put, key, audio_content)
+        return audio_content
+
+    return await _tts_flight.do(key, synthesize)
+
+
+def speech_to_text(audio_data: bytes, mime_type: str = "audio/wav") -> str:
+    """
+    Blocking counterpart of `aspeech_to_text`, for scripts and background threads.
+    """
+    key = (hashlib.sha256(audio_data).hexdigest(), mime_type)
+    return _blocking_speech_to_text_flight.do(
+        key, lambda: upstream_limiter("gemini").call(_speech_to_text, audio_data, mime_type))
+
+
+def tts(message, language) -> bytes:
+    """
+    Blocking counterpart of `atts`, for background threads such as pre-synthesis at startup.
+    """
+    key = audio_cache_key(message, language, TTS_VOICE)
+    tts_cache = _get_tts_cache()
+    audio = tts_cache.get(key)
+    if audio is not None:
+        return audio
+
+    def synthesize() -> bytes:
+        audio_content = upstream_limiter("tts").call(_tts, message, language)
+        tts_cache.put(key, audio_content)
+        return audio_content
+
+    return _blocking_tts_flight.do(key, synthesize)
+
+
+def presynthesize(phrases: Iterable[tuple[str, str]]):
+    """
+    Synthesizes fixed phrases ahead of time so they are served from the audio cache.
+
+    Args:
+        phrases (Iterable[tuple[str, str]]): (language code, text) pairs.
+    """
+    for language, message in phrases:
+        try:
+            tts(message, language)
+        except Exception as e:
+            logger.warning(f"Could not pre-synthesize {language} phrase: {e}")
+
+
+def _get_tts_client():
+    global _tts_client
+    from google.cloud import texttospeech
+
+    with _tts_client_lock:
+        if _tts_client is None:
+            _tts_client = texttospeech.TextToSpeechClient()
+    return _tts_client
+
+
+def _speech_to_text(audio_data: bytes, mime_type: str) -> str:
+    # Google clients are imported on first use to keep importing the app fast
+    import google.generativeai as genai
 
-def speech_to_text() -> str:
     genai.configure()
 
-    audio_file = genai.upload_file(path='output.wav')
+    if len(audio_data) <= config.STT_INLINE_MAX_BYTES:
+        # Short clips go inline with the prompt, saving the File API upload round-trip
+        audio_file = {"mime_type": mime_type, "data": audio_data}
+    else:
+        audio_file = genai.upload_file(path=io.BytesIO(audio_data), mime_type=mime_type)
     model = genai.GenerativeModel(model_name="gemini-1.5-pro")
     speech_to_text_prompt = """Use the audio for the following and provide a JSON response with the following keys:
             * language: The language of the input text.
             * text: A proper English translation understandable by a native English speaker.
-            * language_code: The equivalent Google Cloud Platform language code for text-to-speech. 
+            * language_code: The equivalent Google Cloud Platform language code for text-to-speech.
     """
     response = model.generate_content([speech_to_text_prompt, audio_file])
     response = response.text
     return response
 
 
-def tts(message, language):
-    client = texttospeech.TextToSpeechClient()
+def _tts(message, language) -> bytes:
+    from google.cloud import texttospeech
+
+    client = _get_tts_client()
     synthesis_input = texttospeech.SynthesisInput(text=message)
     voice = texttospeech.VoiceSelectionParams(
         language_code=language, ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
@@ -29,6 +161,4 @@ def tts(message, language):
     response = client.synthesize_speech(
         input=synthesis_input, voice=voice, audio_config=audio_config
     )
-    with open("output.mp3", "wb") as out:
-        out.write(response.audio_content)
-        print('Audio content written to file "output.mp3"')
+    return response.audio_content
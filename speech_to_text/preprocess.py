@@ -0,0 +1,145 @@
+import io
+import wave
+from dataclasses import dataclass
+
+import numpy as np
+
+import configs.config as config
+
+_WAV_MIME_TYPES = {"audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave"}
+_SAMPLE_TYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+@dataclass
+class PreprocessedAudio:
+    data: bytes
+    mime_type: str
+    original_bytes: int
+    original_seconds: float = 0.0
+    seconds: float = 0.0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.data)
+
+    @property
+    def seconds_trimmed(self) -> float:
+        return self.original_seconds - self.seconds
+
+
+def _decode_wav(audio_data: bytes) -> tuple[np.ndarray, int]:
+    """
+    Decodes PCM WAV bytes into float32 samples in [-1, 1] of shape (frames, channels) and the sample rate.
+    """
+    with wave.open(io.BytesIO(audio_data), "rb") as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+
+    if width == 3:
+        # 24-bit samples: widen to 32-bit by placing the three bytes in the high end of each int32
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        padded = np.zeros((len(raw), 4), dtype=np.uint8)
+        padded[:, 1:] = raw
+        samples = padded.view("<i4").reshape(-1).astype(np.float32) / 2 ** 31
+    elif width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    else:
+        samples = np.frombuffer(frames, dtype=_SAMPLE_TYPES[width]).astype(np.float32) / 2 ** (8 * width - 1)
+    return samples.reshape(-1, channels), rate
+
+
+def _encode_wav(samples: np.ndarray, rate: int) -> bytes:
+    """
+    Encodes mono float samples as 16-bit PCM WAV.
+    """
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+    """
+    Resamples mono samples to `target_rate`.
+
+    Integer ratios are decimated by averaging each group of samples, which also low-passes the signal; other
+    ratios are linearly interpolated after the same kind of averaging.
+    """
+    if rate <= target_rate:
+        return samples
+    factor = rate // target_rate
+    if factor > 1:
+        usable = len(samples) - len(samples) % factor
+        samples = samples[:usable].reshape(-1, factor).mean(axis=1)
+        rate //= factor
+    if rate != target_rate and len(samples):
+        positions = np.arange(0, len(samples) * target_rate / rate) * rate / target_rate
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    return samples
+
+
+def trim_silence(samples: np.ndarray, rate: int, frame_ms: int, threshold_db: float, padding_ms: int) -> np.ndarray:
+    """
+    Trims leading and trailing silence with an energy-based voice activity detector.
+
+    A frame is voiced if its RMS energy is within `threshold_db` of the loudest frame. Everything before the first
+    and after the last voiced frame, except `padding_ms` of margin, is cut. Audio without any voiced frame is
+    returned unchanged.
+    """
+    frame = max(1, rate * frame_ms // 1000)
+    count = len(samples) // frame
+    if count == 0:
+        return samples
+
+    energy = np.sqrt(np.mean(samples[:count * frame].reshape(count, frame) ** 2, axis=1))
+    peak = energy.max()
+    if peak <= 0:
+        return samples
+    voiced = np.flatnonzero(20 * np.log10(np.maximum(energy, 1e-10) / peak) >= threshold_db)
+
+    padding = rate * padding_ms // 1000
+    start = max(0, voiced[0] * frame - padding)
+    end = min(len(samples), (voiced[-1] + 1) * frame + padding)
+    return samples[start:end]
+
+
+def preprocess_audio(audio_data: bytes, mime_type: str = "audio/wav") -> PreprocessedAudio:
+    """
+    Prepares recorded audio for transcription, entirely in memory: downmixes to mono, resamples to
+    STT_SAMPLE_RATE, trims leading and trailing silence and re-encodes as 16-bit PCM WAV.
+
+    Only PCM WAV is decoded; other formats (e.g. browser WebM/Opus recordings, which are already compact) and
+    audio that would not get smaller are passed through unchanged.
+
+    Args:
+        audio_data (bytes): The uploaded audio.
+        mime_type (str): Its MIME type.
+
+    Returns:
+        PreprocessedAudio: The audio to transcribe, with the bytes and seconds of audio saved.
+    """
+    result = PreprocessedAudio(data=audio_data, mime_type=mime_type, original_bytes=len(audio_data))
+    if mime_type not in _WAV_MIME_TYPES:
+        return result
+
+    try:
+        samples, rate = _decode_wav(audio_data)
+    except (wave.Error, EOFError, KeyError, ValueError):
+        # Not PCM WAV after all (e.g. compressed WAV); let the STT model deal with it
+        return result
+
+    result.original_seconds = result.seconds = len(samples) / rate if rate else 0.0
+    mono = resample(samples.mean(axis=1), rate, config.STT_SAMPLE_RATE)
+    rate = min(rate, config.STT_SAMPLE_RATE)
+    trimmed = trim_silence(mono, rate, config.STT_VAD_FRAME_MS, config.STT_VAD_THRESHOLD_DB,
+                           config.STT_VAD_PADDING_MS)
+    encoded = _encode_wav(trimmed, rate)
+
+    if len(encoded) < len(audio_data):
+        result.data, result.mime_type = encoded, "audio/wav"
+        result.seconds = len(trimmed) / rate
+    return result
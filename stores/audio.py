@@ -0,0 +1,115 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class _AudioEntry:
+    media_type: str
+    size: int
+    created_at: float
+    data: Optional[bytes] = None
+    path: Optional[str] = None
+
+
+class AudioStore:
+    """
+    Request-scoped store for synthesized audio, served by ID.
+
+    Small payloads are kept in memory; payloads larger than `spill_threshold_bytes` are written to temp files.
+    Entries expire after `ttl_seconds`, and the oldest entries are evicted once the total size exceeds `max_bytes`.
+
+    Args:
+        ttl_seconds: Lifetime of an entry in seconds.
+        max_bytes: Total byte budget across memory and spilled entries.
+        spill_threshold_bytes: Payloads larger than this are spilled to a temp file.
+        spill_directory: Directory for spilled payloads, or None for the system temp directory.
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int, spill_threshold_bytes: int,
+                 spill_directory: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.spill_threshold_bytes = spill_threshold_bytes
+        self.spill_directory = spill_directory
+        self._entries: OrderedDict[str, _AudioEntry] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, data: bytes, media_type: str) -> str:
+        """
+        Stores an audio payload.
+
+        Args:
+            data (bytes): The audio bytes.
+            media_type (str): The MIME type to serve the audio with.
+
+        Returns:
+            str: The ID under which the audio can be fetched.
+        """
+        audio_id = uuid.uuid4().hex
+        entry = _AudioEntry(media_type=media_type, size=len(data), created_at=time.monotonic())
+        if len(data) > self.spill_threshold_bytes:
+            fd, entry.path = tempfile.mkstemp(prefix="audio-", dir=self.spill_directory)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        else:
+            entry.data = data
+
+        with self._lock:
+            self._entries[audio_id] = entry
+            self._total_bytes += entry.size
+            self._evict()
+        return audio_id
+
+    def get(self, audio_id: str) -> Optional[tuple[bytes, str]]:
+        """
+        Fetches an audio payload.
+
+        Args:
+            audio_id (str): The ID returned by `put`.
+
+        Returns:
+            Optional[tuple[bytes, str]]: The audio bytes and media type, or None if unknown or expired.
+        """
+        with self._lock:
+            self._evict()
+            entry = self._entries.get(audio_id)
+        if entry is None:
+            return None
+        if entry.data is not None:
+            return entry.data, entry.media_type
+        try:
+            with open(entry.path, "rb") as f:
+                return f.read(), entry.media_type
+        except FileNotFoundError:
+            # Evicted by another request between the lookup and the read
+            return None
+
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _evict(self):
+        """
+        Drops expired entries, then the oldest entries until the byte budget is met. Caller must hold the lock.
+        """
+        deadline = time.monotonic() - self.ttl_seconds
+        while self._entries:
+            audio_id, entry = next(iter(self._entries.items()))
+            if entry.created_at > deadline and self._total_bytes <= self.max_bytes:
+                break
+            self._remove(audio_id)
+
+    def _remove(self, audio_id: str):
+        entry = self._entries.pop(audio_id)
+        self._total_bytes -= entry.size
+        if entry.path:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
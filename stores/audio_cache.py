@@ -0,0 +1,121 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+def audio_cache_key(text: str, language_code: str, voice: str) -> str:
+    """
+    Returns the content address of synthesized audio: a hash of the voice parameters, language code and text.
+    """
+    return hashlib.sha256(f"{voice}\x00{language_code}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Content-addressed cache of synthesized audio with a memory LRU tier and a size-capped disk tier.
+
+    Args:
+        memory_max_bytes: Byte budget of the memory tier.
+        disk_directory: Directory of the disk tier, or None to keep audio in memory only.
+        disk_max_bytes: Byte budget of the disk tier; the least recently used files are removed beyond it.
+    """
+
+    def __init__(self, memory_max_bytes: int, disk_directory: Optional[str] = None, disk_max_bytes: int = 0):
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_directory = disk_directory
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        if disk_directory:
+            os.makedirs(disk_directory, exist_ok=True)
+            # Pick up audio synthesized by earlier runs, least recently used first
+            entries = []
+            for name in os.listdir(disk_directory):
+                path = os.path.join(disk_directory, name)
+                if name.endswith(".audio") and os.path.isfile(path):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, name[:-len(".audio")], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_bytes += size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_directory, f"{key}.audio")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+            on_disk = key in self._disk
+
+        if on_disk:
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+                os.utime(self._path(key))
+            except FileNotFoundError:
+                data = None
+            if data is not None:
+                with self._lock:
+                    self.hits += 1
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._put_memory(key, data)
+                return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes):
+        with self._lock:
+            self._put_memory(key, data)
+            if not self.disk_directory or key in self._disk or len(data) > self.disk_max_bytes:
+                return
+
+        fd, temp_path = tempfile.mkstemp(dir=self.disk_directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, self._path(key))
+
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = len(data)
+                self._disk_bytes += len(data)
+            while self._disk_bytes > self.disk_max_bytes and self._disk:
+                evicted, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                try:
+                    os.remove(self._path(evicted))
+                except FileNotFoundError:
+                    pass
+
+    def _put_memory(self, key: str, data: bytes):
+        """
+        Adds audio to the memory tier, evicting least recently used entries. Caller must hold the lock.
+        """
+        if len(data) > self.memory_max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes}
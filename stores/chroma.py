@@ -1,18 +1,61 @@
+import hashlib
+import json
+
 from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_core.vectorstores import VectorStoreRetriever
+from langchain_core.embeddings import Embeddings
 from typing import Optional
 from langchain.schema import Document
 
+import configs.config as config
+
+# Number of documents sent to Chroma per add/delete call
+_WRITE_BATCH_SIZE = 500
+
+
+def document_id(document: Document) -> str:
+    """
+    Returns a stable ID for a document, derived from a hash of its content and metadata.
+
+    The metadata (scheme ID, section, chunk index, tags, ...) is part of the hash, so identical chunks of different
+    schemes are stored separately and a document whose tags or link changed is re-upserted.
+
+    Args:
+        document (Document): The document to identify.
+
+    Returns:
+        str: The hex SHA-256 digest of the document's page content and metadata.
+    """
+    metadata = json.dumps(document.metadata, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{document.page_content}\x00{metadata}".encode("utf-8")).hexdigest()
+
 
-def store_embeddings(documents: list[Document], embeddings: GoogleGenerativeAIEmbeddings) -> Optional[Chroma]:
+def store_embeddings(documents: list[Document], embeddings: Embeddings,
+                     persist_directory: str = config.CHROMA_PERSIST_DIRECTORY,
+                     collection_name: str = config.CHROMA_COLLECTION_NAME) -> Optional[Chroma]:
     """
-    Store embeddings for the documents using embeddings and Chroma vectorstore.
-    Returns a tuple containing the retriever object and an error message if any.
+    Store embeddings for the documents in a persistent Chroma collection.
+
+    Documents are keyed by a hash of their content and metadata, so only new or changed documents are embedded.
+    Documents that are no longer present are removed from the collection; unchanged ones are reused as is.
     """
     try:
-        vectorstore_web = Chroma.from_documents(documents=documents, embedding=embeddings)
+        vectorstore_web = Chroma(collection_name=collection_name, embedding_function=embeddings,
+                                 persist_directory=persist_directory)
+
+        # Only exact duplicates, same content and metadata, share an ID
+        wanted = {document_id(document): document for document in documents}
+
+        existing_ids = set(vectorstore_web.get(include=[])["ids"])
+
+        stale_ids = list(existing_ids - wanted.keys())
+        for start in range(0, len(stale_ids), _WRITE_BATCH_SIZE):
+            vectorstore_web.delete(ids=stale_ids[start:start + _WRITE_BATCH_SIZE])
+
+        new_ids = [doc_id for doc_id in wanted if doc_id not in existing_ids]
+        for start in range(0, len(new_ids), _WRITE_BATCH_SIZE):
+            batch_ids = new_ids[start:start + _WRITE_BATCH_SIZE]
+            vectorstore_web.add_documents(documents=[wanted[doc_id] for doc_id in batch_ids], ids=batch_ids)
+
         return vectorstore_web
     except Exception as e:
         raise Exception(f"""error creating VectorStoreRetriever from chroma DB: {e}""")
@@ -0,0 +1,202 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+# Follow-up questions: they lean on the previous turn ("and for my daughter?", "how do I apply for it?")
+_FOLLOW_UP_START = re.compile(r"^\s*(?:and|also|what about|how about|what if|then|so|for my|and for|same for)\b",
+                              re.IGNORECASE)
+# Pronouns standing for the schemes of the previous turn; "that" and "those" are also relative pronouns ("a scheme
+# that helps farmers", "those who lost a job"), so they only count with "scheme" or at the end of the question
+_FOLLOW_UP_REFERENCE = re.compile(
+    r"\b(?:it|its|them|the same|the above|(?:this|that|these|those|the same|above) schemes?)\b"
+    r"|^\s*(?:is|are|was|does|do|can|will) (?:this|that|these|those|they)\b"
+    r"|\b(?:this|that|these|those)\s*[?.!]*\s*$", re.IGNORECASE)
+# Longer questions carry their own context and are searched afresh
+_FOLLOW_UP_MAX_WORDS = 12
+# Words a question about the schemes of the previous turn can be made of: the cues and pronouns above, function
+# words and what is asked about a scheme. Any other word brings new content ("What about housing for widows?")
+_FOLLOW_UP_WORDS = {
+    "and", "also", "what", "about", "how", "if", "then", "so", "for", "my", "same", "it", "its", "them", "they",
+    "this", "that", "these", "those", "the", "above", "scheme", "schemes", "a", "an", "is", "are", "was", "were",
+    "do", "does", "did", "can", "could", "will", "would", "should", "i", "me", "we", "us", "you", "to", "of", "in",
+    "on", "at", "by", "with", "from", "there", "any", "please", "tell", "more", "details", "detail", "explain",
+    "which", "who", "whom", "when", "where", "why", "much", "many", "long", "get", "got", "need", "needed", "apply",
+    "applying", "application", "eligible", "eligibility", "qualify", "documents", "document", "required",
+    "requirements", "benefit", "benefits", "amount", "money", "paid", "pay", "receive", "given", "last", "date",
+    "deadline", "process", "procedure", "steps", "register", "registration", "status", "claim", "form", "online",
+    "offline", "office", "contact", "take", "time", "fee", "cost", "free", "one", "first", "second", "all", "both",
+    "be", "have", "has", "not", "or", "ok", "okay", "yes", "no", "thanks", "thank",
+}
+
+_WORD = re.compile(r"[a-z]+")
+_SENTENCE_END = re.compile(r"(?<=[.?!।])\s")
+
+
+def refers_back(question: str) -> bool:
+    """
+    Returns True if the English question leans on the previous turn: it starts with a follow-up cue ("and",
+    "what about") or refers to the previous schemes with a pronoun ("it", "this scheme").
+    """
+    if len(question.split()) > _FOLLOW_UP_MAX_WORDS:
+        return False
+    return bool(_FOLLOW_UP_START.search(question) or _FOLLOW_UP_REFERENCE.search(question))
+
+
+def new_terms(question: str) -> list[str]:
+    """
+    Returns the words of the question beyond follow-up cues, pronouns and what is asked about a scheme.
+    """
+    return [word for word in _WORD.findall(question.lower()) if word not in _FOLLOW_UP_WORDS]
+
+
+def is_follow_up(question: str) -> bool:
+    """
+    Returns True if the English question is only about the schemes of the previous turn ("how do I apply for it?"),
+    so it can be answered from them without searching. A question that refers back but brings new content
+    ("what about loans for fishermen?") is not.
+    """
+    return refers_back(question) and not new_terms(question)
+
+
+def _first_sentence(text: str) -> str:
+    return _SENTENCE_END.split(text.strip(), 1)[0]
+
+
+@dataclass
+class Turn:
+    question: str
+    answer: str
+
+    @property
+    def size(self) -> int:
+        return len(self.question.encode("utf-8")) + len(self.answer.encode("utf-8"))
+
+
+@dataclass
+class Conversation:
+    """
+    The memory of one session: a running summary of older turns, the latest turns verbatim and the schemes
+    retrieved for the latest question.
+    """
+    summary: str = ""
+    turns: list[Turn] = field(default_factory=list)
+    scheme_ids: list[str] = field(default_factory=list)
+    last_used: float = field(default_factory=time.monotonic)
+
+    @property
+    def size(self) -> int:
+        return (len(self.summary.encode("utf-8")) + sum(turn.size for turn in self.turns) +
+                sum(len(scheme_id) for scheme_id in self.scheme_ids))
+
+    def history(self) -> str:
+        """
+        Renders the conversation for a prompt: the summary, then the latest turns.
+        """
+        lines = [f"Earlier: {self.summary}"] if self.summary else []
+        for turn in self.turns:
+            lines.extend([f"User: {turn.question}", f"Assistant: {turn.answer}"])
+        return "\n".join(lines)
+
+
+class ConversationStore:
+    """
+    Server-side memory of chat sessions, bounded per session and overall.
+
+    Each session keeps its last `max_turns` turns verbatim (and at most `max_session_bytes`); older turns are
+    compacted into an extractive summary (the question and the first sentence of the answer) of at most
+    `summary_max_chars`, so the history put into prompts stays flat as a conversation grows. Sessions idle for
+    `ttl_seconds` are dropped, and the least recently used sessions are evicted beyond `max_total_bytes`.
+
+    Args:
+        max_turns: Turns kept verbatim per session.
+        max_session_bytes: Maximum size of the verbatim turns and summary of a session.
+        summary_max_chars: Maximum length of the summary of a session.
+        ttl_seconds: Idle time after which a session is forgotten.
+        max_total_bytes: Maximum size of all sessions.
+    """
+
+    def __init__(self, max_turns: int, max_session_bytes: int, summary_max_chars: int, ttl_seconds: float,
+                 max_total_bytes: int):
+        self.max_turns = max_turns
+        self.max_session_bytes = max_session_bytes
+        self.summary_max_chars = summary_max_chars
+        self.ttl_seconds = ttl_seconds
+        self.max_total_bytes = max_total_bytes
+        self.compacted = 0
+        self.evicted = 0
+        self._sessions: OrderedDict[str, Conversation] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Conversation:
+        """
+        Returns a copy of the memory of a session, empty for a new or expired session.
+        """
+        with self._lock:
+            self._evict_expired()
+            conversation = self._sessions.get(session_id)
+            if conversation is None:
+                return Conversation()
+            self._sessions.move_to_end(session_id)
+            conversation.last_used = time.monotonic()
+            return Conversation(conversation.summary, list(conversation.turns), list(conversation.scheme_ids),
+                                conversation.last_used)
+
+    def append(self, session_id: str, question: str, answer: str, scheme_ids: list[str]):
+        """
+        Records a turn of a session and the schemes its answer was based on.
+
+        Args:
+            session_id (str): The session.
+            question (str): The English question.
+            answer (str): The answer.
+            scheme_ids (list[str]): The schemes retrieved for the question, reused for follow-ups. If empty, the
+                schemes of the previous turn are kept.
+        """
+        with self._lock:
+            self._evict_expired()
+            conversation = self._sessions.pop(session_id, None) or Conversation()
+            self._total_bytes -= conversation.size
+            conversation.turns.append(Turn(question, answer))
+            if scheme_ids:
+                conversation.scheme_ids = list(dict.fromkeys(scheme_ids))
+            conversation.last_used = time.monotonic()
+            self._compact(conversation)
+            self._sessions[session_id] = conversation
+            self._total_bytes += conversation.size
+            while self._total_bytes > self.max_total_bytes and len(self._sessions) > 1:
+                self._remove(next(iter(self._sessions)))
+                self.evicted += 1
+
+    def _compact(self, conversation: Conversation):
+        while conversation.turns and (len(conversation.turns) > self.max_turns or
+                                      conversation.size > self.max_session_bytes):
+            turn = conversation.turns.pop(0)
+            summary = f"{conversation.summary} Asked: {turn.question} Told: {_first_sentence(turn.answer)}".strip()
+            # Keep the most recent part of the summary, starting at a whole entry where possible
+            if len(summary) > self.summary_max_chars:
+                summary = summary[-self.summary_max_chars:]
+                start = summary.find(" Asked: ")
+                summary = summary[start + 1:] if start >= 0 else summary
+            conversation.summary = summary
+            self.compacted += 1
+
+    def _remove(self, session_id: str):
+        self._total_bytes -= self._sessions.pop(session_id).size
+
+    def _evict_expired(self):
+        deadline = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            session_id, conversation = next(iter(self._sessions.items()))
+            if conversation.last_used > deadline:
+                break
+            self._remove(session_id)
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._evict_expired()
+            return {"sessions": len(self._sessions), "bytes": self._total_bytes, "compacted": self.compacted,
+                    "evicted": self.evicted}
@@ -0,0 +1,94 @@
+import os
+from typing import Optional
+
+from processing.corpus import SchemeCorpus
+from processing.eligibility import ATTRIBUTES, attributes_path, extract_attributes, extract_corpus, read_attributes
+
+
+class EligibilityIndex:
+    """
+    In-memory index of the eligibility attributes of schemes: one bitset (a Python int, bit i for the i-th scheme)
+    per attribute value, plus one per attribute for the schemes that restrict it at all.
+
+    A scheme that does not mention an attribute is open to every value of it, so a query from a 65 year old widow
+    keeps the schemes for women, for people over 60 and those that say nothing about gender or age.
+
+    Args:
+        records: (scheme ID, attributes) pairs, see `processing.eligibility.scheme_attributes`.
+    """
+
+    def __init__(self, records: list[tuple[str, dict]]):
+        self.scheme_ids = [scheme_id for scheme_id, _ in records]
+        self._all = (1 << len(records)) - 1
+        self._values: dict[tuple[str, str], int] = {}
+        self._restricted: dict[str, int] = dict.fromkeys(ATTRIBUTES, 0)
+        for position, (_, attributes) in enumerate(records):
+            bit = 1 << position
+            for attribute, values in attributes.items():
+                self._restricted[attribute] = self._restricted.get(attribute, 0) | bit
+                for value in values:
+                    self._values[attribute, value] = self._values.get((attribute, value), 0) | bit
+        self.queries = 0
+        self.narrowed = 0
+
+    def __len__(self) -> int:
+        return len(self.scheme_ids)
+
+    def matching(self, query_attributes: dict[str, list[str]]) -> int:
+        """
+        Returns the bitset of schemes open to all the given attribute values (any of the values of an attribute).
+        """
+        bits = self._all
+        for attribute, values in query_attributes.items():
+            allowed = self._all & ~self._restricted.get(attribute, 0)
+            for value in values:
+                allowed |= self._values.get((attribute, value), 0)
+            bits &= allowed
+        return bits
+
+    def scheme_ids_of(self, bits: int) -> set[str]:
+        scheme_ids = set()
+        while bits:
+            lowest = bits & -bits
+            scheme_ids.add(self.scheme_ids[lowest.bit_length() - 1])
+            bits ^= lowest
+        return scheme_ids
+
+    def candidates(self, query: str) -> Optional[set[str]]:
+        """
+        Detects the eligibility attributes of a query and returns the IDs of the schemes open to them.
+
+        Args:
+            query (str): The English user query.
+
+        Returns:
+            Optional[set[str]]: The candidate scheme IDs, or None if the query does not narrow the schemes down
+                (no attributes detected, every scheme matches, or none does).
+        """
+        self.queries += 1
+        query_attributes = extract_attributes(query)
+        if not query_attributes:
+            return None
+        bits = self.matching(query_attributes)
+        if bits in (0, self._all):
+            return None
+        self.narrowed += 1
+        return self.scheme_ids_of(bits)
+
+    def stats(self) -> dict:
+        return {"schemes": len(self), "values": len(self._values), "queries": self.queries,
+                "narrowed": self.narrowed}
+
+
+def load_eligibility_index(corpus: SchemeCorpus) -> EligibilityIndex:
+    """
+    Loads the attributes extracted ahead of time (`python -m processing.eligibility`) if they cover the corpus,
+    otherwise extracts them, one scheme at a time, and stores them for the next start.
+    """
+    path = attributes_path(corpus.path)
+    scheme_ids = [entry.scheme_id for entry in corpus.entries]
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(corpus.path):
+        records = read_attributes(path)
+        if [scheme_id for scheme_id, _ in records] == scheme_ids:
+            return EligibilityIndex(records)
+    return EligibilityIndex(extract_corpus(corpus))
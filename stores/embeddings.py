@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from langchain_core.embeddings import Embeddings
+
+from services.executor import run_blocking
+from services.ratelimit import UpstreamLimiter, is_rate_limit_error, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache backed by SQLite, keyed by (model name, text hash).
+
+    Args:
+        path: Path of the SQLite database file.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._connection.commit()
+
+    def get_many(self, model: str, text_hashes: list[str]) -> dict[str, list[float]]:
+        """
+        Looks up cached vectors.
+
+        Returns:
+            dict[str, list[float]]: The cached vectors keyed by text hash; missing hashes are absent.
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(text_hashes), 500):
+                batch = text_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                )
+                for text_hash, blob in rows:
+                    found[text_hash] = list(struct.unpack(f"{len(blob) // 4}f", blob))
+        return found
+
+    def put_many(self, model: str, vectors: dict[str, list[float]]):
+        """
+        Stores vectors keyed by text hash.
+        """
+        rows = [(model, text_hash, struct.pack(f"{len(vector)}f", *vector)) for text_hash, vector in vectors.items()]
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._connection.commit()
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic local embedder for offline runs and benchmarks.
+
+    Vectors are derived from a hash of the text, so identical texts always get identical vectors.
+
+    Args:
+        size: Dimension of the produced vectors.
+        latency: Seconds to sleep per call, to simulate a remote API.
+    """
+
+    def __init__(self, size: int = 768, latency: float = 0.0):
+        self.size = size
+        self.latency = latency
+        self.model = f"fake-{size}"
+
+    def _embed(self, text: str) -> list[float]:
+        rng = random.Random(_text_hash(text))
+        return [rng.uniform(-1.0, 1.0) for _ in range(self.size)]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+
+class BatchedCachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings backend with batching, bounded concurrency, retries and a persistent cache.
+
+    Args:
+        embeddings: The underlying embeddings backend (e.g. GoogleGenerativeAIEmbeddings or FakeEmbeddings).
+        batch_size: Number of texts sent per embedding request.
+        max_concurrency: Maximum number of embedding requests in flight at once.
+        max_retries: Number of retries on rate limit errors before giving up.
+        backoff_seconds: Initial backoff delay, doubled (with jitter) after every retry.
+        cache_path: Path of the SQLite embedding cache, or None to disable caching.
+        limiter: Admission control of the embedding API shared with other callers, if any. Query embeddings are
+            shed when it is overloaded; document batches (index builds) wait their turn. `aembed_query` is admitted
+            on the event loop, so queued queries do not hold threads of the shared executor.
+    """
+
+    def __init__(self, embeddings: Embeddings, batch_size: int = 100, max_concurrency: int = 4,
+                 max_retries: int = 5, backoff_seconds: float = 1.0, cache_path: Optional[str] = None,
+                 limiter: Optional[UpstreamLimiter] = None):
+        self._embeddings = embeddings
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.model = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None) \
+            or type(embeddings).__name__
+        self._cache = EmbeddingCache(cache_path) if cache_path else None
+        self._limiter = limiter
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """
+        Returns how long to wait before retrying a failed request, or re-raises errors that are not retried.
+        """
+        if attempt == self.max_retries or not is_rate_limit_error(error):
+            raise error
+        sleep_for = retry_after_seconds(error)
+        if sleep_for is None:
+            sleep_for = self.backoff_seconds * 2 ** attempt * (1 + random.random())
+        logger.warning(f"Embedding request rate limited, retrying in {sleep_for:.1f}s: {error}")
+        if self._limiter is not None:
+            # The limiter holds off every caller of the embedding API, not just this one
+            self._limiter.pause(sleep_for)
+            return 0.0
+        return sleep_for
+
+    def _with_retries(self, function, *args, shed: bool = False):
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self._limiter is None:
+                    return function(*args)
+                with self._limiter.slot(shed=shed):
+                    return function(*args)
+            except Exception as e:
+                time.sleep(self._retry_delay(e, attempt))
+
+    async def _awith_retries(self, function, *args):
+        """
+        Event loop counterpart of `_with_retries`: callers queue for admission on the event loop and only admitted
+        requests take a thread of the shared executor. Always sheds when the limiter is overloaded.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self._limiter is None:
+                    return await run_blocking(function, *args)
+                async with self._limiter.aslot():
+                    return await run_blocking(function, *args)
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(e, attempt))
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        return self._with_retries(self._embeddings.embed_documents, texts)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes = [_text_hash(text) for text in texts]
+        vectors = self._cache.get_many(self.model, list(set(hashes))) if self._cache else {}
+
+        # Identical texts are embedded once, even within a single call
+        missing = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in vectors:
+                missing.setdefault(text_hash, text)
+
+        if missing:
+            missing_hashes = list(missing)
+            batches = [missing_hashes[start:start + self.batch_size]
+                       for start in range(0, len(missing_hashes), self.batch_size)]
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                results = executor.map(lambda batch: self._embed_batch([missing[h] for h in batch]), batches)
+                for batch, batch_vectors in zip(batches, results):
+                    embedded = dict(zip(batch, batch_vectors))
+                    if self._cache:
+                        self._cache.put_many(self.model, embedded)
+                    vectors.update(embedded)
+
+        return [vectors[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        # Query embeddings may use a different task type than document embeddings, so they are cached apart
+        model = f"{self.model}:query"
+        text_hash = _text_hash(text)
+        if self._cache:
+            cached = self._cache.get_many(model, [text_hash])
+            if text_hash in cached:
+                return cached[text_hash]
+
+        vector = self._with_retries(self._embeddings.embed_query, text, shed=True)
+        if self._cache:
+            self._cache.put_many(model, {text_hash: vector})
+        return vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        model = f"{self.model}:query"
+        text_hash = _text_hash(text)
+        if self._cache:
+            cached = await run_blocking(self._cache.get_many, model, [text_hash])
+            if text_hash in cached:
+                return cached[text_hash]
+
+        vector = await self._awith_retries(self._embeddings.embed_query, text)
+        if self._cache:
+            await run_blocking(self._cache.put_many, model, {text_hash: vector})
+        return vector
@@ -0,0 +1,127 @@
+from typing import Iterable, Optional
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from processing.corpus import SchemeCorpus
+from stores.eligibility import EligibilityIndex
+from stores.lexical import LexicalIndex
+
+# Constant of reciprocal rank fusion; higher values flatten the difference between top and lower ranks
+_RRF_K = 60
+
+
+def document_key(document: Document):
+    """
+    Returns the key identifying a chunk, shared by the vector store and the lexical index.
+    """
+    return document.metadata.get("chunk_id")
+
+
+def fuse_rankings(rankings: Iterable[list[Document]], k: int) -> list[Document]:
+    """
+    Fuses rankings of chunks with reciprocal rank fusion and returns the best `k` chunks, best first.
+    """
+    scores, documents = {}, {}
+    for results in rankings:
+        for rank, document in enumerate(results):
+            key = document_key(document)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (_RRF_K + rank + 1)
+            documents.setdefault(key, document)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ranked[:k]]
+
+
+class HybridRetriever:
+    """
+    Retrieves schemes by fusing BM25 and vector search results with reciprocal rank fusion.
+
+    Queries that are exactly a scheme name or acronym are answered from the lexical index alone. Tags, and the
+    eligibility attributes detected in the query (age, gender, state, ...), restrict both searches to the schemes
+    carrying them.
+
+    Args:
+        vectorstore: The vector store holding the scheme documents.
+        lexical_index: The BM25 index over the same documents.
+        fetch_k: Number of results taken from each search before fusion.
+        corpus: If given, the content of chunks the lexical index keeps without it is read from this corpus.
+        eligibility_index: If given, schemes the query's eligibility attributes rule out are not searched.
+    """
+
+    def __init__(self, vectorstore: VectorStore, lexical_index: LexicalIndex, fetch_k: int = 20,
+                 corpus: Optional[SchemeCorpus] = None, eligibility_index: Optional[EligibilityIndex] = None):
+        self.vectorstore = vectorstore
+        self.lexical_index = lexical_index
+        self.fetch_k = fetch_k
+        self.corpus = corpus
+        self.eligibility_index = eligibility_index
+
+    def _with_content(self, documents: list[Document]) -> list[Document]:
+        """
+        Reads the content of chunks that only carry metadata from the corpus, one read per scheme.
+        """
+        if self.corpus is None or all(document.page_content for document in documents):
+            return documents
+        chunks = {}
+        for scheme_id in {document.metadata.get("scheme_id") for document in documents if not document.page_content}:
+            chunks.update((document_key(chunk), chunk) for chunk in self.corpus.documents(scheme_id))
+        return [document if document.page_content else chunks.get(document_key(document), document)
+                for document in documents]
+
+    def exact_matches(self, query: str) -> list[Document]:
+        """
+        Returns the chunks of the scheme(s) the query names exactly, without any embedding call.
+        """
+        return self._with_content([self.lexical_index.documents[index]
+                                   for index in self.lexical_index.lookup_name(query)])
+
+    def scheme_documents(self, scheme_ids: Iterable[str], tags: Optional[Iterable[str]] = None) -> list[Document]:
+        """
+        Returns the chunks of the given schemes, in the given order, without searching. With `tags`, only the
+        schemes carrying any of them are kept.
+        """
+        order = {scheme_id: position for position, scheme_id in enumerate(scheme_ids)}
+        candidates = self.lexical_index.filter_by_schemes(order)
+        if tags:
+            candidates &= self.lexical_index.filter_by_tags(tags)
+        indices = sorted(candidates,
+                         key=lambda index: (order[self.lexical_index.documents[index].metadata["scheme_id"]], index))
+        return self._with_content([self.lexical_index.documents[index] for index in indices])
+
+    def search(self, query: str, query_embedding: list[float], k: int = 4,
+               tags: Optional[Iterable[str]] = None) -> list[Document]:
+        """
+        Runs lexical and vector search and fuses their rankings.
+
+        Args:
+            query (str): The English user query.
+            query_embedding (list[float]): The embedding of the query.
+            k (int): Number of chunks to return.
+            tags (Optional[Iterable[str]]): If given, only schemes with any of these tags are considered.
+
+        Returns:
+            list[Document]: The best chunks, best first.
+        """
+        candidates = self.lexical_index.filter_by_tags(tags) if tags else None
+        if not candidates:
+            candidates = None
+
+        eligible_schemes = self.eligibility_index.candidates(query) if self.eligibility_index else None
+        if eligible_schemes is not None:
+            eligible = self.lexical_index.filter_by_schemes(eligible_schemes)
+            # Attribute detection is heuristic, so it only narrows the tag filter, never empties it
+            if candidates is None or candidates & eligible:
+                candidates = eligible if candidates is None else candidates & eligible
+
+        vector_filter = None
+        if candidates is not None:
+            scheme_ids = {self.lexical_index.documents[index].metadata["scheme_id"] for index in candidates}
+            vector_filter = {"scheme_id": {"$in": sorted(scheme_ids)}}
+
+        lexical_results = [self.lexical_index.documents[index]
+                           for index, _ in self.lexical_index.search(query, self.fetch_k, candidates)]
+        vector_results = self.vectorstore.similarity_search_by_vector(query_embedding, k=self.fetch_k,
+                                                                      filter=vector_filter)
+
+        return self._with_content(fuse_rankings([lexical_results, vector_results], k))
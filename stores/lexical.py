@@ -0,0 +1,158 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+from langchain_core.documents import Document
+
+from processing.documents import TAG_SEPARATOR
+
+# Number of extra times the scheme name and tags of a chunk are counted (a simple field boost)
+NAME_BOOST = 2
+TAG_BOOST = 2
+
+# Words skipped when deriving acronyms from scheme names, e.g. "Pradhan Mantri Jan Arogya Yojana" -> "pmjay"
+_ACRONYM_STOP_WORDS = {"of", "for", "the", "and", "to", "in", "on", "a", "an"}
+
+# Minimum length of acronyms derived from initials; shorter ones collide with common words ("hi", "ms")
+_MIN_DERIVED_ACRONYM_LENGTH = 3
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_PARENTHESIZED_PATTERN = re.compile(r"\(([^)]*)\)")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_name(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+def scheme_acronyms(scheme_name: str) -> set[str]:
+    """
+    Derives the acronyms a scheme is likely referred to by.
+
+    Both acronyms written in parentheses in the name, e.g. "(PMJAY)", and the initials of the remaining words are used.
+    Initials shorter than three letters are dropped, so that words like "hi" or "ms" do not route to a scheme;
+    two-letter acronyms are only kept when the name writes them in parentheses.
+
+    Args:
+        scheme_name (str): The scheme name.
+
+    Returns:
+        set[str]: The lowercase acronyms.
+    """
+    acronyms = set()
+    for parenthesized in _PARENTHESIZED_PATTERN.findall(scheme_name):
+        acronyms.update(token for token in tokenize(parenthesized) if len(token) >= 2)
+
+    words = [word for word in tokenize(_PARENTHESIZED_PATTERN.sub(" ", scheme_name)) if not word.isdigit()]
+    initials = {"".join(word[0] for word in words),
+                "".join(word[0] for word in words if word not in _ACRONYM_STOP_WORDS)}
+    acronyms.update(initial for initial in initials if len(initial) >= _MIN_DERIVED_ACRONYM_LENGTH)
+    return acronyms
+
+
+class LexicalIndex:
+    """
+    In-process BM25 index over scheme chunks, with exact scheme name / acronym and tag lookups.
+
+    Args:
+        documents: The scheme chunks, as produced by `load_json_to_langchain_document_schema`.
+        k1: BM25 term frequency saturation.
+        b: BM25 document length normalization.
+        keep_content: If False, `documents` only keeps the metadata of the chunks (with empty page content), for
+            callers that read the content from the corpus when needed.
+    """
+
+    def __init__(self, documents: Iterable[Document], k1: float = 1.5, b: float = 0.75, keep_content: bool = True):
+        self.documents: list[Document] = []
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self._lengths: list[int] = []
+        self._names: dict[str, set[int]] = defaultdict(set)
+        self._tags: dict[str, set[int]] = defaultdict(set)
+        self._schemes: dict[str, list[int]] = defaultdict(list)
+
+        for index, document in enumerate(documents):
+            self.documents.append(document if keep_content else Document(page_content="", metadata=document.metadata))
+            scheme_name = document.metadata.get("scheme_name") or ""
+            tags = [tag for tag in (document.metadata.get("tags") or "").split(TAG_SEPARATOR) if tag]
+            acronyms = scheme_acronyms(scheme_name) if scheme_name else set()
+
+            tokens = tokenize(document.page_content) + list(acronyms)
+            tokens.extend(tokenize(scheme_name) * NAME_BOOST)
+            tokens.extend(tokenize(" ".join(tags)) * TAG_BOOST)
+
+            for term, frequency in Counter(tokens).items():
+                self._postings[term].append((index, frequency))
+            self._lengths.append(len(tokens))
+
+            if scheme_name:
+                self._names[normalize_name(scheme_name)].add(index)
+                self._names[normalize_name(_PARENTHESIZED_PATTERN.sub(" ", scheme_name))].add(index)
+            for acronym in acronyms:
+                self._names[acronym].add(index)
+            for tag in tags:
+                self._tags[normalize_name(tag)].add(index)
+            self._schemes[document.metadata.get("scheme_id")].append(index)
+
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+    def lookup_name(self, query: str) -> list[int]:
+        """
+        Finds the chunks of schemes whose exact name or acronym is the whole query.
+
+        Args:
+            query (str): The user query.
+
+        Returns:
+            list[int]: Indices of the matching chunks, empty if the query is not a scheme name.
+        """
+        return sorted(self._names.get(normalize_name(query), ()))
+
+    def filter_by_tags(self, tags: Iterable[str]) -> set[int]:
+        """
+        Returns the indices of chunks of schemes carrying any of the given tags.
+        """
+        candidates = set()
+        for tag in tags:
+            candidates |= self._tags.get(normalize_name(tag), set())
+        return candidates
+
+    def filter_by_schemes(self, scheme_ids: Iterable[str]) -> set[int]:
+        """
+        Returns the indices of chunks of the given schemes.
+        """
+        candidates = set()
+        for scheme_id in scheme_ids:
+            candidates.update(self._schemes.get(scheme_id, ()))
+        return candidates
+
+    def search(self, query: str, k: int, candidates: Optional[set[int]] = None) -> list[tuple[int, float]]:
+        """
+        Ranks documents against the query with BM25.
+
+        Args:
+            query (str): The user query.
+            k (int): Maximum number of results.
+            candidates (Optional[set[int]]): If given, only these document indices are scored.
+
+        Returns:
+            list[tuple[int, float]]: Document indices and scores, best first.
+        """
+        total = len(self._lengths)
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for index, frequency in postings:
+                if candidates is not None and index not in candidates:
+                    continue
+                length_norm = 1 - self.b + self.b * self._lengths[index] / self._average_length
+                scores[index] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
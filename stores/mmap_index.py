@@ -0,0 +1,284 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import Any, Iterable, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+import configs.config as config
+from stores.chroma import document_id
+
+# Storage types of the embedding matrix; int8 rows are scaled by a per-row float32 factor
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Rows scored per matrix product, bounding the float32 temporaries of float16/int8 indexes
+_BLOCK_ROWS = 8192
+
+_CURRENT_FILE = "CURRENT"
+
+
+def _matches(metadata: dict, filter: dict) -> bool:
+    """
+    Evaluates a Chroma-style metadata filter: {"key": value}, {"key": {"$eq"|"$ne"|"$in"|"$nin": ...}},
+    {"$and": [...]} and {"$or": [...]}.
+    """
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(_matches(metadata, part) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(metadata, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if operator == "$eq" and value != operand:
+                    return False
+                if operator == "$ne" and value == operand:
+                    return False
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$nin" and value in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class MmapVectorStore(VectorStore):
+    """
+    Read-only exact vector index over a memory-mapped embedding matrix.
+
+    The index directory holds `vectors.npy` (one L2-normalized row per document, float32, float16 or int8),
+    `scales.npy` (per-row factors of int8 rows), `documents.jsonl` (content and metadata) and `offsets.npy`
+    (byte offset of every line of documents.jsonl). The matrix and offsets are mapped, not read, so every
+    process opening the same index shares its pages through the OS page cache.
+
+    Search is brute-force cosine similarity, which is exact and fast at the size of the scheme corpus.
+
+    Args:
+        directory: The index directory, as written by `store_mmap_embeddings`.
+        embeddings: The embeddings used for queries.
+    """
+
+    def __init__(self, directory: str, embeddings: Embeddings):
+        self.directory = directory
+        self._embeddings = embeddings
+        self._vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        scales_path = os.path.join(directory, "scales.npy")
+        self._scales = np.load(scales_path, mmap_mode="r") if os.path.exists(scales_path) else None
+        self._offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+        self._documents_file = open(os.path.join(directory, "documents.jsonl"), "rb")
+        self._documents_lock = threading.Lock()
+        # Rows per metadata value of a key, built on first use of the key in a filter
+        self._postings: dict[str, dict[Any, np.ndarray]] = {}
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embeddings
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def _read_row(self, row: int) -> dict:
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        with self._documents_lock:
+            self._documents_file.seek(start)
+            return json.loads(self._documents_file.read(end - start))
+
+    def _document(self, row: int) -> Document:
+        record = self._read_row(row)
+        return Document(page_content=record["page_content"], metadata=record["metadata"])
+
+    def ids(self) -> list[str]:
+        return [self._read_row(row)["id"] for row in range(len(self))]
+
+    def _rows_with(self, key: str, values: Iterable) -> np.ndarray:
+        """
+        Returns the sorted rows whose metadata value of `key` is one of `values`.
+        """
+        if key not in self._postings:
+            postings: dict[Any, list[int]] = {}
+            for row in range(len(self)):
+                postings.setdefault(self._read_row(row)["metadata"].get(key), []).append(row)
+            self._postings[key] = {value: np.asarray(rows, dtype=np.int64) for value, rows in postings.items()}
+        arrays = [self._postings[key][value] for value in set(values) if value in self._postings[key]]
+        return np.unique(np.concatenate(arrays)) if arrays else np.empty(0, dtype=np.int64)
+
+    def _candidate_rows(self, filter: Optional[dict]) -> Optional[np.ndarray]:
+        """
+        Returns the rows matching the filter, or None for all rows.
+        """
+        if not filter:
+            return None
+        if not any(key.startswith("$") for key in filter) and all(
+                not isinstance(value, dict) or set(value) <= {"$eq", "$in"} for value in filter.values()):
+            # Plain equality / membership filters are answered from the postings of the keys they mention
+            rows = None
+            for key, condition in filter.items():
+                conditions = condition.items() if isinstance(condition, dict) else [("$eq", condition)]
+                for operator, operand in conditions:
+                    matched = self._rows_with(key, operand if operator == "$in" else [operand])
+                    rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+            return rows
+        rows = [row for row in range(len(self)) if _matches(self._read_row(row)["metadata"], filter)]
+        return np.asarray(rows, dtype=np.int64)
+
+    def _scores(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        total = len(self) if rows is None else len(rows)
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, _BLOCK_ROWS):
+            block = slice(start, min(start + _BLOCK_ROWS, total))
+            selected = self._vectors[block] if rows is None else self._vectors[rows[block]]
+            scores[block] = selected.astype(np.float32, copy=False) @ query
+            if self._scales is not None:
+                scores[block] *= self._scales[block] if rows is None else self._scales[rows[block]]
+        return scores
+
+    def similarity_search_by_vector_with_score(self, embedding: list[float], k: int = 4,
+                                               filter: Optional[dict] = None) -> list[tuple[Document, float]]:
+        """
+        Finds the k documents most similar to the embedding.
+
+        Args:
+            embedding (list[float]): The query embedding.
+            k (int): Number of documents to return.
+            filter (Optional[dict]): A Chroma-style metadata filter.
+
+        Returns:
+            list[tuple[Document, float]]: The documents with their cosine similarity, most similar first.
+        """
+        rows = self._candidate_rows(filter)
+        total = len(self) if rows is None else len(rows)
+        if total == 0 or k <= 0:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        scores = self._scores(query, rows)
+        k = min(k, total)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self._document(int(index if rows is None else rows[index])), float(scores[index]))
+                for index in best]
+
+    def similarity_search_by_vector(self, embedding: list[float], k: int = 4, filter: Optional[dict] = None,
+                                    **kwargs: Any) -> list[Document]:
+        return [document for document, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                     **kwargs: Any) -> list[tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embeddings.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                          **kwargs: Any) -> list[Document]:
+        return self.similarity_search_by_vector(self._embeddings.embed_query(query), k, filter)
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] to a relevance score in [0, 1]
+        return lambda score: (score + 1) / 2
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[list[dict]] = None, **kwargs: Any) -> list[str]:
+        raise NotImplementedError("MmapVectorStore is read-only; rebuild it with store_mmap_embeddings")
+
+    @classmethod
+    def from_texts(cls, texts: list[str], embedding: Embeddings, metadatas: Optional[list[dict]] = None,
+                   directory: str = config.MMAP_INDEX_DIRECTORY, dtype: str = config.MMAP_INDEX_DTYPE,
+                   **kwargs: Any) -> "MmapVectorStore":
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        return store_mmap_embeddings(documents, embedding, directory, dtype)
+
+
+def _write_index(directory: str, ids: list[str], documents: list[Document], vectors: np.ndarray, dtype: str):
+    os.makedirs(directory)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms > 0, norms, 1)
+
+    if dtype == "int8":
+        peaks = np.abs(vectors).max(axis=1)
+        scales = np.where(peaks > 0, peaks / 127, 1).astype(np.float32)
+        np.save(os.path.join(directory, "scales.npy"), scales)
+        vectors = np.round(vectors / scales[:, None]).astype(np.int8)
+    np.save(os.path.join(directory, "vectors.npy"), vectors.astype(DTYPES[dtype], copy=False))
+
+    offsets = [0]
+    with open(os.path.join(directory, "documents.jsonl"), "wb") as f:
+        for doc_id, document in zip(ids, documents):
+            line = json.dumps({"id": doc_id, "page_content": document.page_content, "metadata": document.metadata},
+                              ensure_ascii=False).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    np.save(os.path.join(directory, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+
+
+def store_mmap_embeddings(documents: list[Document], embeddings: Embeddings,
+                          directory: str = config.MMAP_INDEX_DIRECTORY,
+                          dtype: str = config.MMAP_INDEX_DTYPE) -> MmapVectorStore:
+    """
+    Brings the memory-mapped index in `directory` up to date with the documents and opens it.
+
+    Every version of the index lives in a subdirectory named after the hash of its document IDs and storage
+    type, and the CURRENT file names the live one. Unchanged corpora are opened without any work; otherwise
+    vectors of unchanged documents are reused and only new or changed ones (content or metadata) are embedded. A
+    file lock makes sure only one of several workers starting together builds the index.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(DTYPES)}")
+
+    # Only exact duplicates, same content and metadata, share an ID
+    wanted = {document_id(document): document for document in documents}
+    ids = list(wanted)
+    version = hashlib.sha256("\n".join([dtype, *ids]).encode("utf-8")).hexdigest()[:16]
+
+    os.makedirs(directory, exist_ok=True)
+    current_path = os.path.join(directory, _CURRENT_FILE)
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            current = None
+            if os.path.exists(current_path):
+                with open(current_path, encoding="utf-8") as f:
+                    current = f.read().strip()
+            if current == version:
+                return MmapVectorStore(os.path.join(directory, version), embeddings)
+
+            vectors = {}
+            if current and os.path.isdir(os.path.join(directory, current)):
+                previous = MmapVectorStore(os.path.join(directory, current), embeddings)
+                for row, doc_id in enumerate(previous.ids()):
+                    # int8 rows are only approximate, so they are re-embedded (from the embedding cache)
+                    if doc_id in wanted and previous._scales is None:
+                        vectors[doc_id] = np.asarray(previous._vectors[row], dtype=np.float32)
+
+            new_ids = [doc_id for doc_id in ids if doc_id not in vectors]
+            if new_ids:
+                embedded = embeddings.embed_documents([wanted[doc_id].page_content for doc_id in new_ids])
+                vectors.update(zip(new_ids, (np.asarray(vector, dtype=np.float32) for vector in embedded)))
+
+            version_directory = os.path.join(directory, version)
+            shutil.rmtree(version_directory, ignore_errors=True)
+            matrix = np.stack([vectors[doc_id] for doc_id in ids]) if ids else np.zeros((0, 0), np.float32)
+            _write_index(version_directory, ids, [wanted[doc_id] for doc_id in ids], matrix, dtype)
+
+            temp_path = f"{current_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(version)
+            os.replace(temp_path, current_path)
+
+            # Processes still mapping an old version keep their pages until they reopen the index
+            for name in os.listdir(directory):
+                if name != version and os.path.isdir(os.path.join(directory, name)):
+                    shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+            return MmapVectorStore(version_directory, embeddings)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    audio: Optional[bytes]
+    media_type: str = "audio/mpeg"
+    # The schemes the answer was based on, so a session answered from the cache can still ask follow-ups
+    scheme_ids: list[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class SemanticCache:
+    """
+    Cache of generated answers keyed by the embedding of the English query, the target language code, the tags
+    the schemes were filtered by and the eligibility attributes detected in the query.
+
+    A lookup returns the answer of the most similar cached query in the same language and with the same tags and
+    attributes if the cosine similarity is at least `threshold`: near-duplicate queries for another state, gender
+    or age are answered from other schemes, so they do not share answers. Entries are evicted least-recently-used beyond `max_entries` and after
+    `ttl_seconds`.
+
+    Args:
+        threshold: Minimum cosine similarity for a hit.
+        max_entries: Maximum number of cached answers.
+        ttl_seconds: Lifetime of an entry in seconds.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, tuple[tuple, np.ndarray, CachedAnswer]] = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _scope(language_code: str, tags: Iterable[str], attributes: Optional[dict[str, list[str]]]) -> tuple:
+        return (language_code, tuple(sorted({tag.strip().casefold() for tag in tags})),
+                tuple(sorted((attribute, tuple(sorted(values))) for attribute, values in (attributes or {}).items())))
+
+    def lookup(self, embedding: list[float], language_code: str, tags: Iterable[str] = (),
+               attributes: Optional[dict[str, list[str]]] = None) -> Optional[CachedAnswer]:
+        """
+        Finds a cached answer for a semantically similar query in the same language, with the same tag filter and
+        the same eligibility attributes.
+
+        Args:
+            embedding (list[float]): The embedding of the English query.
+            language_code (str): The language code of the requested answer.
+            tags (Iterable[str]): The tags the schemes were filtered by.
+            attributes (Optional[dict[str, list[str]]]): The eligibility attributes detected in the query.
+
+        Returns:
+            Optional[CachedAnswer]: The cached answer on a hit, otherwise None.
+        """
+        query = self._normalize(embedding)
+        scope = self._scope(language_code, tags, attributes)
+        with self._lock:
+            self._evict_expired()
+            keys = [key for key, (entry_scope, _, _) in self._entries.items() if entry_scope == scope]
+            if keys:
+                similarities = np.stack([self._entries[key][1] for key in keys]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return self._entries[keys[best]][2]
+            self.misses += 1
+            return None
+
+    def store(self, embedding: list[float], language_code: str, answer: CachedAnswer, tags: Iterable[str] = (),
+              attributes: Optional[dict[str, list[str]]] = None):
+        """
+        Adds an answer to the cache, evicting the least recently used entry if the cache is full.
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._entries[self._next_key] = (self._scope(language_code, tags, attributes), vector, answer)
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """
+        Drops every cached answer, e.g. after the scheme index has been rebuilt.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _evict_expired(self):
+        deadline = time.monotonic() - self.ttl_seconds
+        expired = [key for key, (_, _, answer) in self._entries.items() if answer.created_at <= deadline]
+        for key in expired:
+            del self._entries[key]
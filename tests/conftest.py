@@ -0,0 +1,59 @@
+import argparse
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Seconds per fake LLM call, long enough to tell overlapping calls from serialized ones
+LLM_LATENCY = 0.3
+
+_cwd = os.getcwd()
+_workdir = None
+
+
+def pytest_configure(config):
+    """
+    Points the app at a synthetic corpus and raises the upstream rate limits so they do not throttle the tests.
+    Runs before collection, since `configs.config` reads the environment when it is first imported.
+    """
+    global _workdir
+    from benchmarks.run import prepare_workdir
+
+    for name in ("GEMINI_RPS", "EMBEDDINGS_RPS", "TTS_RPS"):
+        os.environ[name] = "1000"
+    os.environ["TTS_PRESYNTHESIZE"] = "false"
+    _workdir = tempfile.mkdtemp(prefix="udhavibot-tests-")
+    prepare_workdir(_workdir, corpus_size=50)
+
+
+def pytest_unconfigure(config):
+    os.chdir(_cwd)
+    if _workdir:
+        shutil.rmtree(_workdir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def offline_app():
+    """
+    The app module with local stand-ins for every Google API. Resources are not built, see `ready_app`.
+    """
+    from benchmarks.run import install_fakes
+
+    install_fakes(argparse.Namespace(llm_latency=LLM_LATENCY, embed_latency=0.0, stt_latency=0.0, tts_latency=0.0,
+                                     dim=64))
+    return importlib.import_module("app")
+
+
+@pytest.fixture(scope="session")
+def ready_app(offline_app):
+    """
+    The offline app with its resources built.
+    """
+    offline_app.resources.set(offline_app.build_resources())
+    return offline_app
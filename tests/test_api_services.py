@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from services.api_services import iter_scheme_slugs
+
+PAGE_SIZE = 2
+
+
+class MockSchemesApi:
+    """
+    Local stand-in for the paginated schemes API. Each page answers with its slugs unless a list of
+    (status, headers, payload) responses is scripted for it, which are served (one per request) first.
+    """
+
+    def __init__(self, total: int):
+        self.total = total
+        self.scripts: dict[int, list[tuple[int, dict, dict]]] = {}
+        self.delays: dict[int, threading.Event] = {}
+        self.requests: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def page(self, start: int) -> dict:
+        items = [{"fields": {"slug": f"scheme-{number}"}}
+                 for number in range(start, min(start + PAGE_SIZE, self.total))]
+        return {"status": "Success", "data": {"hits": {"items": items}}}
+
+    def respond(self, start: int) -> tuple[int, dict, dict]:
+        with self._lock:
+            self.requests[start] = self.requests.get(start, 0) + 1
+            script = self.scripts.get(start)
+            if script:
+                return script.pop(0)
+        if start in self.delays:
+            self.delays[start].wait(timeout=5)
+        return 200, {}, self.page(start)
+
+
+@pytest.fixture
+def mock_api():
+    api = MockSchemesApi(total=3 * PAGE_SIZE)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            start = int(parse_qs(urlparse(self.path).query)["from"][0])
+            status, headers, payload = api.respond(start)
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            for name, value in {"Content-Type": "application/json", **headers}.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    api.base_url = f"http://127.0.0.1:{server.server_address[1]}/search?size="
+    yield api
+    for event in api.delays.values():
+        event.set()
+    server.shutdown()
+    server.server_close()
+
+
+def slugs(api: MockSchemesApi, errors: Optional[list[str]] = None, **kwargs) -> list[str]:
+    kwargs.setdefault("backoff_seconds", 0.01)
+    return sorted(iter_scheme_slugs(api.base_url, api.total, PAGE_SIZE, {}, errors=errors, **kwargs))
+
+
+def all_slugs(api: MockSchemesApi) -> list[str]:
+    return sorted(f"scheme-{number}" for number in range(api.total))
+
+
+def test_waits_for_retry_after_on_429(mock_api):
+    mock_api.scripts[0] = [(429, {"Retry-After": "1"}, {})]
+    started = time.monotonic()
+    assert slugs(mock_api) == all_slugs(mock_api)
+    assert time.monotonic() - started >= 1
+    assert mock_api.requests[0] == 2
+
+
+def test_retries_server_errors(mock_api):
+    mock_api.scripts[PAGE_SIZE] = [(503, {}, {}), (500, {}, {})]
+    errors = []
+    assert slugs(mock_api, errors) == all_slugs(mock_api)
+    assert errors == []
+    assert mock_api.requests[PAGE_SIZE] == 3
+
+
+def test_reports_pages_failing_after_all_retries(mock_api):
+    mock_api.scripts[PAGE_SIZE] = [(502, {}, {})] * 3
+    errors = []
+    assert slugs(mock_api, errors, max_retries=2) == ["scheme-0", "scheme-1", "scheme-4", "scheme-5"]
+    assert len(errors) == 1 and errors[0].startswith(f"Request failed for start={PAGE_SIZE}: 502")
+
+
+def test_reports_error_payloads(mock_api):
+    mock_api.scripts[0] = [(200, {}, {"status": "Failed", "errorDescription": "Invalid API key"})]
+    errors = []
+    assert slugs(mock_api, errors) == ["scheme-2", "scheme-3", "scheme-4", "scheme-5"]
+    assert errors == ["Error fetching data for start=0: Invalid API key"]
+
+
+def test_yields_slugs_before_all_pages_arrive(mock_api):
+    slow_pages = [PAGE_SIZE, 2 * PAGE_SIZE]
+    for start in slow_pages:
+        mock_api.delays[start] = threading.Event()
+    iterator = iter_scheme_slugs(mock_api.base_url, mock_api.total, PAGE_SIZE, {})
+
+    # The slow pages are held for up to 5 seconds, so the first page must be yielded while they are pending
+    started = time.monotonic()
+    first = [next(iterator), next(iterator)]
+    assert time.monotonic() - started < 2
+    assert sorted(first) == ["scheme-0", "scheme-1"]
+
+    for start in slow_pages:
+        mock_api.delays[start].set()
+    assert sorted(first + list(iterator)) == all_slugs(mock_api)
@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+from conftest import LLM_LATENCY
+
+CONCURRENCY = 16
+
+
+def test_concurrent_chats_overlap(ready_app, monkeypatch):
+    app = ready_app
+    # Every request runs the full pipeline
+    monkeypatch.setattr(app.answer_cache, "threshold", float("inf"))
+
+    async def chat(text: str) -> float:
+        started = time.perf_counter()
+        response = await app.chat(text=text, file=None, tags=None, mode="two_call", session_id=None)
+        assert "response" in response, response
+        return time.perf_counter() - started
+
+    async def run():
+        single = await chat("What schemes are available for farmers?")
+        started = time.perf_counter()
+        # Distinct questions, so single-flight does not merge them
+        await asyncio.gather(*(chat(f"What scholarships are available for students in class {number}?")
+                               for number in range(CONCURRENCY)))
+        return single, time.perf_counter() - started
+
+    single, wall = asyncio.run(run())
+    assert single >= LLM_LATENCY
+    # Requests wait on the LLM concurrently instead of one after another
+    assert wall < single + 2 * LLM_LATENCY, (single, wall)
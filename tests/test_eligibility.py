@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from processing.eligibility import extract_attributes
+
+
+@pytest.mark.parametrize("text, attributes", [
+    ("The applicant should be a woman aged between 18 and 40 years and a resident of Tamil Nadu.",
+     {"gender": ["female"], "age": ["18-25", "26-35", "36-45"], "state": ["Tamil Nadu"]}),
+    ("Annual family income should not exceed Rs. 2,50,000.", {"income": ["1l-2.5l", "upto-1l"]}),
+    ("The applicant should be not less than 18 years of age.",
+     {"age": ["18-25", "26-35", "36-45", "46-59", "60+"]}),
+    ("The annual family income of the applicant should be below Rs. 2 lakh.", {"income": ["1l-2.5l", "upto-1l"]}),
+    ("The applicant must be a farmer and should not be an income tax payer.", {"occupation": ["farmer"]}),
+    ("Students belonging to Scheduled Castes studying in Class IX or X.",
+     {"occupation": ["student"], "caste": ["sc"]}),
+    ("Senior citizens above 60 years of age.", {"age": ["60+"]}),
+])
+def test_extracts_restrictions(text, attributes):
+    assert extract_attributes(text) == attributes
+
+
+@pytest.mark.parametrize("text", [
+    "Open to all. Women, SC/ST applicants get preference.",
+    "The applicant should not be covered under any pension scheme for workers.",
+    "Priority will be given to widows and persons with disabilities.",
+    "The scheme is open to all citizens irrespective of gender or caste.",
+    "Applicants other than farmers may also apply.",
+    "There is no income limit.",
+])
+def test_ignores_negation_and_preference(text):
+    assert extract_attributes(text) == {}
+
+
+def test_answers_are_not_shared_across_eligibility_attributes(ready_app, monkeypatch):
+    app = ready_app
+    # Any cached query in the same scope is similar enough
+    monkeypatch.setattr(app.answer_cache, "threshold", -1.0)
+
+    def ask(text: str) -> dict:
+        return asyncio.run(app.chat(text=text, file=None, tags=None, mode="two_call", session_id=None))
+
+    ask("Pension schemes for widows in Tamil Nadu")
+    hits = app.answer_cache.hits
+    ask("Pension schemes for widows in Kerala")
+    ask("Pension schemes for men in Tamil Nadu")
+    assert app.answer_cache.hits == hits
+    ask("Which pension schemes are there for widows in Tamil Nadu?")
+    assert app.answer_cache.hits == hits + 1
@@ -0,0 +1,110 @@
+import html
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from processing.corpus import SchemeCorpus
+from scraper import HttpSchemeFetcher, MySchemeScraper
+
+TOTAL = 4
+
+
+class MockSchemesSite:
+    """
+    Local stand-in for the scheme listing and the scheme pages. A page answers with its sections unless a list of
+    error statuses is scripted for it, which are served (one per request) first.
+    """
+
+    def __init__(self, total: int):
+        self.total = total
+        self.failures: dict[str, list[int]] = {}
+        self.requests: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def listing(self) -> str:
+        rows = "".join(f'<tr><td>{number + 1}</td><td>Scheme {number}\nCheck Eligibility</td>'
+                       f'<td><a href="/schemes/scheme-{number}">Open</a></td></tr>' for number in range(self.total))
+        return f"<html><body><table><tbody>{rows}</tbody></table></body></html>"
+
+    def page(self, slug: str) -> str:
+        return (f'<html><body><div id="tags"><div>Pension</div><div>{html.escape(slug)}</div></div>'
+                f'<div id="details">Details of {slug}</div><div id="eligibility">Residents of Tamil Nadu</div>'
+                f"</body></html>")
+
+    def respond(self, path: str) -> tuple[int, str]:
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            failures = self.failures.get(path)
+            if failures:
+                return failures.pop(0), ""
+        if path == "/schemes":
+            return 200, self.listing()
+        return 200, self.page(path.rsplit("/", 1)[-1])
+
+
+@pytest.fixture
+def mock_site():
+    site = MockSchemesSite(total=TOTAL)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, page = site.respond(self.path)
+            body = page.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    site.url = f"http://127.0.0.1:{server.server_address[1]}/schemes"
+    yield site
+    server.shutdown()
+    server.server_close()
+
+
+def scrape(site: MockSchemesSite, corpus_path: str, **kwargs) -> list[dict]:
+    kwargs.setdefault("backoff_seconds", 0.01)
+    scraper = MySchemeScraper(myscheme_url=site.url, checkpoint_path=corpus_path, fetcher_factory=HttpSchemeFetcher,
+                              workers=2, **kwargs)
+    return scraper.download()
+
+
+def test_scrapes_every_scheme_into_the_corpus(mock_site, tmp_path):
+    corpus_path = str(tmp_path / "schemes.jsonl")
+    schemes = scrape(mock_site, corpus_path)
+
+    assert [scheme["scheme_name"] for scheme in schemes] == [f"Scheme {number}" for number in range(TOTAL)]
+    assert schemes[0]["tags"] == ["Pension", "scheme-0"]
+    assert schemes[0]["details"] == "Details of scheme-0"
+    assert schemes[0]["benefits"] == "Not Available"
+    assert len(SchemeCorpus(corpus_path)) == TOTAL
+
+
+def test_retries_failed_pages(mock_site, tmp_path):
+    mock_site.failures["/schemes/scheme-1"] = [503, 500]
+    schemes = scrape(mock_site, str(tmp_path / "schemes.jsonl"))
+
+    assert len(schemes) == TOTAL
+    assert mock_site.requests["/schemes/scheme-1"] == 3
+
+
+def test_resumes_from_the_corpus(mock_site, tmp_path):
+    corpus_path = str(tmp_path / "schemes.jsonl")
+    # The page keeps failing, so the first run ends without it
+    mock_site.failures["/schemes/scheme-2"] = [502] * 2
+    schemes = scrape(mock_site, corpus_path, max_retries=1)
+    assert [scheme["scheme_name"] for scheme in schemes] == ["Scheme 0", "Scheme 1", "Scheme 3"]
+
+    mock_site.requests.clear()
+    schemes = scrape(mock_site, corpus_path)
+    assert len(schemes) == TOTAL
+    # Only the listing and the missing page are fetched again
+    assert mock_site.requests == {"/schemes": 1, "/schemes/scheme-2": 1}
+    assert len(SchemeCorpus(corpus_path)) == TOTAL
@@ -0,0 +1,43 @@
+import asyncio
+
+from stores.conversations import is_follow_up, refers_back
+
+QUESTION = "What pension schemes are there for farmers?"
+
+
+def ask(app, text: str, session_id: str) -> dict:
+    return asyncio.run(app.chat(text=text, file=None, tags=None, mode="two_call", session_id=session_id))
+
+
+def test_cached_answers_keep_the_schemes_of_the_session(ready_app):
+    app = ready_app
+    ask(app, QUESTION, "first")
+    hits = app.answer_cache.hits
+    ask(app, QUESTION, "second")
+    assert app.answer_cache.hits == hits + 1
+    assert app.conversations.get("second").scheme_ids == app.conversations.get("first").scheme_ids != []
+
+
+def test_follow_ups_bring_no_new_content():
+    for question in ["how do I apply for it?", "What documents are needed for this scheme?", "Is it free?"]:
+        assert is_follow_up(question), question
+    for question in ["What about housing schemes for widows?", "Also, any loans for fishermen in Kerala?",
+                     "So which scholarships exist for girls?", "Then tell me about crop insurance"]:
+        assert refers_back(question) and not is_follow_up(question), question
+
+
+def test_new_content_is_searched_alongside_the_previous_schemes(ready_app):
+    app = ready_app
+    ask(app, QUESTION, "new-content")
+    conversation = app.conversations.get("new-content")
+
+    query_embedding, _, docs = asyncio.run(app.retrieve("What about housing schemes for widows?", "en-IN", [],
+                                                        conversation))
+    assert query_embedding is not None
+    scheme_ids = app.scheme_ids_of(docs)
+    assert conversation.scheme_ids[0] in scheme_ids
+    assert set(scheme_ids) - set(conversation.scheme_ids)
+
+    query_embedding, _, docs = asyncio.run(app.retrieve("how do I apply for it?", "en-IN", [], conversation))
+    assert query_embedding is None
+    assert set(app.scheme_ids_of(docs)) <= set(conversation.scheme_ids)
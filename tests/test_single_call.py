@@ -0,0 +1,86 @@
+import asyncio
+
+import configs.config as config
+from translation.glossary import glossary_terms, retrieval_query
+from translation.language import script_language_code
+
+
+def test_glossary_translates_scheme_vocabulary():
+    assert glossary_terms("तमिलनाडु में 65 साल की विधवाओं के लिए पेंशन") == [
+        "Tamil Nadu", "65", "years", "widow", "pension"]
+    assert glossary_terms("விவசாயிகளுக்கு ஓய்வூதிய திட்டம்") == ["farmer", "pension", "scheme"]
+    # Short stems only match whole words
+    assert glossary_terms("आयुष्मान कार्ड") == []
+    assert retrieval_query("What schemes are there for farmers?") == "What schemes are there for farmers?"
+
+
+def test_ambiguous_script_answers_are_cached(ready_app):
+    app = ready_app
+    # Devanagari is shared by several languages, so the language is left to the model
+    query = "किसानों के लिए पेंशन योजना"
+
+    async def ask():
+        return await app.chat(text=query, file=None, tags=None, mode="single_call", session_id=None)
+
+    first = asyncio.run(ask())
+    hits = app.answer_cache.hits
+    second = asyncio.run(ask())
+    assert app.answer_cache.hits == hits + 1
+    assert second["response"] == first["response"]
+
+
+class ScriptedAnswerChain:
+    """
+    Stand-in for the structured answer chain returning the given replies in turn.
+    """
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def answer_chain(self):
+        return self
+
+    async def ainvoke(self, inputs: dict):
+        self.calls += 1
+        return self.replies.pop(0)
+
+
+def ask_in_one_call(app, text: str) -> dict:
+    return asyncio.run(app.chat(text=text, file=None, tags=None, mode="single_call", session_id=None))
+
+
+def test_malformed_structured_replies_fall_back(ready_app, monkeypatch):
+    app = ready_app
+    monkeypatch.setattr(app.answer_cache, "threshold", float("inf"))
+    languages = []
+
+    async def atts(message, language_code):
+        languages.append(language_code)
+        return b"audio"
+
+    monkeypatch.setattr(app.gemini, "atts", atts)
+
+    # No language code: answered in the most widely spoken language of the script
+    chain = ScriptedAnswerChain({"answer": "किसानों के लिए पीएम-किसान योजना है।", "language": "Hindi"})
+    monkeypatch.setattr(app.resources.get(), "llm_svc", chain)
+    assert ask_in_one_call(app, "किसानों के लिए कौन सी योजना है")["response"] == "किसानों के लिए पीएम-किसान योजना है।"
+    assert languages[-1] == "hi-IN"
+
+    # No answer: the chain is called again
+    chain = ScriptedAnswerChain({"language": "Hindi"}, {"answer": "विधवा पेंशन योजना", "language_code": "mr-IN"})
+    monkeypatch.setattr(app.resources.get(), "llm_svc", chain)
+    assert ask_in_one_call(app, "विधवांसाठी पेन्शन योजना")["response"] == "विधवा पेंशन योजना"
+    assert chain.calls == 2
+    assert languages[-1] == "mr-IN"
+
+    # No answer in any reply: answered by the two-call pipeline
+    chain = ScriptedAnswerChain({}, {"answer": " "})
+    monkeypatch.setattr(app.resources.get(), "llm_svc", chain)
+    assert ask_in_one_call(app, "मछुआरों के लिए ऋण योजना")["response"]
+    assert chain.calls == 2
+
+    # No context: the no-answer message is in the language of the script rather than English
+    monkeypatch.setattr(app, "build_context", lambda docs, budget: "")
+    assert script_language_code("বিধবা ভাতা") == "bn-IN"
+    assert ask_in_one_call(app, "বিধবা ভাতা")["message"] == config.NO_ANSWER_MESSAGES["bn-IN"]
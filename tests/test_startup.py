@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from conftest import REPO_ROOT
+from services.resources import AppResources, ResourceManager
+
+# Packages only the resources built after startup may import
+HEAVY_MODULES = ("google", "langchain_google_genai", "chromadb", "selenium")
+MAX_IMPORT_SECONDS = 5.0
+
+
+def test_importing_app_is_cheap(tmp_path):
+    code = ("import json, sys, time; started = time.perf_counter(); import app; "
+            "print(json.dumps({'seconds': time.perf_counter() - started, 'modules': sorted(sys.modules)}))")
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT, "EMBEDDINGS_BACKEND": "fake"}
+    # Run from an empty directory, which importing must leave empty
+    output = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, check=True, capture_output=True,
+                            text=True)
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+
+    heavy = [module for module in result["modules"] if module.split(".")[0] in HEAVY_MODULES]
+    assert heavy == []
+    assert result["seconds"] < MAX_IMPORT_SECONDS
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_readyz_reports_ready_once_resources_are_set(offline_app, monkeypatch):
+    monkeypatch.setattr(offline_app, "resources", ResourceManager())
+    # Without the context manager the lifespan does not run, so the resources are not built
+    client = TestClient(offline_app.app)
+
+    assert client.get("/healthz").status_code == 200
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+    response = client.post("/chat", data={"text": "pension for widows"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+    offline_app.resources.set(AppResources(vectorstore=None, hybrid_retriever=None, llm_svc=None, llm=None,
+                                           json_chain=None))
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
@@ -0,0 +1,60 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from services.streaming import stream_answer
+
+
+class FakeStreamingModel:
+    def __init__(self, chunks: list[str], error: Exception = None):
+        self.chunks = chunks
+        self.error = error
+
+    async def astream(self, prompt):
+        for chunk in self.chunks:
+            await asyncio.sleep(0.01)
+            yield chunk
+        if self.error:
+            raise self.error
+
+
+async def synthesize(sentence: str) -> bytes:
+    return sentence.encode("utf-8")
+
+
+def test_admission_is_released_before_a_slow_client_reads_the_answer():
+    held = []
+
+    @contextlib.asynccontextmanager
+    async def admission():
+        held.append(True)
+        try:
+            yield
+        finally:
+            held.remove(True)
+
+    async def run():
+        events = []
+        stream = stream_answer(FakeStreamingModel(["First sentence. ", "Second ", "sentence."]), "prompt", synthesize,
+                               admission)
+        async for event in stream:
+            events.append(event)
+            if len(events) == 1:
+                # The client stalls after the first event while the LLM stream finishes
+                await asyncio.sleep(0.2)
+                assert held == []
+        return events
+
+    events = asyncio.run(run())
+    assert "".join(payload for kind, payload in events if kind == "token") == "First sentence. Second sentence."
+    assert " ".join(payload[1] for kind, payload in events if kind == "audio") == "First sentence. Second sentence."
+
+
+def test_errors_of_the_llm_stream_are_raised():
+    async def run():
+        return [event async for event in stream_answer(FakeStreamingModel(["Partial "], RuntimeError("quota")),
+                                                       "prompt", synthesize)]
+
+    with pytest.raises(RuntimeError, match="quota"):
+        asyncio.run(run())
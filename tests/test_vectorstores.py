@@ -0,0 +1,30 @@
+from langchain_core.documents import Document
+
+from stores.chroma import document_id
+from stores.embeddings import FakeEmbeddings
+from stores.mmap_index import store_mmap_embeddings
+
+
+def chunk(scheme_id: str, tags: str = "Pension") -> Document:
+    return Document(page_content="Apply online - Application Process\nVisit the nearest Common Service Centre.",
+                    metadata={"scheme_id": scheme_id, "section": "application_process", "part": 0, "tags": tags})
+
+
+def test_identical_chunks_of_different_schemes_are_kept(tmp_path):
+    documents = [chunk("oap-tn"), chunk("oap-kl")]
+    assert document_id(documents[0]) != document_id(documents[1])
+
+    store = store_mmap_embeddings(documents, FakeEmbeddings(size=8), directory=str(tmp_path))
+    assert len(store) == 2
+    assert {document.metadata["scheme_id"] for document in store.similarity_search("Common Service Centre", k=2)} \
+        == {"oap-tn", "oap-kl"}
+
+
+def test_metadata_changes_build_a_new_version(tmp_path):
+    embeddings = FakeEmbeddings(size=8)
+    store_mmap_embeddings([chunk("oap-tn")], embeddings, directory=str(tmp_path))
+    current = (tmp_path / "CURRENT").read_text()
+
+    store = store_mmap_embeddings([chunk("oap-tn", tags="Pension,Widow")], embeddings, directory=str(tmp_path))
+    assert (tmp_path / "CURRENT").read_text() != current
+    assert store.similarity_search("Common Service Centre", k=1)[0].metadata["tags"] == "Pension,Widow"
@@ -0,0 +1,152 @@
+import re
+import unicodedata
+from typing import Optional
+
+# English terms of the scheme index by the words (or word stems) that express them in Indian languages: Hindi and
+# Marathi (Devanagari), Bengali, Tamil, Telugu, Kannada, Malayalam, Gujarati, Punjabi (Gurmukhi) and Odia. Stems
+# match the start of a word, so inflected forms ("विधवाओं", "விவசாயிகளுக்கு") are found too.
+_GLOSSARY = {
+    "farmer": ["किसान", "कृषक", "शेतकरी", "কৃষক", "চাষি", "விவசாயி", "రైతు", "ರೈತ", "കർഷക", "ખેડૂત", "ਕਿਸਾਨ",
+               "କୃଷକ", "ଚାଷୀ"],
+    "agriculture": ["कृषि", "खेती", "शेती", "কৃষি", "விவசாய", "వ్యవసాయ", "ಕೃಷಿ", "കൃഷി", "ખેતી", "કૃષિ", "ਖੇਤੀ",
+                    "କୃଷି"],
+    "pension": ["पेंशन", "पेन्शन", "निवृत्तीवेतन", "পেনশন", "ஓய்வூதிய", "పింఛన్", "పెన్షన్", "ಪಿಂಚಣಿ", "പെൻഷൻ",
+                "પેન્શન", "ਪੈਨਸ਼ਨ", "ପେନସନ"],
+    "allowance": ["भत्ता", "ভাতা", "ଭତ୍ତା"],
+    "scholarship": ["छात्रवृत्ति", "शिष्यवृत्ती", "বৃত্তি", "ఉపకార", "ವಿದ್ಯಾರ್ಥಿವೇತನ", "സ്കോളർഷിപ്പ", "શિષ્યવૃત્તિ",
+                    "ਵਜ਼ੀਫ਼ਾ", "ଛାତ୍ରବୃତ୍ତି"],
+    "student": ["छात्र", "विद्यार्थी", "ছাত্র", "শিক্ষার্থী", "மாணவ", "విద్యార్థి", "ವಿದ್ಯಾರ್ಥಿ", "വിദ്യാർത്ഥി",
+                "વિદ્યાર્થી", "ਵਿਦਿਆਰਥੀ", "ଛାତ୍ର"],
+    "education": ["शिक्षा", "शिक्षण", "শিক্ষা", "கல்வி", "విద్య", "ಶಿಕ್ಷಣ", "വിദ്യാഭ്യാസ", "શિક્ષણ",
+                  "ਸਿੱਖਿਆ", "ଶିକ୍ଷା"],
+    "women": ["महिला", "स्त्री", "औरत", "মহিলা", "নারী", "பெண்", "மகளிர்", "మహిళ", "స్త్రీ", "ಮಹಿಳೆ", "ಸ್ತ್ರೀ",
+              "സ്ത്രീ", "വനിത", "મહિલા", "સ્ત્રી", "ਔਰਤ", "ਮਹਿਲਾ", "ମହିଳା"],
+    "girl": ["लड़की", "लड़कि", "बालिका", "मुलगी", "মেয়ে", "சிறுமி", "బాలిక", "ബാലിക", "દીકરી", "ਲੜਕੀ", "ବାଳିକା"],
+    "daughter": ["बेटी", "बेटि", "पुत्री", "কন্যা", "மகள்", "కూతురు", "ಮಗಳ", "മകൾ", "ਧੀਆਂ"],
+    "widow": ["विधवा", "বিধবা", "விதவை", "கைம்பெண்", "వితంతు", "ವಿಧವೆ", "വിധവ", "વિધવા", "ਵਿਧਵਾ", "ବିଧବା"],
+    "elderly": ["वृद्ध", "बुजुर्ग", "वरिष्ठ", "ज्येष्ठ", "বয়স্ক", "বৃদ্ধ", "முதியோர்", "மூத்த", "వృద్ధ", "ಹಿರಿಯ",
+                "വയോജന", "മുതിർന്ന", "વૃદ્ધ", "ਬਜ਼ੁਰਗ", "ବୃଦ୍ଧ"],
+    "disability": ["विकलांग", "दिव्यांग", "अपंग", "প্রতিবন্ধী", "மாற்றுத்திறனாளி", "వికలాంగ", "దివ్యాంగ", "ಅಂಗವಿಕಲ",
+                   "ഭിന്നശേഷി", "દિવ્યાંગ", "વિકલાંગ", "ਅਪਾਹਜ", "ଭିନ୍ନକ୍ଷମ"],
+    "child": ["बच्चे", "बच्चा", "बच्चों", "শিশু", "குழந்தை", "పిల్ల", "ಮಕ್ಕಳ", "കുട്ടി", "બાળક", "ਬੱਚੇ",
+              "ਬੱਚਿਆਂ", "ଶିଶୁ"],
+    "pregnant": ["गर्भवती", "গর্ভবতী", "கர்ப்பிணி", "గర్భిణీ", "ಗರ್ಭಿಣಿ", "ഗർഭിണി", "સગર્ભા", "ਗਰਭਵਤੀ", "ଗର୍ଭବତୀ"],
+    "maternity": ["मातृत्व", "প্রসূতি", "மகப்பேறு", "ప్రసూతి", "ಹೆರಿಗೆ", "പ്രസവ", "પ્રસૂતિ", "ପ୍ରସୂତି"],
+    "marriage": ["विवाह", "शादी", "लग्न", "বিবাহ", "বিয়ে", "திருமண", "వివాహ", "పెళ్లి", "ಮದುವೆ", "ವಿವಾಹ", "വിവാഹ",
+                 "લગ્ન", "ਵਿਆਹ", "ବିବାହ"],
+    "housing": ["आवास", "मकान", "घर", "घरकुल", "আবাস", "বাড়ি", "வீடு", "வீட்டு", "ఇల్లు", "గృహ", "ಮನೆ", "ವಸತಿ",
+                "വീട്", "വീടി", "ഭവന", "આવાસ", "ઘર", "ਘਰ", "ਮਕਾਨ", "ଘର", "ଆବାସ"],
+    "loan": ["ऋण", "लोन", "कर्ज", "ঋণ", "கடன்", "రుణ", "లోన్", "ಸಾಲ", "വായ്പ", "લોન", "ધિરાણ", "ਕਰਜ਼ਾ", "ଋଣ"],
+    "health": ["स्वास्थ्य", "इलाज", "चिकित्सा", "आरोग्य", "उपचार", "স্বাস্থ্য", "চিকিৎসা", "மருத்துவ", "சுகாதார",
+               "ఆరోగ్య", "వైద్య", "ಆರೋಗ್ಯ", "ಚಿಕಿತ್ಸೆ", "ആരോഗ്യ", "ചികിത്സ", "આરોગ્ય", "સારવાર", "ਸਿਹਤ", "ਇਲਾਜ",
+               "ସ୍ୱାସ୍ଥ୍ୟ", "ଚିକିତ୍ସା"],
+    "insurance": ["बीमा", "विमा", "বিমা", "காப்பீடு", "బీమా", "ವಿಮೆ", "ഇൻഷുറൻസ", "વીમા", "વીમો", "ਬੀਮਾ", "ବୀମା"],
+    "employment": ["रोजगार", "रोज़गार", "नौकरी", "नोकरी", "কর্মসংস্থান", "চাকরি", "வேலை", "ఉద్యోగ", "ఉపాధి", "ಉದ್ಯೋಗ",
+                   "തൊഴിൽ", "રોજગાર", "નોકરી", "ਰੁਜ਼ਗਾਰ", "ਨੌਕਰੀ", "ନିଯୁକ୍ତି"],
+    "workers": ["मजदूर", "मज़दूर", "श्रमिक", "कामगार", "मजूर", "শ্রমিক", "தொழிலாள", "కార్మిక", "ಕಾರ್ಮಿಕ", "തൊഴിലാളി",
+                "શ્રમિક", "મજૂર", "ਮਜ਼ਦੂਰ", "ଶ୍ରମିକ"],
+    "fisherman": ["मछुआर", "मच्छीमार", "মৎস্যজীবী", "জেলে", "மீனவ", "మత్స్యకార", "ಮೀನುಗಾರ", "മത്സ്യത്തൊഴിലാളി",
+                  "માછીમાર", "ମତ୍ସ୍ୟଜୀବୀ"],
+    "weaver": ["बुनकर", "विणकर", "তাঁতি", "நெசவாளர்", "చేనేత", "ನೇಕಾರ", "നെയ്ത്തുകാര", "વણકર", "ବୁଣାକାର"],
+    "artisan": ["कारीगर", "कारागीर", "কারিগর", "கைவினை", "చేతివృత్తి", "ಕುಶಲಕರ್ಮಿ", "കരകൗശല", "કારીગર", "ਕਾਰੀਗਰ",
+                "କାରିଗର"],
+    "business": ["व्यवसाय", "व्यापार", "उद्यमी", "उद्योजक", "ব্যবসা", "উদ্যোক্তা", "தொழில்", "சுயதொழில்", "వ్యాపార",
+                 "ವ್ಯಾಪಾರ", "ಉದ್ಯಮ", "സംരംഭ", "વ્યવસાય", "ઉદ્યોગ", "ਕਾਰੋਬਾਰ", "ବ୍ୟବସାୟ"],
+    "ration": ["राशन", "रेशन", "রেশন", "ரேஷன்", "రేషన్", "ಪಡಿತರ", "റേഷൻ", "રેશન", "ਰਾਸ਼ਨ", "ରାସନ"],
+    "food": ["खाद्य", "अन्न", "খাদ্য", "உணவு", "ఆహార", "ಆಹಾರ", "ഭക്ഷ്യ", "અનાજ", "ଖାଦ୍ୟ"],
+    "income": ["आय", "आमदनी", "उत्पन्न", "আয়", "வருமான", "ఆదాయ", "ಆದಾಯ", "വരുമാന", "આવક", "ਆਮਦਨ", "ଆୟ"],
+    "lakh": ["लाख", "লাখ", "லட்சம்", "లక్ష", "ಲಕ್ಷ", "ലക്ഷ", "લાખ", "ਲੱਖ", "ଲକ୍ଷ"],
+    "age": ["उम्र", "आयु", "वय", "বয়স", "வயது", "వయస్సు", "ವಯಸ್ಸು", "പ്രായ", "ઉંમર", "ਉਮਰ", "ବୟସ"],
+    "years": ["वर्ष", "साल", "বছর", "ஆண்டு", "సంవత్సర", "ವರ್ಷ", "വയസ്സ", "વર્ષ", "ਸਾਲ", "ବର୍ଷ"],
+    "scheme": ["योजना", "प्रकल्प", "প্রকল্প", "திட்ட", "పథక", "ಯೋಜನೆ", "പദ്ധതി", "યોજના", "ਯੋਜਨਾ", "ਸਕੀਮ", "ଯୋଜନା"],
+    "assistance": ["सहायता", "मदद", "अनुदान", "সহায়তা", "உதவி", "సహాయ", "ಸಹಾಯ", "സഹായ", "સહાય", "ਸਹਾਇਤਾ", "ସହାୟତା"],
+    "scheduled": ["अनुसूचित", "তফসিলি", "ଅନୁସୂଚିତ"],
+    "caste": ["जाति", "জাতি", "ଜାତି"],
+    "tribe": ["जनजाति", "आदिवासी", "উপজাতি", "আদিবাসী", "பழங்குடி", "గిరిజన", "ಬುಡಕಟ್ಟು", "ആദിവാസി", "આદિવાસી",
+              "ଆଦିବାସୀ"],
+    "scheduled caste": ["ஆதிதிராவிடர்", "దళిత"],
+    "minority": ["अल्पसंख्यक", "সংখ্যালঘু", "சிறுபான்மை", "మైనారిటీ", "ಅಲ್ಪಸಂಖ್ಯಾತ", "ന്യൂനപക്ഷ", "લઘુમતી", "ਘੱਟ-ਗਿਣਤੀ",
+                 "ସଂଖ୍ୟାଲଘୁ"],
+    # States, whose names are matched by the eligibility prefilter
+    "Tamil Nadu": ["तमिलनाडु", "தமிழ்நாடு", "தமிழக"],
+    "Kerala": ["केरल", "കേരള"],
+    "Karnataka": ["कर्नाटक", "ಕರ್ನಾಟಕ"],
+    "Andhra Pradesh": ["आंध्र", "ఆంధ్ర"],
+    "Telangana": ["तेलंगाना", "తెలంగాణ"],
+    "Maharashtra": ["महाराष्ट्र"],
+    "Gujarat": ["गुजरात", "ગુજરાત"],
+    "Punjab": ["पंजाब", "ਪੰਜਾਬ"],
+    "Odisha": ["ओडिशा", "ओड़िशा", "ଓଡ଼ିଶା"],
+    "West Bengal": ["पश्चिम बंगाल", "পশ্চিমবঙ্গ", "পশ্চিম বঙ্গ"],
+    "Assam": ["असम", "অসম"],
+    "Bihar": ["बिहार"],
+    "Rajasthan": ["राजस्थान"],
+    "Jharkhand": ["झारखंड", "झारखण्ड"],
+    "Haryana": ["हरियाणा"],
+    "Uttar Pradesh": ["उत्तर प्रदेश"],
+    "Madhya Pradesh": ["मध्य प्रदेश"],
+    "Uttarakhand": ["उत्तराखंड", "उत्तराखण्ड"],
+    "Chhattisgarh": ["छत्तीसगढ़"],
+    "Delhi": ["दिल्ली"],
+}
+
+# Stems this short only match whole words: "आयु" (age) but not "आयुष्मान" (the Ayushman health scheme)
+_MIN_PREFIX_LENGTH = 4
+
+_WORD = re.compile(r"[^\s.,;:!?।॥()\[\]\"'“”‘’/]+")
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFC", text)
+
+
+# Single-word stems, longest first so "छात्रवृत्ति" (scholarship) wins over "छात्र" (student)
+_STEMS = sorted(((_normalize(stem), term) for term, stems in _GLOSSARY.items() for stem in stems if " " not in stem),
+                key=lambda item: len(item[0]), reverse=True)
+_PHRASES = [(_normalize(stem), term) for term, stems in _GLOSSARY.items() for stem in stems if " " in stem]
+
+
+def _term_of(word: str) -> Optional[str]:
+    for stem, term in _STEMS:
+        if word == stem or (len(stem) >= _MIN_PREFIX_LENGTH and word.startswith(stem)):
+            return term
+    return None
+
+
+def glossary_terms(text: str) -> list[str]:
+    """
+    Translates the scheme vocabulary of a query into English terms, word by word with a fixed glossary, e.g.
+    "तमिलनाडु में 65 साल की विधवा के लिए पेंशन" gives ["Tamil Nadu", "65", "years", "widow", "pension"].
+
+    Numbers are kept in place, so ages and amounts stay next to the words that qualify them.
+
+    Args:
+        text (str): The user query in any language.
+
+    Returns:
+        list[str]: The English terms found, in the order of the query, without repetitions.
+    """
+    text = _normalize(text)
+    for phrase, term in _PHRASES:
+        text = text.replace(phrase, f" {term} ")
+    terms = []
+    for word in _WORD.findall(text):
+        if word.isdecimal():
+            terms.append(str(int(word)))
+        elif word.isascii():
+            terms.append(word)
+        elif term := _term_of(word):
+            terms.append(term)
+    return list(dict.fromkeys(terms))
+
+
+def retrieval_query(text: str) -> str:
+    """
+    Returns the query to search the English scheme index with: the query followed by the English terms of its
+    scheme vocabulary, so the lexical index, the eligibility prefilter and the English embedding model have
+    English words to match. English queries are returned unchanged.
+    """
+    if text.isascii():
+        return text
+    terms = glossary_terms(text)
+    return f"{text} ({' '.join(terms)})" if terms else text
@@ -0,0 +1,169 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+# Unicode blocks of the scripts used by Indian languages, with the language and GCP TTS code they map to. Scripts
+# shared by several languages (Devanagari: Hindi, Marathi, Nepali, Konkani...; Bengali: Bengali, Assamese; Arabic:
+# Urdu, Kashmiri, Sindhi) map to None and are left to the model.
+_SCRIPT_BLOCKS = [
+    (0x0900, 0x097F, "Devanagari", None, None),
+    (0x0980, 0x09FF, "Bengali", None, None),
+    (0x0A00, 0x0A7F, "Gurmukhi", "Punjabi", "pa-IN"),
+    (0x0A80, 0x0AFF, "Gujarati", "Gujarati", "gu-IN"),
+    (0x0B00, 0x0B7F, "Odia", "Odia", "or-IN"),
+    (0x0B80, 0x0BFF, "Tamil", "Tamil", "ta-IN"),
+    (0x0C00, 0x0C7F, "Telugu", "Telugu", "te-IN"),
+    (0x0C80, 0x0CFF, "Kannada", "Kannada", "kn-IN"),
+    (0x0D00, 0x0D7F, "Malayalam", "Malayalam", "ml-IN"),
+    (0x0600, 0x06FF, "Arabic", None, None),
+]
+
+# Language codes for text in a script shared by several languages when the language itself is not known: the most
+# widely spoken language of the script
+_SHARED_SCRIPT_CODES = {"Devanagari": "hi-IN", "Bengali": "bn-IN", "Arabic": "ur-IN"}
+
+# Common words of romanized Hindi/Tamil/etc. that mark Latin-script input as not English
+_ROMANIZED_MARKERS = {
+    "hai", "hain", "kya", "kaise", "kaun", "kitna", "liye", "ke", "ki", "ka", "mein", "mujhe", "mera", "meri",
+    "nahi", "aur", "yojana", "batao", "bataiye", "chahiye", "kar", "karna", "sakta", "sakti", "enna", "eppadi",
+    "enakku", "vendum", "pathi", "irukku", "naaku", "kavali", "ela", "entha",
+}
+
+# Common English function words. Latin-script input is only taken as English if enough of its words are among
+# them; words that are also common in romanized Indian languages ("to", "me", "hi") are left out.
+_ENGLISH_STOPWORDS = {
+    "the", "of", "and", "for", "in", "is", "are", "was", "what", "which", "who", "how", "when", "where", "why",
+    "can", "could", "should", "would", "will", "my", "an", "with", "about", "any", "there", "this", "that", "do",
+    "does", "am", "be", "from", "on", "by", "at", "or", "if", "it", "their", "our", "your", "you", "we", "they",
+    "get", "apply", "available", "eligible", "please", "tell", "give", "need", "want", "help", "under", "all",
+}
+# Share of words that must be English stopwords
+_ENGLISH_STOPWORD_SHARE = 0.2
+
+_WORD_PATTERN = re.compile(r"[a-z']+")
+
+# Share of letters that must belong to a single script for the detection to be trusted
+_SCRIPT_CONFIDENCE = 0.8
+
+
+def _script_of(char: str) -> Optional[tuple[str, Optional[str], Optional[str]]]:
+    code_point = ord(char)
+    for start, end, script, language, language_code in _SCRIPT_BLOCKS:
+        if start <= code_point <= end:
+            return script, language, language_code
+    if char.isascii():
+        return "Latin", "English", "en-IN"
+    return None
+
+
+def _dominant_script(text: str) -> Optional[tuple[tuple, float]]:
+    """
+    Returns the script most of the letters of a text are in and the share of letters in it, or None if the text
+    has no letters or letters of a script not listed.
+    """
+    counts = {}
+    for char in text:
+        if not unicodedata.category(char).startswith("L"):
+            continue
+        script = _script_of(char)
+        if script is None:
+            return None
+        counts[script] = counts.get(script, 0) + 1
+
+    if not counts:
+        return None
+    script, count = max(counts.items(), key=lambda item: item[1])
+    return script, count / sum(counts.values())
+
+
+def script_name(text: str) -> Optional[str]:
+    """
+    Returns the name of the script most of the letters of a text are in ("Devanagari", "Tamil", "Latin"...).
+    """
+    dominant = _dominant_script(text)
+    return dominant[0][0] if dominant else None
+
+
+def script_language_code(text: str) -> Optional[str]:
+    """
+    Returns the most likely language code for the script of a text: the code of its language for scripts used by a
+    single language (Latin gives "en-IN"), of its most widely spoken language for shared ones ("hi-IN" for
+    Devanagari). None if the text has no letters of a listed script.
+    """
+    dominant = _dominant_script(text)
+    if dominant is None:
+        return None
+    script, _, language_code = dominant[0]
+    return language_code or _SHARED_SCRIPT_CODES.get(script)
+
+
+def detect_language(text: str) -> Optional[dict]:
+    """
+    Detects the language of the input locally, only where that is unambiguous: from the script for scripts used by
+    a single language (Tamil, Telugu, Kannada, Malayalam, Gujarati, Gurmukhi, Odia), and as English for Latin text
+    with enough English function words.
+
+    Args:
+        text (str): The user input.
+
+    Returns:
+        Optional[dict]: None if the input is ambiguous. Otherwise a dict with `language` and `language_code`;
+            for English input it also contains `text`, so no translation is needed.
+    """
+    dominant = _dominant_script(text)
+    if dominant is None:
+        return None
+
+    (_, language, language_code), share = dominant
+    if language is None or share < _SCRIPT_CONFIDENCE:
+        return None
+
+    if language == "English":
+        words = _WORD_PATTERN.findall(text.lower())
+        if any(word in _ROMANIZED_MARKERS for word in words):
+            return None
+        english = sum(1 for word in words if word in _ENGLISH_STOPWORDS)
+        if not english or english < _ENGLISH_STOPWORD_SHARE * len(words):
+            return None
+        return {"language": language, "text": text.strip(), "language_code": language_code}
+
+    return {"language": language, "language_code": language_code}
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalizes a query for use as a cache key: Unicode NFC, case-folded, with collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split())
+
+
+class TranslationCache:
+    """
+    Bounded LRU cache of recent translation results, keyed by the normalized input text.
+
+    Args:
+        max_entries: Maximum number of cached translations.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> Optional[dict]:
+        key = normalize_query(text)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, text: str, result: dict):
+        key = normalize_query(text)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)